@@ -0,0 +1,152 @@
+"""
+Plain HTTP fetch path benchmark for browse_website.
+
+Starts a local HTTP server fixture serving a static article, a gzipped
+article, JavaScript-rendered pages, an oversized page, a PDF and a missing
+page, then checks which pages are read over plain HTTP and which escalate
+to the browser. Checks that an unchanged article is revalidated with a
+304 through its ETag, and compares the latency of pooled keep-alive fetches with
+a new connection per fetch. Exits with status 1 when a page takes the wrong
+path. No browser or network access is needed.
+
+Usage:
+    python -m benchmarks.browse_benchmark [--fetches 200]
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Tuple
+
+from command_scripts.internet import fetch_text_with_http
+from command_scripts.web_fetch import FetchError, HttpFetcher
+
+PARAGRAPH = ("<p>Nuclear fusion is the process in which two light atomic nuclei combine to form a heavier"
+             " nucleus, releasing energy. Tokamaks confine the plasma with magnetic fields.</p>\n")
+ARTICLE = f"<html><head><title>Fusion</title></head><body><h1>Fusion</h1>{PARAGRAPH * 40}</body></html>"
+APP_SHELL = ("<html><head><title>App</title><script src=\"/bundle.js\"></script></head>"
+             "<body><div id=\"root\"></div></body></html>")
+NOSCRIPT = ("<html><body><h1>Loading</h1><noscript>You need to enable JavaScript to run this app."
+            "</noscript><div id=\"app-shell\">Loading the dashboard, please wait...</div></body></html>")
+
+# path: (status, content type, body, extra headers)
+PAGES: Dict[str, Tuple[int, str, bytes, Dict[str, str]]] = {
+    "/article": (200, "text/html; charset=utf-8", ARTICLE.encode(), {}),
+    "/gzip": (200, "text/html; charset=utf-8", gzip.compress(ARTICLE.encode()), {"Content-Encoding": "gzip"}),
+    "/plain": (200, "text/plain", (PARAGRAPH * 10).encode(), {}),
+    "/app": (200, "text/html", APP_SHELL.encode(), {}),
+    "/noscript": (200, "text/html", NOSCRIPT.encode(), {}),
+    "/large": (200, "text/html", ARTICLE.encode() * 500, {}),
+    "/report.pdf": (200, "application/pdf", b"%PDF-1.4\n", {}),
+}
+ARTICLE_ETAG = '"fusion-1"'
+
+# path: True when the page should be read over plain HTTP
+EXPECTED_PATH = {
+    "/article": True,
+    "/gzip": True,
+    "/plain": True,
+    "/app": False,
+    "/noscript": False,
+    "/report.pdf": False,
+    "/missing": False,
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves PAGES over HTTP/1.1 so connections can be kept alive"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        status, content_type, body, headers = PAGES.get(self.path, (404, "text/html", b"Not found", {}))
+        if self.path == "/article" and self.headers.get("If-None-Match") == ARTICLE_ETAG:
+            status, body = 304, b""
+        elif self.path == "/article":
+            headers = {"ETag": ARTICLE_ETAG}
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextmanager
+def local_server() -> Iterator[str]:
+    """Run the fixture server on a free local port, yielding its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def check_paths(base_url: str) -> bool:
+    """Check which pages are read over plain HTTP"""
+    correct = True
+    for path, expected in EXPECTED_PATH.items():
+        text = fetch_text_with_http(base_url + path)
+        uses_http = text is not None
+        status = "ok" if uses_http == expected else "WRONG"
+        correct &= uses_http == expected
+        print(f"  {path:12} -> {'plain HTTP' if uses_http else 'browser':10} {status}")
+        if path == "/gzip" and text is not None and "Tokamaks" not in text:
+            print("  /gzip was not decompressed")
+            correct = False
+
+    page = HttpFetcher(max_bytes=1_000_000).fetch(base_url + "/large")
+    print(f"  /large       -> {len(page.html)} characters, truncated: {page.truncated}")
+    correct &= page.truncated and len(page.html) <= 1_000_000
+    return correct
+
+
+def check_revalidation(base_url: str) -> bool:
+    """Check that a cached article is confirmed unchanged with a conditional request"""
+    fetcher = HttpFetcher()
+    page = fetcher.fetch(base_url + "/article")
+    revalidated = fetcher.fetch(base_url + "/article", etag=page.etag)
+    print(f"  /article     -> ETag {page.etag}, conditional request status {revalidated.status}")
+    return page.etag == ARTICLE_ETAG and revalidated.not_modified
+
+
+def time_fetches(base_url: str, fetches: int) -> None:
+    """Compare pooled keep-alive fetches with a new connection per fetch"""
+    pooled = HttpFetcher()
+    start = time.perf_counter()
+    for _ in range(fetches):
+        pooled.fetch(base_url + "/article")
+    pooled_ms = (time.perf_counter() - start) / fetches * 1000
+
+    start = time.perf_counter()
+    for _ in range(fetches):
+        HttpFetcher().fetch(base_url + "/article")
+    fresh_ms = (time.perf_counter() - start) / fetches * 1000
+    print(f"pooled session: {pooled_ms:.2f} ms/fetch, new session per fetch: {fresh_ms:.2f} ms/fetch")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fetches", type=int, default=200)
+    args = parser.parse_args()
+    with local_server() as url:
+        print("fetch paths:")
+        paths_correct = check_paths(url)
+        paths_correct &= check_revalidation(url)
+        time_fetches(url, args.fetches)
+    try:
+        HttpFetcher(timeout=0.5).fetch("http://127.0.0.1:9/")
+    except FetchError as exc:
+        print(f"unreachable server raises FetchError: {exc}")
+    sys.exit(0 if paths_correct else 1)
@@ -0,0 +1,152 @@
+"""
+Throughput and quality benchmark for HTML text extraction.
+
+Runs the saved pages in benchmarks/corpus, and a large page built from
+them, through extract_text with every installed parser backend and, when
+BeautifulSoup is installed, through the previous BeautifulSoup extraction.
+Reports the throughput of each and how many of the expected content
+phrases were kept and how many boilerplate phrases leaked into the text.
+Exits with status 1 when extract_text drops content or keeps boilerplate.
+
+Usage:
+    python -m benchmarks.extract_benchmark [--repeat 20] [--show news_article]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from processing.extract import available_backends, extract_text
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+# page: (phrases the text must contain, boilerplate phrases it must not contain)
+EXPECTATIONS: Dict[str, Tuple[List[str], List[str]]] = {
+    "news_article": (
+        ["Fusion record: reactor sustains plasma for 30 seconds", "120 million degrees Celsius",
+         "Heating it is comparatively easy", "edge-localised modes", "lined with tungsten tiles",
+         "Every second we add teaches us", "first plasma later this decade"],
+        ["We use cookies", "Accept all", "Share on Twitter", "Advertisement", "weekly science briefing",
+         "Most read", "Stellarators make a comeback", "All rights reserved", "gtag", "font-family"],
+    ),
+    "wiki_page": (
+        ["A stellarator is a plasma device", "Lyman Spitzer of Princeton University",
+         "Inventor | Lyman Spitzer", "Steady-state operation | Natural | Difficult",
+         "- modular coils, each shaped individually", "do not suffer from disruptions"],
+        ["Please donate", "Navigation menu", "Main page", "Not logged in", "Privacy policy",
+         "Tokamak · Stellarator · Z-pinch", "wgPageName", "Contents"],
+    ),
+    "docs_page": (
+        ["Plasma control API reference", "All functions are thread safe",
+         "discharge = Discharge(current_ma=1.2, duration_s=30)\nwith discharge.start():\n    discharge.wait()",
+         "Target plasma current in mega-amperes", "require the active cooling option",
+         "DisruptionError is raised"],
+        ["Quick search", "Table of Contents", "Created using Sphinx", "modules", "pygments"],
+    ),
+    "has_sidebar": (
+        ["Tritium breeding blankets explained", "make its own tritium",
+         "turns into tritium when it absorbs a neutron", "liquid lead-lithium are the main candidates"],
+        ["Share on Facebook", "Popular posts", "Why tokamaks are shaped", "Copyright 2023", "Archive"],
+    ),
+    "forum_thread": (
+        ["Is inertial confinement a dead end?", "300 MJ from the grid", "Diode-pumped lasers",
+         "a million of them per day"],
+        ["Tweet", "Powered by ForumSoft", "var forum", "vertical-align", "Buy now"],
+    ),
+}
+
+
+def load_corpus() -> Dict[str, str]:
+    """Load the saved pages, keyed by file name without extension"""
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(CORPUS_DIR.glob("*.html"))}
+
+
+def large_page(corpus: Dict[str, str], copies: int = 600) -> str:
+    """Build a page of a few megabytes by repeating the article body"""
+    article = corpus["news_article"]
+    start, end = article.index("<main"), article.index("</main>") + len("</main>")
+    return article[:start] + article[start:end] * copies + article[end:]
+
+
+def bs4_extract(html: str) -> str:
+    """The BeautifulSoup extraction browse_website used before processing.extract"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup(["script", "style"]):
+        script.extract()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def extractors() -> Dict[str, Callable[[str], str]]:
+    """The extractors to compare, by name"""
+    found: Dict[str, Callable[[str], str]] = {
+        backend: (lambda html, backend=backend: extract_text(html, backend)) for backend in available_backends()
+    }
+    try:
+        import bs4  # noqa: F401  pylint: disable=unused-import
+        found["bs4 (previous)"] = bs4_extract
+    except ImportError:
+        print("BeautifulSoup is not installed, skipping the previous extraction")
+    return found
+
+
+def throughput(extract: Callable[[str], str], html: str, repeat: int) -> float:
+    """Extract a page repeatedly and return the throughput in MB/s"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract(html)
+    elapsed = time.perf_counter() - start
+    return len(html.encode("utf-8")) * repeat / elapsed / 1_000_000
+
+
+def quality(name: str, text: str) -> Tuple[int, int, List[str]]:
+    """Count the kept content and leaked boilerplate phrases of a page"""
+    keep, drop = EXPECTATIONS.get(name, ([], []))
+    kept = [phrase for phrase in keep if phrase in text]
+    leaked = [phrase for phrase in drop if phrase in text]
+    problems = [f"missing {phrase!r}" for phrase in keep if phrase not in kept]
+    problems += [f"leaked {phrase!r}" for phrase in leaked]
+    return len(kept), len(leaked), problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="extractions per page when timing")
+    parser.add_argument("--show", help="print the text extracted from this corpus page")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    if args.show:
+        print(extract_text(corpus[args.show]))
+        sys.exit(0)
+
+    all_correct = True
+    methods = extractors()
+    for name, html in corpus.items():
+        keep, drop = EXPECTATIONS.get(name, ([], []))
+        print(f"{name} ({len(html) / 1000:.0f} kB):")
+        for method, extract in methods.items():
+            kept, leaked, problems = quality(name, extract(html))
+            speed = throughput(extract, html, args.repeat)
+            print(f"  {method:15} {speed:7.2f} MB/s  content {kept}/{len(keep)}  boilerplate {leaked}/{len(drop)}")
+            if method != "bs4 (previous)" and problems:
+                all_correct = False
+                for problem in problems:
+                    print(f"    {problem}")
+
+    html = large_page(corpus)
+    print(f"large page ({len(html) / 1_000_000:.1f} MB):")
+    for method, extract in methods.items():
+        start = time.perf_counter()
+        text = extract(html)
+        elapsed = time.perf_counter() - start
+        print(f"  {method:15} {elapsed * 1000:7.0f} ms  {len(html) / elapsed / 1_000_000:.2f} MB/s"
+              f"  {len(text) / 1000:.0f} kB of text")
+    sys.exit(0 if all_correct else 1)
@@ -0,0 +1,116 @@
+"""
+Accuracy and latency benchmark for command keyword extraction.
+
+Runs labelled execution agent actions through the local keyword
+extractor and, with --llm, through the LLM keyword agent. Both use the
+same hit criterion: the first command named in the keywords must be the
+command the action should translate to.
+
+Usage:
+    python -m benchmarks.keyword_benchmark [--llm]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import time
+from typing import Optional
+
+from capabilitiesgenerator import CapabilitiesGenerator
+from command_scripts.commands import commands_generator, prepare_commands_list
+from command_scripts.keywords import KeywordExtractor, build_keyword_prompt
+
+# (action, expected command)
+LABELLED_ACTIONS = [
+    ("I will search the internet for the basics of nuclear fusion", "google"),
+    ("Search Google for recent tokamak breakthroughs in 2023", "google"),
+    ("Look up the current status of the ITER project online", "google"),
+    ("Browse https://en.wikipedia.org/wiki/Nuclear_fusion to learn the history of fusion", "browse_website"),
+    ("Read the article at https://www.iter.org/proj/inafewlines about the ITER timeline", "browse_website"),
+    ("Visit https://www.energy.gov/science/doe-explainsfusion-energy-science to find funding data", "browse_website"),
+    ("Read the file fusion_notes.md to recall previous findings", "read_file"),
+    ("Open the existing report.md file and review its contents", "read_file"),
+    ("Create a file called fusion_report.md containing an introduction to fusion", "write_file"),
+    ("Write the summary of tokamak designs to tokamaks.md", "write_file"),
+    ("Append the latest findings about stellarators to fusion_report.md", "append_file"),
+    ("Add a section on inertial confinement to notes.md", "append_file"),
+    ("Delete the file draft.md because it is no longer needed", "delete_file"),
+    ("Make a new directory called research to organize notes", "create_directory"),
+    ("Create a folder named sources", "create_directory"),
+    ("Remove the empty directory old_notes", "remove_directory"),
+    ("Move the research directory into archive", "move_directory"),
+    ("List all files in the workspace to see what has been written", "list_files"),
+]
+
+
+def first_command(keywords: str) -> Optional[str]:
+    """
+    Find the command named first in a keyword list.
+
+    A command is named by its name ("read_file") or by the words of its
+    name in order ("read file"), as both extractors may write it.
+    """
+    words = re.findall(r"[a-z0-9]+", keywords.lower().replace("_", " "))
+    # Longer names first, so a name is not matched by a shorter name it starts with
+    names = sorted(commands_generator.registry.names(), key=lambda name: name.count("_"), reverse=True)
+    for position in range(len(words)):
+        for name in names:
+            parts = name.split("_")
+            if words[position:position + len(parts)] == parts:
+                return name
+    return None
+
+
+def run_local() -> None:
+    """Benchmark the local keyword extractor"""
+    extractor = KeywordExtractor(commands_generator)
+    hits = 0
+    start = time.perf_counter()
+    for action, expected in LABELLED_ACTIONS:
+        keywords = extractor.keywords(action)
+        if first_command(keywords) == expected:
+            hits += 1
+        else:
+            print(f"  local miss: {action!r} -> {keywords}")
+    elapsed = (time.perf_counter() - start) / len(LABELLED_ACTIONS)
+    print(f"local: {hits}/{len(LABELLED_ACTIONS)} correct, {elapsed * 1e6:.0f} us/action")
+
+
+def run_llm() -> None:
+    """Benchmark the LLM keyword agent"""
+    import openai
+    from llm_utils import create_chat_completion
+    from prompt_templates import PromptTemplates
+
+    openai.api_key = os.getenv("OPENAI_API_KEY", "")
+    model = os.getenv("OPENAI_API_MODEL", "gpt-3.5-turbo")
+    templates = PromptTemplates(commands_generator, CapabilitiesGenerator(), model)
+    hits = 0
+    start = time.perf_counter()
+    for action, expected in LABELLED_ACTIONS:
+        prompt = build_keyword_prompt(templates, action)
+        keywords = create_chat_completion(
+            messages=[{"role": "system", "content": prompt.system},
+                      {"role": "user", "content": prompt.build().replace("\n", " ")}],
+            model=model,
+            max_tokens=100,
+        )
+        if first_command(keywords) == expected:
+            hits += 1
+        else:
+            print(f"  llm miss: {action!r} -> {keywords}")
+    elapsed = (time.perf_counter() - start) / len(LABELLED_ACTIONS)
+    print(f"llm: {hits}/{len(LABELLED_ACTIONS)} correct, {elapsed * 1e3:.0f} ms/action")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="also benchmark the LLM keyword agent")
+    args = parser.parse_args()
+    prepare_commands_list()
+    run_local()
+    if args.llm:
+        from dotenv import load_dotenv
+        load_dotenv()
+        run_llm()
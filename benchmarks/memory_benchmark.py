@@ -0,0 +1,74 @@
+"""
+Recall and latency benchmark for the local memory backend.
+
+Compares the flat and HNSW query paths of LocalMemory against a brute
+force NumPy scan over the same vectors.
+
+Usage:
+    python -m benchmarks.memory_benchmark --vectors 5000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from memory.local import LocalMemory
+
+
+def make_vectors(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """Generate clustered unit vectors, which resemble real embeddings more than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension))
+    vectors = centres[rng.integers(0, clusters, count)] + rng.normal(scale=0.5, size=(count, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def run(vectors: int, queries: int, dimension: int, top_k: int, hnsw_threshold: int) -> None:
+    """Run the benchmark and print the results"""
+    data = make_vectors(vectors, dimension, clusters=64, seed=0)
+    query_vectors = make_vectors(queries, dimension, clusters=64, seed=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        memory = LocalMemory(directory, dimension=dimension, hnsw_threshold=hnsw_threshold)
+        start = time.perf_counter()
+        batch = 1000
+        for offset in range(0, vectors, batch):
+            memory.upsert([
+                (f"vector_{row}", data[row], {"row": row})
+                for row in range(offset, min(offset + batch, vectors))
+            ], namespace="benchmark")
+        print(f"Upserted {vectors} vectors in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        expected = []
+        for query in query_vectors:
+            scores = data @ query
+            expected.append(set(np.argsort(-scores)[:top_k].tolist()))
+        brute_force_time = (time.perf_counter() - start) / queries
+
+        for name, exact in (("flat", True), ("hnsw", False)):
+            if not exact:
+                # Build the graph outside of the timed loop
+                memory.query(query_vectors[0], top_k=top_k, namespace="benchmark")
+            hits = 0
+            start = time.perf_counter()
+            for query, truth in zip(query_vectors, expected):
+                result = memory.query(query, top_k=top_k, namespace="benchmark", exact=exact)
+                hits += len(truth & {match.metadata["row"] for match in result.matches})
+            elapsed = (time.perf_counter() - start) / queries
+            print(f"{name:>11}: recall@{top_k} {hits / (queries * top_k):.3f},"
+                  f" {elapsed * 1e6:.0f} us/query")
+        print(f"brute force: recall@{top_k} 1.000, {brute_force_time * 1e6:.0f} us/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--hnsw-threshold", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.vectors, args.queries, args.dimension, args.top_k, args.hnsw_threshold)
@@ -0,0 +1,96 @@
+"""
+Paged read_file benchmark.
+
+Creates a large Markdown notes file in a temporary workspace and compares
+reading it whole, as read_file did before paging, with reading one page,
+a line range deep inside the file and the heading outline. Checks that
+following the "More available" notes page by page, by offset and by line
+range, returns the whole file exactly once. Exits with status 1 when a
+check fails.
+
+Usage:
+    python -m benchmarks.read_file_benchmark [--sections 2000] [--lines 50]
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import tempfile
+import time
+
+from command_scripts.filesystem import read_file
+from workspace import use_workspace
+
+NEXT_OFFSET = re.compile(r"\n\[More available: read the next page with offset (\d+)\]$")
+NEXT_LINES = re.compile(r'\n\[More available: read the next page with lines "(\d+)-"\]$')
+
+
+def create_notes(sections: int, lines: int) -> str:
+    """Notes with a heading per section, a code block with a "#" comment and some non-ASCII text"""
+    parts = ["# Research notes\n"]
+    for section in range(sections):
+        parts.append(f"\n## Finding {section}\n\n```\n# not a heading\n```\n")
+        parts.extend(f"Observation {section}.{line}: plasma confinement détails ok\n" for line in range(lines))
+    return "".join(parts)
+
+
+def follow(filename: str, pattern: re.Pattern, argument: str, start) -> tuple[str, int]:
+    """Read a file page by page following the More available notes, returns the text and number of pages"""
+    texts = []
+    position = start
+    while True:
+        result = read_file(filename, **{argument: position})
+        text = result.split(" contains: ", 1)[1]
+        match = pattern.search(text)
+        texts.append(text[:match.start()] if match else text)
+        if not match:
+            return "".join(texts), len(texts)
+        position = int(match.group(1)) if argument == "offset" else f"{match.group(1)}-"
+
+
+def timed(function, *args, **kwargs) -> tuple[float, object]:
+    """Call a function, returns the milliseconds it took and its result"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def check(name: str, passed: bool, detail: str = "") -> bool:
+    """Print the outcome of a check"""
+    print(f"  {name:42} {'ok' if passed else 'FAILED'} {detail}")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=50)
+    args = parser.parse_args()
+
+    passed = True
+    notes = create_notes(args.sections, args.lines)
+    with tempfile.TemporaryDirectory() as directory, use_workspace(directory) as workspace:
+        (workspace / "notes.md").write_text(notes, encoding="utf-8")
+        print(f"notes.md: {len(notes.encode()) / 1e6:.1f} MB, {notes.count(chr(10))} lines")
+
+        whole_ms, _ = timed((workspace / "notes.md").read_text, encoding="utf-8")
+        page_ms, page = timed(read_file, "notes.md")
+        print(f"  whole file {whole_ms:.1f} ms, {len(notes)} characters;"
+              f" first page {page_ms:.2f} ms, {len(page)} characters")
+        middle = notes.count("\n") // 2
+        first_ms, _ = timed(read_file, "notes.md", lines=f"{middle}-{middle + 20}")
+        again_ms, _ = timed(read_file, "notes.md", lines=f"{middle + 20}-{middle + 40}")
+        print(f"  line range in the middle: {first_ms:.1f} ms first, {again_ms:.2f} ms with the line index")
+        outline_ms, outline = timed(read_file, "notes.md", outline=True)
+        print(f"  outline {outline_ms:.1f} ms, {len(outline)} characters")
+
+        passed &= check("pages are bounded", len(page) < 9000, f"{len(page)} characters")
+        passed &= check("outline skips code blocks", "not a heading" not in outline
+                        and f"has {args.sections + 1} headings" in outline)
+        text, pages = follow("notes.md", NEXT_OFFSET, "offset", 0)
+        passed &= check("offset pages cover the file", text == notes, f"{pages} pages")
+        text, pages = follow("notes.md", NEXT_LINES, "lines", "1-")
+        passed &= check("line pages cover the file", text == notes, f"{pages} pages")
+    print("all checks passed" if passed else "CHECKS FAILED")
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,109 @@
+"""
+Search result cache and batch search benchmark.
+
+Runs the search client against local stand-in backends that answer after
+a fixed latency, so no network access or API key is needed. Checks that
+case and spacing variants of a query are answered from the cache, that
+entries expire after the TTL, that a batch search runs its queries
+concurrently and that merged results contain every URL once, skipping a
+failing backend. Exits with status 1 when a check fails.
+
+Usage:
+    python -m benchmarks.search_benchmark [--latency 0.1]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from typing import List
+
+from command_scripts.search import SearchClient, SearchError, SearchResult
+
+QUERIES = ["nuclear fusion basics", "tokamak records", "stellarator design", "ITER schedule"]
+
+
+class StandInBackend:
+    """Answers every query with numbered results after a fixed latency"""
+
+    def __init__(self, name: str, latency: float, shared: int = 2, fail: bool = False):
+        self.name = name
+        self.latency = latency
+        # The top results every backend returns for a query, to check deduplication
+        self.shared = shared
+        self.fail = fail
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def search(self, query: str, num_results: int) -> List[SearchResult]:
+        """Return num_results results, the first ones shared with the other backends"""
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise SearchError("stand-in backend is down")
+        slug = "-".join(query.lower().split())
+        return [
+            SearchResult(
+                f"{query} result {rank}",
+                f"https://example.org/{slug}/{rank}" if rank < self.shared
+                else f"https://{self.name}.example.org/{slug}/{rank}",
+                f"Snippet {rank} for {query}",
+                self.name,
+            )
+            for rank in range(num_results)
+        ]
+
+
+def check(name: str, passed: bool, detail: str = "") -> bool:
+    """Print the outcome of a check"""
+    print(f"  {name:42} {'ok' if passed else 'FAILED'} {detail}")
+    return passed
+
+
+def run(latency: float) -> bool:
+    """Run the checks, returns whether all passed"""
+    passed = True
+    backend = StandInBackend("first", latency)
+    client = SearchClient([backend], ttl=60)
+    client.search("Nuclear  Fusion basics", 5)
+    client.search("nuclear fusion BASICS ", 5)
+    passed &= check("query variants share a cache entry", backend.calls == 1, client.stats())
+
+    expiring = SearchClient([backend], ttl=latency)
+    expiring.search("tokamak records", 5)
+    time.sleep(latency * 1.5)
+    expiring.search("tokamak records", 5)
+    passed &= check("entries expire after the TTL", expiring.misses == 2)
+
+    first, second = StandInBackend("first", latency), StandInBackend("second", latency)
+    client = SearchClient([first, second, StandInBackend("down", latency, fail=True)], ttl=60)
+    start = time.perf_counter()
+    results = client.batch_search(QUERIES, 5)
+    elapsed = time.perf_counter() - start
+    serial = latency * len(QUERIES) * 3
+    passed &= check("batch queries run concurrently", elapsed < serial / 2,
+                    f"{elapsed:.2f}s, {serial:.2f}s in series")
+
+    urls = [result.url for result in results]
+    expected = len(QUERIES) * (2 + 3 + 3)
+    passed &= check("merged results have every URL once", len(urls) == len(set(urls)) == expected,
+                    f"{len(urls)} results")
+    top = {result.url for result in results[:len(QUERIES)]}
+    passed &= check("top results of every query come first",
+                    all(f"/{'-'.join(query.lower().split())}/0" in " ".join(top) for query in QUERIES))
+
+    start = time.perf_counter()
+    client.batch_search(QUERIES, 5, backends=["first", "second"])
+    passed &= check("repeated batch is answered from the cache", time.perf_counter() - start < latency,
+                    client.stats())
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds each stand-in search takes")
+    args = parser.parse_args()
+    print("search client:")
+    sys.exit(0 if run(args.latency) else 1)
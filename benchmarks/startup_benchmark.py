@@ -0,0 +1,123 @@
+"""
+Startup time benchmark.
+
+Measures, each in a fresh interpreter:
+  - the import time of commodore and command_scripts.execute_command, and
+    which heavy dependencies the import pulled in (there should be none)
+  - the time from starting `commodore.run()` to its first LLM or embedding
+    request. The request is intercepted and the process exits, so no API
+    key or network access is needed.
+
+Runs in a temporary directory with the local memory backend and in-memory
+task storage. With --max-import-ms or --max-first-call-ms the script exits
+with status 1 when a median exceeds the limit or a heavy dependency is
+imported, so CI can track startup regressions.
+
+Usage:
+    python -m benchmarks.startup_benchmark [--runs 5] [--max-import-ms 200] [--max-first-call-ms 3000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Dependencies that must only be imported by the commands that use them
+HEAVY_MODULES = [
+    "selenium", "webdriver_manager", "bs4", "pdfminer", "duckduckgo_search",
+    "openai", "aiohttp", "pinecone", "numpy", "tiktoken", "googleapiclient",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+FIRST_CALL_SCRIPT = """
+import os
+import llm_client
+
+async def first_request(*args, **kwargs):
+    os._exit(0)
+
+llm_client.AsyncLLMClient.chat_completion = first_request
+llm_client.AsyncLLMClient.completion = first_request
+llm_client.AsyncLLMClient.embeddings = first_request
+
+import commodore
+commodore.run([])
+"""
+
+
+def run_python(script: str, cwd: str) -> subprocess.CompletedProcess:
+    """Run a script in a fresh interpreter with the repository on the path"""
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(ROOT),
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY") or "startup-benchmark",
+        "MEMORY_BACKEND": "local",
+        "TASK_STORAGE": "memory",
+        "LLM_CACHE": "off",
+        "EMBEDDING_CACHE": "False",
+    })
+    return subprocess.run([sys.executable, "-c", script], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=False)
+
+
+def import_time(module: str, cwd: str) -> Dict:
+    """Measure the import time of a module and the heavy modules it imports"""
+    result = run_python(IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES), cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def first_call_time(cwd: str) -> float:
+    """Measure the wall time from interpreter start to the first LLM request"""
+    start = time.perf_counter()
+    result = run_python(FIRST_CALL_SCRIPT, cwd)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"commodore.run() exited before its first LLM request:\n{result.stderr}")
+    return elapsed
+
+
+def main(runs: int, max_import_ms: float, max_first_call_ms: float) -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as cwd:
+        for module in ("commodore", "command_scripts.execute_command"):
+            samples: List[Dict] = [import_time(module, cwd) for _ in range(runs)]
+            median_ms = statistics.median(sample["seconds"] for sample in samples) * 1000
+            heavy = samples[-1]["heavy"]
+            print(f"import {module}: {median_ms:.1f} ms median of {runs}, heavy modules: {heavy or 'none'}")
+            if heavy or (max_import_ms and median_ms > max_import_ms):
+                failed = True
+
+        first_call_ms = statistics.median(first_call_time(cwd) for _ in range(runs)) * 1000
+        print(f"time to first LLM call: {first_call_ms:.0f} ms median of {runs}")
+        if max_first_call_ms and first_call_ms > max_first_call_ms:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=0, help="fail above this median import time")
+    parser.add_argument("--max-first-call-ms", type=float, default=0,
+                        help="fail above this median time to the first LLM call")
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.max_import_ms, args.max_first_call_ms))
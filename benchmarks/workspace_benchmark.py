@@ -0,0 +1,105 @@
+"""
+Workspace index benchmark for the filesystem commands.
+
+Creates a temporary workspace with many notes in nested directories and
+times the lookups and listings a write_file call makes, once by walking
+the disk as before the workspace index and once from the index. Also
+compares the size of a full listing with a depth limited one and with the
+delta reported after a write. Checks that the index gives the same answers
+as the disk walks, exits with status 1 when they differ.
+
+Usage:
+    python -m benchmarks.workspace_benchmark [--files 5000] [--lookups 200]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from command_scripts.filesystem import find_file, list_files
+from workspace import use_workspace
+from workspace_index import get_workspace_index
+
+
+def create_workspace(root: Path, files: int) -> list[str]:
+    """Create notes spread over topic/subtopic directories, returns their names"""
+    names = []
+    for number in range(files):
+        directory = root / f"topic_{number % 20}" / f"sub_{number % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"note_{number}.md"
+        (directory / name).write_text(f"Note {number}\n", encoding="utf-8")
+        names.append(name)
+    return names
+
+
+def walk_find(root: Path, filename: str) -> str:
+    """find_file before the workspace index"""
+    for directory, _, files in os.walk(root):
+        if filename in files:
+            return os.path.join(directory, filename)
+    return ""
+
+
+def walk_list(path: str) -> str:
+    """list_files before the workspace index"""
+    representation = ""
+    for entry in sorted(os.listdir(path)):
+        entry_path = os.path.join(path, entry)
+        if os.path.isfile(entry_path):
+            representation += "file: " + entry.replace(' ', '_') + ", "
+        elif os.path.isdir(entry_path):
+            representation += "dir: " + entry.replace(' ', '_') + " {" + walk_list(entry_path) + "}, "
+    return representation.strip().rstrip(',')
+
+
+def timed(function, *args, repeat: int = 1) -> tuple[float, object]:
+    """Call a function repeatedly, returns the mean milliseconds per call and the last result"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    correct = True
+    with tempfile.TemporaryDirectory() as directory, use_workspace(directory) as workspace:
+        names = create_workspace(workspace, args.files)
+        build_ms, _ = timed(get_workspace_index().rebuild)
+        print(f"{args.files} files, index built in {build_ms:.1f} ms")
+
+        lookups = names[::max(1, len(names) // args.lookups)] + ["missing.md"]
+        walk_ms, _ = timed(lambda: [walk_find(workspace, name) for name in lookups])
+        index_ms, _ = timed(lambda: [find_file(name) for name in lookups])
+        correct &= all(walk_find(workspace, name) == find_file(name) for name in lookups)
+        print(f"find_file: walk {walk_ms / len(lookups):.2f} ms, index {index_ms / len(lookups):.4f} ms per lookup")
+
+        walk_ms, walked = timed(walk_list, str(workspace), repeat=5)
+        index_ms, indexed = timed(list_files, repeat=5)
+        correct &= walked == indexed
+        print(f"list_files: walk {walk_ms:.1f} ms, index {index_ms:.1f} ms per listing")
+
+        index = get_workspace_index()
+        index.mark_listed()
+        (workspace / "topic_1" / "new_note.md").write_text("New\n", encoding="utf-8")
+        index.refresh(workspace / "topic_1" / "new_note.md")
+        delta = index.take_changes().describe()
+        bounded = index.summary(max_depth=1, max_tokens=0)
+        print(f"listing sizes: full {len(indexed)} characters, depth 1 {len(bounded)},"
+              f" delta after a write {len(delta)} ({delta})")
+        correct &= delta == "added topic_1/new_note.md"
+
+        refresh_ms, _ = timed(get_workspace_index().refresh, workspace / "topic_3" / "sub_3" / "note_3.md",
+                              repeat=100)
+        print(f"refresh after a write: {refresh_ms:.3f} ms")
+    print("results match" if correct else "RESULTS DIFFER")
+    sys.exit(0 if correct else 1)
@@ -25,19 +25,24 @@ class CapabilitiesGenerator:
         """
         self.capabilities.append(capability)
 
+    def get_constraints(self) -> list:
+        """
+        Return the constraints with surrounding whitespace removed.
+        """
+        return [constraint.strip() for constraint in self.constraints]
+
+    def get_capabilities(self) -> list:
+        """
+        Return the capabilities with surrounding whitespace removed.
+        """
+        return [capability.strip() for capability in self.capabilities]
+
     def get_constraints_capabilities(self) -> str:
         """
         Return a string containing the constraints and capabilities.
         """
-        constraints = ""
-        for constraint in self.constraints:
-            constraints.join(f"{constraint}; ")
-        constraints.strip('; ')
-
-        capabilities = ""
-        for capability in self.capabilities:
-            capabilities.join(f"{capability}; ")
-        capabilities.strip('; ')
+        constraints = "; ".join(self.get_constraints())
+        capabilities = "; ".join(self.get_capabilities())
 
         constraints_capabilities = f"CONSTRAINTS: {constraints}. CAPABILITIES: {capabilities}."
 
@@ -0,0 +1,216 @@
+"""Pool of long-lived WebDriver sessions shared by the browse commands"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+USER_AGENT = (
+    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"
+    " Chrome/112.0.5615.49 Safari/537.36"
+)
+
+
+@lru_cache(maxsize=None)
+def resolve_driver_path(browser_name: str) -> Optional[str]:
+    """
+    Get the driver binary for a browser, resolved once per process.
+
+    SELENIUM_DRIVER_PATH skips webdriver_manager, which otherwise checks
+    online for the driver matching the installed browser.
+
+    Args:
+        browser_name (str): "chrome", "firefox" or "safari".
+
+    Returns:
+        Optional[str]: The driver path, None for Safari which ships its own driver.
+    """
+    if os.getenv("SELENIUM_DRIVER_PATH"):
+        return os.getenv("SELENIUM_DRIVER_PATH")
+    if browser_name == "safari":
+        return None
+    if browser_name == "firefox":
+        from webdriver_manager.firefox import GeckoDriverManager
+        return GeckoDriverManager().install()
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def create_driver() -> WebDriver:
+    """Launch a browser configured by SELENIUM_WEB_BROWSER and HIDE_BROWSER"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+    from selenium.webdriver.safari.options import Options as SafariOptions
+
+    logging.getLogger("selenium").setLevel(logging.CRITICAL)
+
+    browser_name = os.getenv("SELENIUM_WEB_BROWSER", "")
+    options_available = {'chrome': ChromeOptions, 'safari': SafariOptions, 'firefox': FirefoxOptions}
+    options = options_available[browser_name]()
+    options.add_argument(USER_AGENT)
+
+    if os.getenv("HIDE_BROWSER", "False") == "True":
+        options.add_argument("--headless")  # Add headless argument to hide the browser
+
+    if browser_name == "firefox":
+        return webdriver.Firefox(executable_path=resolve_driver_path("firefox"), options=options)
+    if browser_name == "safari":
+        return webdriver.Safari(options=options)
+    return webdriver.Chrome(executable_path=resolve_driver_path("chrome"), options=options)
+
+
+def is_healthy(driver: WebDriver) -> bool:
+    """Check that a browser session still responds"""
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except Exception:  # pylint: disable=broad-except
+        return False
+
+
+def quit_driver(driver: WebDriver) -> None:
+    """Close a browser session, ignoring sessions that already died"""
+    try:
+        driver.quit()
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+
+class BrowserPool:
+    """
+    A bounded pool of long-lived browser sessions.
+
+    checkout() hands each caller its own session, launching one when none
+    is idle and the pool is not full, otherwise waiting for a checkin.
+    Sessions are health checked on checkout and after a failed use, and
+    recycled after max_pages pages.
+    """
+
+    def __init__(self, size: int = 2, max_pages: int = 50, factory: Callable[[], WebDriver] = create_driver):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.factory = factory
+        # Idle sessions with the number of pages they loaded
+        self.idle: Deque[Tuple[WebDriver, int]] = deque()
+        self.pages: Dict[int, int] = {}
+        self.open = 0
+        self.condition = threading.Condition()
+        self.launched = 0
+        self.recycled = 0
+        self.checkouts = 0
+
+    def checkout(self, timeout: Optional[float] = None) -> WebDriver:
+        """
+        Take a session from the pool.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait for a free session.
+
+        Returns:
+            WebDriver: A healthy session, owned by the caller until checkin().
+
+        Raises:
+            TimeoutError: If no session became free in time.
+        """
+        with self.condition:
+            while True:
+                if self.idle:
+                    driver, pages = self.idle.popleft()
+                    break
+                if self.open < self.size:
+                    self.open += 1
+                    driver, pages = None, 0
+                    break
+                if not self.condition.wait(timeout):
+                    raise TimeoutError("No browser session became free in time")
+            self.checkouts += 1
+
+        if driver is not None and not is_healthy(driver):
+            quit_driver(driver)
+            with self.condition:
+                self.recycled += 1
+            driver = None
+        if driver is None:
+            try:
+                driver = self.factory()
+            except Exception:
+                with self.condition:
+                    self.open -= 1
+                    self.condition.notify()
+                raise
+            with self.condition:
+                self.launched += 1
+            pages = 0
+        self.pages[id(driver)] = pages
+        return driver
+
+    def checkin(self, driver: WebDriver, failed: bool = False) -> None:
+        """
+        Return a session to the pool after loading a page.
+
+        Args:
+            driver (WebDriver): The session from checkout().
+            failed (bool): The page load raised, check the session before reusing it.
+        """
+        pages = self.pages.pop(id(driver), 0) + 1
+        if pages >= self.max_pages or (failed and not is_healthy(driver)):
+            quit_driver(driver)
+            with self.condition:
+                self.recycled += 1
+                self.open -= 1
+                self.condition.notify()
+            return
+        with self.condition:
+            self.idle.append((driver, pages))
+            self.condition.notify()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None) -> Iterator[WebDriver]:
+        """Check out a session for the duration of a with block"""
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        except BaseException:
+            self.checkin(driver, failed=True)
+            raise
+        self.checkin(driver)
+
+    def close(self) -> None:
+        """Quit every idle session"""
+        with self.condition:
+            idle = list(self.idle)
+            self.idle.clear()
+            self.open -= len(idle)
+        for driver, _ in idle:
+            quit_driver(driver)
+
+    def stats(self) -> str:
+        """Describe how often sessions were reused"""
+        return (f"Browser pool: {self.checkouts} checkouts, {self.launched} launches,"
+                f" {self.recycled} recycled, {self.open}/{self.size} open")
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Get the browser pool configured by BROWSER_POOL_SIZE and BROWSER_MAX_PAGES"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+                max_pages=int(os.getenv("BROWSER_MAX_PAGES", "50")),
+            )
+            atexit.register(_pool.close)
+        return _pool
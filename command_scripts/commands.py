@@ -1,49 +1,93 @@
 """Module for adding commands to the commands list"""
+import os
 from command_scripts.commandsgenerator import CommandsGenerator
+from command_scripts.filesystem import(
+    read_file,
+    write_file,
+    append_file,
+    delete_file,
+    create_directory,
+    remove_directory,
+    move_directory,
+    bounded_listing
+)
+from command_scripts.internet import(
+    google,
+    browse_website
+)
 
 commands_generator = CommandsGenerator()
 
+# Arguments that may also be given as a list of names
+NAME_OR_LIST = (str, list)
+
 def prepare_commands_list() -> None:
     """
-    Prepare the commands list by adding available commands
-    This will be overhauled in the future to add commands from a list
+    Prepare the commands list by registering the built-in commands and
+    any plugin modules listed in COMMAND_PLUGINS (comma separated)
     """
     commands_generator.add_command(
-    ["Read an existing file", "read_file", {"file": "<file_name>"}]
+    ["Read an existing file, one page at a time", "read_file", {"file": "<file_name>"}],
+    lambda file, offset=None, limit=None, lines=None, outline=False: read_file(file, offset, limit, lines, outline),
+    optional_arguments={
+        "offset": "<byte_offset_to_start_at>",
+        "limit": "<max_bytes_to_read>",
+        "lines": "<line_range_like_10-50>",
+        "outline": "<true_to_list_markdown_headings_only>"
+    },
+    types={"offset": (int, str), "limit": (int, str), "lines": (int, str), "outline": (bool, str)}
     )
     commands_generator.add_command(
     ["Write to a file and create it if it doesn't exist",
      "write_file",
-     {"file": "<file_name>", "text": "<text_to_write>"}]
+     {"file": "<file_name>", "text": "<text_to_write>"}],
+    lambda file, text: write_file(file, text)
     )
     commands_generator.add_command(
-    ["Append to a file", "append_file", {"file": "<file_name>", "text": "<text_to_append>"}
-    ])
+    ["Append to a file", "append_file", {"file": "<file_name>", "text": "<text_to_append>"}],
+    lambda file, text: append_file(file, text)
+    )
     commands_generator.add_command(
-    ["Delete a file", "delete_file", {"file": "<file_name>"}
-    ])
+    ["Delete a file", "delete_file", {"file": "<file_name>"}],
+    lambda file: delete_file(file),
+    types={"file": NAME_OR_LIST}
+    )
     commands_generator.add_command(
-    ["Make a new directory", "create_directory", {"directory": "<directory>"}
-    ])
+    ["Make a new directory", "create_directory", {"directory": "<directory>"}],
+    lambda directory: create_directory(directory),
+    types={"directory": NAME_OR_LIST}
+    )
     commands_generator.add_command(
-    ["Remove an existing directory", "remove_directory", {"directory": "<directory>"}
-    ])
+    ["Remove an existing directory", "remove_directory", {"directory": "<directory>"}],
+    lambda directory: remove_directory(directory),
+    types={"directory": NAME_OR_LIST}
+    )
     commands_generator.add_command(
     ["Move an existing directory",
      "move_directory",
-     {"directory": "<source>", "destination": "<destination>"}
-    ])
+     {"directory": "<source>", "destination": "<destination>"}],
+    lambda directory, destination: move_directory(directory, destination),
+    types={"directory": NAME_OR_LIST}
+    )
     commands_generator.add_command(
-    ["List all in all directories", "list_files", {}
-    ])
+    ["List all in all directories", "list_files", {}],
+    lambda: bounded_listing()
+    )
     commands_generator.add_command(
-    ["Search Google for a search phrase", "google", {"search": "<search_term>"}
-    ])
+    ["Search Google for a search phrase, or for a list of phrases at once",
+     "google",
+     {"search": "<search_term_or_list_of_search_terms>"}],
+    lambda search: google(search),
+    types={"search": NAME_OR_LIST}
+    )
     commands_generator.add_command(
     ["Browse a website URL with a question about the page",
      "browse_website",
-     {"url": "<url_to_browse>", "search": "<general_question_about_website>"}
-    ])
+     {"url": "<url_to_browse>", "search": "<general_question_about_website>"}],
+    lambda url, search: browse_website(url, search)
+    )
     commands_generator.add_command(
-    ["No Command", "no_command", {}
-    ])
+    ["No Command", "no_command", {}],
+    lambda: "ERROR: COMMAND NOT FOUND"
+    )
+    commands_generator.registry.load_plugins(os.getenv("COMMAND_PLUGINS", "").split(","))
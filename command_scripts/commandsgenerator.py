@@ -1,20 +1,33 @@
-"""Module to define """
+"""Module to define the commands available to the AI"""
+from command_scripts.registry import CommandRegistry
+
+
 class CommandsGenerator:
     """
     A class for generating the commands available to the AI
     """
     def __init__(self):
-        self.commands = []
+        self.registry = CommandRegistry()
         self.command_format = '{"command_name": {"argument": "value"}}'
 
-    def add_command(self, command: str) -> None:
-        """Add a command"""
-        self.commands.append(command)
+    def add_command(self, command: list, handler, optional_arguments: dict = None,
+                    types: dict = None) -> None:
+        """Add a command from a [description, name, arguments] entry and its handler"""
+        description, name, arguments = command
+        self.registry.register(name, handler, description, arguments, optional_arguments, types)
+
+    @property
+    def commands(self) -> list:
+        """The commands as [description, name, arguments] entries"""
+        return self.get_commands()
 
-    def get_commands(self) -> str:
-        """Get the currently available commands as a list"""
+    def get_commands(self) -> list:
+        """Get the currently available commands as a list, rendered from the registry"""
         commands_list = []
-        for command in self.commands:
-            commands_list.append(command)
+        for command in self.registry:
+            arguments = dict(command.arguments)
+            arguments.update({name: f"{placeholder} (optional)"
+                              for name, placeholder in command.optional_arguments.items()})
+            commands_list.append([command.description, command.name, arguments])
 
         return commands_list
@@ -1,68 +1,33 @@
 """Module for executing a given command"""
 import ast
+from typing import Union
 from command_scripts.commands import commands_generator
-from command_scripts.filesystem import(
-    read_file,
-    write_file,
-    append_file,
-    delete_file,
-    create_directory,
-    remove_directory,
-    move_directory,
-    list_files
-)
-from command_scripts.internet import(
-    google,
-    browse_website
-)
 
-def execute_command(command: str) -> str:
+def execute_command(command: Union[str, dict]) -> str:
     """
     Execute a command.
 
     Args:
-    command (str): The command to execute.
+    command (Union[str, dict]): The command to execute, as a dict or its string representation.
 
     Returns:
     String describing the result of the executed command.
     """
-    try:
-        command = ast.literal_eval(command)
-    except(SyntaxError, ValueError):
-        return "ERROR: INVALID ARGUMENTS"
-    command_name = list(command.keys())[0]
-    arguments = list(command.values())[0]
+    if isinstance(command, str):
+        try:
+            command = ast.literal_eval(command)
+        except(SyntaxError, ValueError):
+            return "ERROR: INVALID ARGUMENTS: the command is not a valid object"
+    if not isinstance(command, dict) or len(command) != 1:
+        return ("ERROR: INVALID ARGUMENTS: the command must be an object with exactly one command"
+                f" name, like {commands_generator.command_format}")
+    command_name, arguments = next(iter(command.items()))
 
-    command_found = False
-    for commands in commands_generator.commands:
-        if command_name in commands[1]:
-            command_found = True
-            break
-        continue
-    try:
-        if not command_found:
-            return "ERROR: COMMAND NOT FOUND"
-        if command_name == "read_file":
-            return read_file(arguments["file"])
-        if command_name == "write_file":
-            return write_file(arguments["file"], arguments["text"])
-        if command_name == "append_file":
-            return append_file(arguments["file"], arguments["text"])
-        if command_name == "delete_file":
-            return delete_file(arguments["file"])
-        if command_name == "create_directory":
-            return create_directory(arguments["directory"])
-        if command_name == "remove_directory":
-            return remove_directory(arguments["directory"])
-        if command_name == "move_directory":
-            return move_directory(arguments["directory"], arguments["destination"])
-        if command_name == "list_files":
-            return list_files()
-        if command_name == "google":
-            return google(arguments["search"])
-        if command_name == "browse_website":
-            return browse_website(arguments["url"], arguments["search"])
-        if command_name == "no_command":
-            return "ERROR: COMMAND NOT FOUND"
-    except KeyError:
-        return "ERROR: INVALID ARGUMENTS"
+    registered_command = commands_generator.registry.get(command_name)
+    if registered_command is None:
+        return f"ERROR: COMMAND NOT FOUND: {command_name}"
+
+    error = registered_command.validate(arguments)
+    if error:
+        return error
+    return registered_command.execute(arguments)
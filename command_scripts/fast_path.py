@@ -0,0 +1,205 @@
+"""Rule-based translation of unambiguous actions into commands"""
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+URL = re.compile(r"https?://[^\s\"'<>()\[\]]+")
+FILE_NAME = r"[\"'`]?(?P<file>[\w./-]+\.[A-Za-z0-9]{1,5})[\"'`]?"
+NAME = r"[\"'`]?(?P<name>[\w./-]+)[\"'`]?"
+# Extensions of the documents the agent reads and writes
+DOCUMENT_EXTENSIONS = frozenset((
+    "md", "markdown", "txt", "pdf", "json", "csv", "tsv", "html", "htm", "xml", "yaml", "yml", "log",
+    "rst", "tex", "doc", "docx", "rtf", "ini", "cfg", "toml", "py", "js", "ts", "sh",
+))
+# Names that look like a web address rather than a file, such as www.iter.org or wikipedia.org
+DOMAIN = re.compile(
+    r"^(?:www\.|[\w-]+\.)+(?:com|org|net|edu|gov|io|ai|co|uk|de|fr|eu|info|dev|app|int|us|ca|au|jp)$", re.I
+)
+BROWSE_VERB = re.compile(
+    r"^(?:i will |i'll |let me |next,? )?"
+    r"(?:browse|visit|read|open|go to|navigate to|check|explore|access|scrape|review|look at)\b", re.I
+)
+QUESTION = re.compile(
+    r"\b(?:to (?:find|learn|get|gather|understand|see|determine|identify|extract|collect)"
+    r"|for|about|regarding|on)\b\s+(?P<question>.+)$", re.I
+)
+# Words that suggest more than one action, which the LLM translator handles better. A plain "and"
+# counts when a second verb phrase follows it
+MULTIPLE_ACTIONS = re.compile(
+    r"\b(and then|then|after that|afterwards|also|followed by|after|once|before|until)\b|;"
+    r"|\b\w+ing (?:it|them) (?:into|to|with)\b"
+    r"|\band (?:i will |i'll |to )?(?:write|save|store|record|append|add|update|read|open|browse|visit"
+    r"|go to|search|look up|google|create|make|delete|remove|move|list|summari[sz]e|compile|check|review"
+    r"|compare|analy[sz]e|use|send)\b",
+    re.I
+)
+SEARCH = re.compile(
+    r"^(?:i will |i'll |let me |next,? )?(?:search|look up|google|query)"
+    r"(?: (?:the internet|the web|google|online|the net))?(?: (?:for|about|on))? (?P<query>.+?)"
+    r"(?: (?:on|using) (?:the internet|the web|google|online))?\.?$", re.I
+)
+READ_FILE = re.compile(
+    r"^(?:i will |i'll |let me )?(?:read|open|review) (?:the |my )?(?:existing )?(?P<file_word>file )?"
+    + FILE_NAME + r"(?P<file_suffix> file)?(?:\s.*)?$", re.I
+)
+# Deleting only matches the whole action, "delete [the] [file] <name> [file]", nothing after the name
+DELETE_FILE = re.compile(
+    r"^(?:i will |i'll |let me )?(?:delete|remove) (?:the )?(?P<file_word>file )?" + FILE_NAME
+    + r"(?: file)?\.?$",
+    re.I
+)
+CREATE_DIRECTORY = re.compile(
+    r"^(?:i will |i'll |let me )?(?:create|make) (?:a )?(?:new )?(?:directory|folder)"
+    r" (?:called |named )?" + NAME + r"\.?$", re.I
+)
+LIST_FILES = re.compile(
+    r"^(?:i will |i'll |let me )?list (?:all )?(?:of )?(?:the |my )?(?:current )?files\b.*$", re.I
+)
+
+Rule = Callable[[str], Optional[Tuple[Dict, float]]]
+
+
+def _first_sentence(action: str) -> str:
+    """Keep only the first sentence, without splitting inside URLs or file names"""
+    action = " ".join(action.split())
+    match = re.search(r"(?<=[.!?])\s+(?=[A-Z])", action)
+    return action[:match.start()] if match else action
+
+
+def is_file_name(name: str, said_file: bool) -> Optional[bool]:
+    """
+    Check whether a name from an action is a workspace file.
+
+    Returns:
+        Optional[bool]: True for a document extension or when the action says "file",
+        False for an unknown extension, None for numbers and web addresses, which are never files.
+    """
+    if DOMAIN.match(name) or re.fullmatch(r"[\d.,]+", name):
+        return None
+    return said_file or name.rsplit(".", 1)[-1].lower() in DOCUMENT_EXTENSIONS
+
+
+def browse_rule(action: str) -> Optional[Tuple[Dict, float]]:
+    """Translate "browse <url> to find <question>" style actions"""
+    urls = URL.findall(action)
+    if len(set(urls)) != 1 or not BROWSE_VERB.match(action):
+        return None
+    url = urls[0].rstrip(".,;:!?")
+    question_match = QUESTION.search(action.replace(urls[0], " "))
+    question = " ".join(question_match.group("question").split()).strip(" .") if question_match else ""
+    if not question:
+        # Without an explicit question the LLM translator should work out what to look for
+        return {"browse_website": {"url": url, "search": action}}, 0.5
+    return {"browse_website": {"url": url, "search": question}}, 0.95
+
+
+def search_rule(action: str) -> Optional[Tuple[Dict, float]]:
+    """Translate "search the internet for <query>" style actions"""
+    if URL.search(action):
+        return None
+    match = SEARCH.match(action)
+    if not match:
+        return None
+    query = match.group("query").strip(" .\"'")
+    if not query:
+        return None
+    return {"google": {"search": query}}, 0.9
+
+
+def read_file_rule(action: str) -> Optional[Tuple[Dict, float]]:
+    """Translate "read the file <name>" style actions"""
+    if URL.search(action):
+        return None
+    match = READ_FILE.match(action)
+    if not match:
+        return None
+    is_file = is_file_name(match.group("file"), bool(match.group("file_word") or match.group("file_suffix")))
+    if is_file is None:
+        return None
+    # Unknown extensions are left to the LLM translator
+    return {"read_file": {"file": match.group("file")}}, 0.9 if is_file else 0.6
+
+
+def delete_file_rule(action: str) -> Optional[Tuple[Dict, float]]:
+    """Translate "delete the file <name>" style actions"""
+    match = DELETE_FILE.match(action)
+    if not match or not is_file_name(match.group("file"), bool(match.group("file_word"))):
+        return None
+    return {"delete_file": {"file": match.group("file")}}, 0.9
+
+
+def create_directory_rule(action: str) -> Optional[Tuple[Dict, float]]:
+    """Translate "create a directory called <name>" style actions"""
+    match = CREATE_DIRECTORY.match(action)
+    if not match:
+        return None
+    return {"create_directory": {"directory": match.group("name").rstrip(".")}}, 0.9
+
+
+def list_files_rule(action: str) -> Optional[Tuple[Dict, float]]:
+    """Translate "list the files" style actions"""
+    if not LIST_FILES.match(action):
+        return None
+    return {"list_files": {}}, 0.95
+
+
+DEFAULT_RULES: List[Rule] = [
+    browse_rule,
+    search_rule,
+    read_file_rule,
+    delete_file_rule,
+    create_directory_rule,
+    list_files_rule,
+]
+
+
+class FastPathTranslator:
+    """
+    Translates unambiguous execution agent actions into commands without
+    an LLM call.
+
+    Each rule returns a command dict and a confidence. The first command
+    at or above min_confidence is used, otherwise the action is left to
+    the LLM command translator. Hit counters show how many translations
+    the fast path saved.
+    """
+
+    def __init__(self, command_names: List[str], rules: Optional[List[Rule]] = None,
+                 min_confidence: float = 0.9):
+        self.command_names = set(command_names)
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.min_confidence = min_confidence
+        self.hits = 0
+        self.misses = 0
+
+    def translate(self, action: str) -> Optional[Dict]:
+        """
+        Translate an action into a command.
+
+        Args:
+            action (str): The execution agent's action.
+
+        Returns:
+            Optional[Dict]: The command dict, or None if the LLM translator should be used.
+        """
+        sentence = _first_sentence(action.strip())
+        # Check the whole action, a later sentence may add a second action
+        if not MULTIPLE_ACTIONS.search(URL.sub(" ", action)):
+            for rule in self.rules:
+                translated = rule(sentence)
+                if translated is None:
+                    continue
+                command, confidence = translated
+                if confidence >= self.min_confidence and next(iter(command)) in self.command_names:
+                    self.hits += 1
+                    return command
+        self.misses += 1
+        return None
+
+    def stats(self) -> str:
+        """Describe how many command translations the fast path handled"""
+        attempts = self.hits + self.misses
+        hit_rate = self.hits / attempts if attempts else 0.0
+        return (f"Fast path: {self.hits}/{attempts} actions translated locally ({hit_rate:.0%}),"
+                f" {self.hits} LLM translation calls saved")
@@ -1,10 +1,10 @@
 """Module for filesystem commands"""
 import os
-from typing import List, Union
-import fnmatch
+from typing import List, Tuple, Union
 import shutil
-from pdfminer.high_level import extract_text
-from workspace import path_in_workspace, WORKSPACE_PATH
+from file_pages import is_markdown, markdown_outline, open_mapped, read_bytes, read_lines
+from workspace import get_workspace, path_in_workspace
+from workspace_index import get_workspace_index, truncate_listing
 
 # Ensure lower_snake_case filenames
 def format_filename(filename):
@@ -31,19 +31,30 @@ def is_pdf(file_path):
         file_header = file.read(5)
     return file_header == b'%PDF-'
 
-def list_files(path: str = WORKSPACE_PATH, level: int = 0) -> str:
+def list_files(path: str = None, level: int = 0) -> str:
     """
     Generate a human-readable one-line JSON-like representation of a filesystem,
     starting from the given path.
 
+    Listings inside the workspace are rendered from the workspace index
+    without touching the disk.
+
     Args:
         path (str, optional): The starting path of the filesystem representation.
-        Defaults to WORKSPACE_PATH.
+        Defaults to the current workspace.
         level (int, optional): The current level of indentation. Defaults to 0.
 
     Returns:
         str: The filesystem representation as a formatted string.
     """
+    index = get_workspace_index()
+    path = path or get_workspace()
+    if index.relative(path) is not None:
+        representation = index.render(path)
+        if representation is None:
+            return "COMMAND_ERROR: Directory does not exist, cannot list files"
+        return representation
+
     if not os.path.exists(path):
         return "COMMAND_ERROR: Directory does not exist, cannot list files"
 
@@ -66,63 +77,165 @@ def list_files(path: str = WORKSPACE_PATH, level: int = 0) -> str:
         return ""
     return representation.strip().rstrip(',')
 
-def find_file(filename: str, path: str = WORKSPACE_PATH) -> str:
-    """Recursively search for a file with the given filename in the filesystem.
+def workspace_listing() -> str:
+    """
+    Describe the workspace for a filesystem command result.
+
+    With WORKSPACE_LISTING=delta (the default) only the changes since the
+    last listing are reported, the first listing after the workspace was
+    scanned is a full one. Full listings show WORKSPACE_LISTING_DEPTH levels
+    of directories and are cut at WORKSPACE_LISTING_TOKENS tokens.
+
+    Returns:
+        str: The description, to append to the command result.
+    """
+    index = get_workspace_index()
+    max_tokens = int(os.getenv("WORKSPACE_LISTING_TOKENS", "500"))
+    if os.getenv("WORKSPACE_LISTING", "delta") == "delta":
+        changes = index.take_changes()
+        if changes is not None:
+            description = truncate_listing(changes.describe(), max_tokens, len(index.files))
+            return f"Changes to your files: {description}."
+    listing = bounded_listing()
+    index.mark_listed()
+    return f"Your current files are now: {listing}"
+
+def bounded_listing() -> str:
+    """List the workspace limited by WORKSPACE_LISTING_DEPTH and WORKSPACE_LISTING_TOKENS"""
+    depth = os.getenv("WORKSPACE_LISTING_DEPTH", "3")
+    return get_workspace_index().summary(
+        max_depth=int(depth) if depth else None,
+        max_tokens=int(os.getenv("WORKSPACE_LISTING_TOKENS", "500")),
+    )
+
+def find_file(filename: str, path: str = None) -> str:
+    """Search for a file with the given filename in the workspace index.
 
     Args:
         filename (str): The name of the file to search for.
-        path (str, optional): The path to start the search from. Defaults to WORKSPACE_PATH.
+        path (str, optional): The workspace to search. Defaults to the current workspace.
 
     Returns:
         str: The path to the found file or an empty string if the file is not found.
     """
-    for root, _, files in os.walk(path):
-        if filename in files:
-            return os.path.join(root, filename)
+    index = get_workspace_index(path)
+    found = index.find(filename)
+    if found:
+        return os.path.join(index.root, found[0])
 
     return ""
 
-def find_files(path: str = WORKSPACE_PATH, pattern: str = None) -> List[str]:
-    """Find files matching a specified pattern"""
-    matched_files = []
-    if not pattern:
-        use_pattern = False
-    for root, _, files in os.walk(path):
-        for filename in files:
-            if not use_pattern:
-                pattern = filename
-            if fnmatch.fnmatch(filename, pattern):
-                matched_files.append(os.path.relpath(os.path.join(root, filename), WORKSPACE_PATH))
-    return matched_files
-
-def read_file(filename: str) -> str:
-    """Read a file and return the contents
+def find_files(path: str = None, pattern: str = None) -> List[str]:
+    """Find files matching a specified pattern
+
+    Args:
+        path (str, optional): The workspace to search. Defaults to the current workspace.
+        pattern (str, optional): A shell pattern matched against file names, or against
+        paths relative to the workspace when it contains a "/". Defaults to all files.
+
+    Returns:
+        List[str]: The paths of the matching files, relative to the workspace.
+    """
+    return get_workspace_index(path).match(pattern or "*")
+
+def parse_line_range(lines: str):
+    """Parse a line range like "10-50", "10-" or "10" into the first and last line (None = end of file)"""
+    first, separator, last = str(lines).partition("-")
+    first = int(first.strip())
+    if not separator:
+        return first, first
+    return first, int(last) if last.strip() else None
+
+def read_file(filename: str, offset: Union[int, str] = None, limit: Union[int, str] = None,
+              lines: str = None, outline: Union[bool, str] = False) -> str:
+    """Read one page of a file and return its contents
+
+    Files are read through mmap, only the requested page is loaded. Without
+    offset or lines the first page is returned, a "More available" note tells
+    where the next page starts.
 
     Args:
         filename (str): The name of the file to read
+        offset (int, optional): The byte offset to start reading at. Defaults to 0.
+        limit (int, optional): The maximum number of bytes to return,
+        at most READ_FILE_PAGE_BYTES. Defaults to READ_FILE_PAGE_BYTES.
+        lines (str, optional): A line range to read instead of an offset, like "10-50".
+        outline (bool, optional): List the headings of a Markdown file instead of its contents.
 
     Returns:
-        str: The contents of the file
+        str: The contents of the page
     """
+    page_bytes = int(os.getenv("READ_FILE_PAGE_BYTES", "8000"))
+    try:
+        offset = int(offset) if offset not in (None, "") else 0
+        limit = min(int(limit), page_bytes) if limit not in (None, "") else page_bytes
+        line_range = parse_line_range(lines) if lines not in (None, "") else None
+    except ValueError:
+        return "COMMAND_ERROR: offset and limit must be whole numbers and lines a range like 10-50"
+    outline = str(outline).lower() in ("true", "yes", "1")
+
     try:
         formatted_filename = format_filename(filename)
         filepath = path_in_workspace(formatted_filename)
+        if outline and not is_markdown(filepath):
+            return "COMMAND_ERROR: An outline is only available for Markdown files"
         # Check if the file is a PDF and extract text if so
         if is_pdf(filepath):
+            from pdfminer.high_level import extract_text
+
             text = extract_text(filepath)
             if not text:
                 return "COMMAND_ERROR: Could not extract text from PDF"
-            else:
-                return text
-        else:
-            with open(filepath, "r", encoding='utf-8') as file:
-                content = file.read()
-            if content == "":
+            return read_page(formatted_filename, text.encode("utf-8"), None, offset, limit, line_range)
+        with open_mapped(filepath) as (data, key):
+            if not data:
                 return "File contains no text"
-            return f"File {formatted_filename} contains: {content}"
+            if outline:
+                return describe_outline(formatted_filename, markdown_outline(data, key), limit)
+            return read_page(formatted_filename, data, key, offset, limit, line_range)
     except Exception as exc:
         return handle_file_error("read", filename, str(exc))
 
+def read_page(formatted_filename: str, data, key, offset: int, limit: int, line_range) -> str:
+    """Describe the requested page of a file, with a note on how to read the next one"""
+    try:
+        if line_range:
+            page = read_lines(data, line_range[0], line_range[1], limit, key)
+        else:
+            page = read_bytes(data, offset, limit)
+    except ValueError as exc:
+        return f"COMMAND_ERROR: Cannot read {formatted_filename}, {exc}"
+
+    if line_range and page.next_offset is not None:
+        # The line is longer than a page, the rest of it can only be read by offset
+        position = f"start of line {page.start} of {page.total}"
+        next_page = f"offset {page.next_offset}"
+    elif line_range:
+        position = f"lines {page.start}-{page.end} of {page.total}"
+        next_page = f'lines "{page.end + 1}-"'
+    elif page.start == 0 and not page.more:
+        return f"File {formatted_filename} contains: {page.text}"
+    else:
+        position = f"bytes {page.start}-{page.end} of {page.total}"
+        next_page = f"offset {page.end}"
+    result = f"File {formatted_filename} ({position}) contains: {page.text}"
+    if page.more:
+        result += f"\n[More available: read the next page with {next_page}]"
+    return result
+
+def describe_outline(formatted_filename: str, headings: List[Tuple[int, int, str]], limit: int) -> str:
+    """List the headings of a Markdown file with their line numbers, within limit bytes"""
+    if not headings:
+        return f"File {formatted_filename} has no headings"
+    result = f"File {formatted_filename} has {len(headings)} headings (read a section with lines):"
+    for shown, (line, level, title) in enumerate(headings):
+        entry = f"\nline {line}: {'  ' * (level - 1)}{'#' * level} {title}"
+        if len(result) + len(entry) > limit:
+            result += f"\n[{len(headings) - shown} more headings]"
+            break
+        result += entry
+    return result
+
 def write_file(filename: str, text: str) -> str:
     """Write text to a file
 
@@ -148,8 +261,9 @@ def write_file(filename: str, text: str) -> str:
 
         with open(filepath, "w", encoding="utf-8") as file:
             file.write(text)
+        get_workspace_index().refresh(filepath)
         return(f"File {formatted_filename} written to successfully."
-        f" Your current files are now: {list_files(WORKSPACE_PATH)}")
+        f" {workspace_listing()}")
     except Exception as exc:
         return handle_file_error("write", filename, str(exc))
 
@@ -177,9 +291,10 @@ def append_file(filename: str, text: str) -> str:
 
         with open(filepath, "a", encoding="utf-8") as file:
             file.write(text)
+        get_workspace_index().refresh(filepath)
 
         return(f"Text appended to {filename} successfully."
-        f" Your current files are now: {list_files(WORKSPACE_PATH)}")
+        f" {workspace_listing()}")
     except Exception as exc:
         return handle_file_error("append", filename, str(exc))
 
@@ -192,18 +307,25 @@ def delete_file(filename: Union[str, List]) -> str:
         errors = []
         for file in filename:
             formatted_filename = format_filename(file)
-            found_filepaths = find_files(formatted_filename)
-            if not found_filepaths:
-                errors.append(f"Error: File {file} not found.")
-                continue
-            for found_filepath in found_filepaths:
-                os.remove(found_filepath)
-                files_deleted.append(os.path.basename(found_filepath))
-
+            filepath = path_in_workspace(formatted_filename)
+            if not os.path.isfile(filepath):
+                # Fall back to a file of that name elsewhere in the workspace, if there is exactly one
+                found_filepaths = find_files(pattern=formatted_filename)
+                if len(found_filepaths) > 1:
+                    errors.append(f"Error: File {file} is ambiguous, use one of {found_filepaths}.")
+                    continue
+                if not found_filepaths:
+                    errors.append(f"Error: File {file} not found.")
+                    continue
+                filepath = path_in_workspace(found_filepaths[0])
+            os.remove(filepath)
+            get_workspace_index().refresh(filepath)
+            files_deleted.append(os.path.basename(filepath))
+
+        response = (f"Files {files_deleted} deleted successfully."
+                    f" {workspace_listing()}")
         if errors:
-            response = "COMMAND_ERROR: Errors encountered:\n" + "\n".join(errors)
-        response.join(f"\nFiles {files_deleted} deleted successfully."
-                      f" Your current files are now: {list_files(WORKSPACE_PATH)}")
+            response = "COMMAND_ERROR: Errors encountered:\n" + "\n".join(errors) + "\n" + response
         return response
     except Exception as exc:
         return handle_file_error("delete", filename, str(exc))
@@ -218,9 +340,10 @@ def create_directory(directory: Union[str, List]):
             dir = format_filename(dir)
             dir_path = path_in_workspace(dir)
             os.makedirs(dir_path, exist_ok=True)
+            get_workspace_index().refresh(dir_path)
             directories_created.append(os.path.basename(dir))
         return(f"Directories '{directories_created}' created successfully."
-               f" Your current files are now: {list_files(WORKSPACE_PATH)}")
+               f" {workspace_listing()}")
     except Exception as exc:
         return handle_file_error("create", directory, str(exc))
 
@@ -235,13 +358,16 @@ def remove_directory(directory: Union[str, List]):
             dir = format_filename(dir)
             dir_path = path_in_workspace(dir)
             if not os.path.isdir(dir_path):
-                errors.append(dir)
-            os.removedirs(dir_path)
+                errors.append(f"Error: Directory {dir} not found.")
+                continue
+            # rmdir, removedirs would also remove the workspace once it is empty
+            os.rmdir(dir_path)
+            get_workspace_index().refresh(dir_path)
             directories_removed.append(os.path.basename(dir))
+        response = (f"Directories '{directories_removed}' removed successfully."
+                    f" {workspace_listing()}")
         if errors:
-            response = "COMMAND_ERROR: Errors encountered:\n" + "\n".join(errors)
-        response.join(f"\nDirectories '{directories_removed}' removed successfully."
-                      f" Your current files are now: {list_files(WORKSPACE_PATH)}")
+            response = "COMMAND_ERROR: Errors encountered:\n" + "\n".join(errors) + "\n" + response
         return response
     except Exception as exc:
         return handle_file_error("remove", directory, str(exc))
@@ -252,22 +378,25 @@ def move_directory(src_directory: Union[str, List], dest_directory: str):
         if isinstance(src_directory, str):
             src_directory = [src_directory]
 
-            dirs_moved = []
-            errors = []
-
-            for dir in src_directory:
-                dir = format_filename(dir)
-                src_path = path_in_workspace(dir)
-                dest_path = path_in_workspace(dest_directory)
-                if not os.path.isdir(src_path):
-                    errors.append(dir)
-                shutil.move(src_path, dest_path)
-                dirs_moved.append(os.path.basename(dir))
-            if errors:
-                response = "COMMAND_ERROR: Errors encountered:\n" + "\n".join(errors)
-            response.join(f"Directories '{dirs_moved}' moved successfully."
-                          f" Your current files are now: {list_files(WORKSPACE_PATH)}")
-            return response
+        dirs_moved = []
+        errors = []
+
+        for dir in src_directory:
+            dir = format_filename(dir)
+            src_path = path_in_workspace(dir)
+            dest_path = path_in_workspace(dest_directory)
+            if not os.path.isdir(src_path):
+                errors.append(f"Error: Directory {dir} not found.")
+                continue
+            shutil.move(src_path, dest_path)
+            get_workspace_index().refresh(src_path)
+            get_workspace_index().refresh(dest_path)
+            dirs_moved.append(os.path.basename(dir))
+        response = (f"Directories '{dirs_moved}' moved successfully."
+                    f" {workspace_listing()}")
+        if errors:
+            response = "COMMAND_ERROR: Errors encountered:\n" + "\n".join(errors) + "\n" + response
+        return response
     except Exception as exc:
         return handle_file_error("move", src_directory, str(exc))
 
@@ -284,7 +413,7 @@ def handle_file_error(operation: str, filename: str, error: str) -> str:
         str: The full error message containing the operation,
         filename, error, and current filesystem.
     """
-    current_filesystem = list_files(WORKSPACE_PATH)
+    current_filesystem = bounded_listing()
     error_message = (f"COMMAND_ERROR: Error trying to {operation} {filename}"
                      f" - File may not exist. Current filesystem:\n{current_filesystem}\n"
                      f"Error: {error}")
@@ -2,29 +2,34 @@ from __future__ import annotations
 
 import json
 import os
-import logging
+import time
 from pathlib import Path
-from duckduckgo_search import ddg
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.safari.options import Options as SafariOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common import exceptions
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from processing.html import extract_hyperlinks, format_hyperlinks
-import processing.text as summary
-
-def google(query: str):
-    if os.getenv("GOOGLE_API_KEY"):
-        return(google_official_search(query))
-    else: 
-        return(google_search(query))
+from typing import TYPE_CHECKING, Optional
+from command_scripts.browser_pool import get_browser_pool
+from command_scripts.prefetch import get_prefetcher, result_urls
+from command_scripts.search import SearchError, get_search_client
+from command_scripts.web_fetch import FetchError, LatencyCounter, get_http_fetcher, js_rendering_reason
+from page_cache import CachedPage, get_page_cache
+
+# Selenium and webdriver_manager are slow to import,
+# so they are only loaded by the commands that use them
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+
+def google(query: str | list[str]):
+    if isinstance(query, list):
+        results = batch_search(query)
+    elif os.getenv("GOOGLE_API_KEY"):
+        results = google_official_search(query)
+    else:
+        results = google_search(query)
+
+    # The next task usually browses one of the results, start fetching the top ones now
+    prefetcher = get_prefetcher()
+    if prefetcher:
+        prefetcher.submit(result_urls(results))
+    return results
 
 def google_search(query: str, num_results: int = 8) -> str:
     """Return the results of a google search
@@ -36,18 +41,13 @@ def google_search(query: str, num_results: int = 8) -> str:
     Returns:
         str: The results of the search.
     """
-    search_results = []
-    if not query:
-        return json.dumps(search_results)
-
-    results = ddg(query, max_results=num_results)
+    try:
+        results = get_search_client().search(query, num_results, backend="duckduckgo")
+    except SearchError as e:
+        return f"Error: {e}"
     if not results:
-        return json.dumps(search_results)
-
-    for j in results:
-        search_results.append(j)
-
-    return json.dumps(search_results, ensure_ascii=False, indent=4)
+        return json.dumps([])
+    return json.dumps([result.as_dict() for result in results], ensure_ascii=False, indent=4)
 
 
 def google_official_search(query: str, num_results: int = 8) -> str | list[str]:
@@ -60,84 +60,86 @@ def google_official_search(query: str, num_results: int = 8) -> str | list[str]:
     Returns:
         str: The results of the search.
     """
-
-    from googleapiclient.discovery import build
-    from googleapiclient.errors import HttpError
-
     try:
-        # Get the Google API key and Custom Search Engine ID from the config file
-        GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-        CUSTOM_SEARCH_ENGINE_ID = os.getenv("CUSTOM_SEARCH_ENGINE_ID", "")
-
-        # Initialize the Custom Search API service
-        service = build("customsearch", "v1", developerKey=GOOGLE_API_KEY)
-
-        # Send the search query and retrieve the results
-        result = (
-            service.cse() # pylint: disable=maybe-no-member
-            .list(q=query, cx=CUSTOM_SEARCH_ENGINE_ID, num=num_results)
-            .execute()
-        )
-
-        # Extract the search result items from the response
-        search_results = result.get("items", [])
-
-        # Create a list of only the URLs from the search results
-        search_results_links = [item["link"] for item in search_results]
-
-    except HttpError as e:
-        # Handle errors in the API call
-        error_details = json.loads(e.content.decode())
-
-        # Check if the error is related to an invalid or missing API key
-        if error_details.get("error", {}).get(
-            "code"
-        ) == 403 and "invalid API key" in error_details.get("error", {}).get(
-            "message", ""
-        ):
-            return "Error: The provided Google API key is invalid or missing."
-        else:
-            return f"Error: {e}"
+        results = get_search_client().search(query, num_results, backend="google")
+    except SearchError as e:
+        return f"Error: {e}"
 
     # Return the list of search result URLs
-    return search_results_links
+    return [result.url for result in results]
+
+
+def batch_search(queries: list[str], num_results: int = 8) -> str:
+    """Search for several phrases at once on every configured search backend
+
+    Args:
+        queries (List[str]): The search queries.
+        num_results (int): The number of results per query and backend.
+
+    Returns:
+        str: The merged results without duplicate URLs.
+    """
+    results = get_search_client().batch_search(queries, num_results)
+    return json.dumps([result.as_dict() for result in results], ensure_ascii=False, indent=4)
 
 FILE_DIR = Path(__file__).parent.parent
 
-browser = None
-
-def get_browser_instance() -> WebDriver:
-    """Create or retrieve the browser instance."""
-    global browser
-    if not browser:
-        logging.getLogger("selenium").setLevel(logging.CRITICAL)
-
-        options_available = {'chrome': ChromeOptions, 'safari': SafariOptions, 'firefox': FirefoxOptions}
-        options = options_available[os.getenv("SELENIUM_WEB_BROWSER", "")]()
-        options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.5615.49 Safari/537.36"
-        )
-        
-        if os.getenv("HIDE_BROWSER", "False") == "True":
-            options.add_argument("--headless")  # Add headless argument to hide the browser
-
-        if os.getenv("SELENIUM_WEB_BROWSER", "") == "firefox":
-            browser = webdriver.Firefox(
-                executable_path=GeckoDriverManager().install(), options=options
-            )
-        elif os.getenv("SELENIUM_WEB_BROWSER", "") == "safari":
-            browser = webdriver.Safari(options=options)
-        else:
-            browser = webdriver.Chrome(
-                executable_path=ChromeDriverManager().install(), options=options
-            )
 
-    return browser
+# Latency of browse_website by the path that produced the page text,
+# "escalated" is the time spent on plain HTTP fetches that then needed the browser
+browse_latency = {"http": LatencyCounter(), "selenium": LatencyCounter(), "escalated": LatencyCounter()}
+
+
+def browse_stats() -> str:
+    """Describe how pages were fetched and how long it took"""
+    return (f"Browse: plain HTTP {browse_latency['http'].stats()},"
+            f" Selenium {browse_latency['selenium'].stats()},"
+            f" escalated {browse_latency['escalated'].stats()}. {get_browser_pool().stats()}")
+
+
+def fetch_text_with_http(url: str, cached: Optional[CachedPage] = None) -> Optional[str]:
+    """Fetch the text of a page without a browser
+
+    Args:
+        url (str): The url of the website to fetch
+        cached (CachedPage, optional): A stale cached copy to revalidate
+
+    Returns:
+        Optional[str]: The text of the page, None if the page needs a browser
+    """
+    from processing.extract import extract_text
+
+    cache = get_page_cache()
+    try:
+        if cached is not None and cached.can_revalidate():
+            page = get_http_fetcher().fetch(url, etag=cached.etag, last_modified=cached.last_modified)
+        else:
+            page = get_http_fetcher().fetch(url)
+    except FetchError as exc:
+        print(f"Plain HTTP fetch failed ({exc}), using the browser")
+        return None
+    if page.not_modified and cached is not None:
+        cache.touch(url)
+        return cached.text
+    text = page.html.strip() if page.content_type == "text/plain" else extract_text(page.html)
+    reason = js_rendering_reason(page.html, text)
+    if reason:
+        print(f"Page needs a browser ({reason})")
+        return None
+    if cache:
+        cache.put(url, text, etag=page.etag, last_modified=page.last_modified)
+    return text
 
 
 def browse_website(url: str, question: str = "") -> tuple[str, WebDriver]:
     """Browse a website and return the answer and links to the user
 
+    Pages prefetched after a search and pages cached within PAGE_CACHE_TTL
+    are not fetched again, stale cached pages are revalidated with a
+    conditional request. Static pages are fetched over plain HTTP, the
+    browser is only used for pages that need JavaScript or cannot be
+    fetched directly.
+
     Args:
         url (str): The url of the website to browse
         question (str): The question asked by the user
@@ -145,34 +147,67 @@ def browse_website(url: str, question: str = "") -> tuple[str, WebDriver]:
     Returns:
         Tuple[str, WebDriver]: The answer and links to the user and the webdriver
     """
-    try:
-        driver, text = scrape_text_with_selenium(url)
-    except(exceptions.InvalidArgumentException):
-        return("COMMAND_ERROR: Invalid URL")
-    add_header(driver)
-    summary_text = summary.summarize_text(url, text, question, driver)
-    # links = scrape_links_with_selenium(driver, url)
-
-    # # Limit links to 5
-    # if len(links) > 5:
-    #     links = links[:5]
-
-    if os.getenv("HIDE_BROWSER", "False") == "False":
-        close_browser(driver)
+    import processing.text as summary
+
+    prefetcher = get_prefetcher()
+    text = prefetcher.take(url, timeout=get_http_fetcher().timeout) if prefetcher else None
+    if text is not None:
+        summary_text = summary.summarize_text(url, text, question)
+        return f"Answer gathered from website: {summary_text}"
+
+    cache = get_page_cache()
+    cached = cache.get(url) if cache else None
+    if cached is not None and cached.is_fresh(cache.ttl):
+        summary_text = summary.summarize_text(url, cached.text, question)
+        return f"Answer gathered from website: {summary_text}"
+
+    if os.getenv("HTTP_FETCH", "True") == "True":
+        start = time.perf_counter()
+        text = fetch_text_with_http(url, cached)
+        if text is not None:
+            browse_latency["http"].record(time.perf_counter() - start)
+            summary_text = summary.summarize_text(url, text, question)
+            return f"Answer gathered from website: {summary_text}"
+        browse_latency["escalated"].record(time.perf_counter() - start)
+
+    from selenium.common import exceptions
+
+    # Each browse gets its own long-lived session, concurrent browses use different ones
+    with get_browser_pool().session() as driver:
+        start = time.perf_counter()
+        try:
+            text = scrape_text_with_selenium(driver, url)
+        except(exceptions.InvalidArgumentException):
+            return("COMMAND_ERROR: Invalid URL")
+        browse_latency["selenium"].record(time.perf_counter() - start)
+        if cache:
+            cache.put(url, text)
+        add_header(driver)
+        summary_text = summary.summarize_text(url, text, question, driver)
+        # links = scrape_links_with_selenium(driver, url)
+
+        # # Limit links to 5
+        # if len(links) > 5:
+        #     links = links[:5]
 
     # return f"Answer gathered from website: {summary_text} \n \n Links: {links}", driver
     return f"Answer gathered from website: {summary_text}"
 
-def scrape_text_with_selenium(url: str) -> tuple[WebDriver, str]:
+def scrape_text_with_selenium(driver: WebDriver, url: str) -> str:
     """Scrape text from a website using selenium
 
     Args:
+        driver (WebDriver): The browser session to load the page in
         url (str): The url of the website to scrape
 
     Returns:
-        Tuple[WebDriver, str]: The webdriver and the text scraped from the website
+        str: The text scraped from the website
     """
-    driver = get_browser_instance()
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.wait import WebDriverWait
+    from processing.extract import extract_text
+
     driver.get(url)
 
     WebDriverWait(driver, 10).until(
@@ -181,16 +216,7 @@ def scrape_text_with_selenium(url: str) -> tuple[WebDriver, str]:
 
     # Get the HTML content directly from the browser's DOM
     page_source = driver.execute_script("return document.body.outerHTML;")
-    soup = BeautifulSoup(page_source, "html.parser")
-
-    for script in soup(["script", "style"]):
-        script.extract()
-
-    text = soup.get_text()
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = "\n".join(chunk for chunk in chunks if chunk)
-    return driver, text
+    return extract_text(page_source)
 
 
 def scrape_links_with_selenium(driver: WebDriver, url: str) -> list[str]:
@@ -202,6 +228,9 @@ def scrape_links_with_selenium(driver: WebDriver, url: str) -> list[str]:
     Returns:
         List[str]: The links scraped from the website
     """
+    from bs4 import BeautifulSoup
+    from processing.html import extract_hyperlinks, format_hyperlinks
+
     page_source = driver.page_source
     soup = BeautifulSoup(page_source, "html.parser")
 
@@ -223,18 +252,3 @@ def add_header(driver: WebDriver) -> None:
         None
     """
     driver.execute_script(open(f"{FILE_DIR}/js/overlay.js", "r").read())
-
-
-def close_browser(driver: WebDriver) -> None:
-    """Close the browser
-
-    Args:
-        driver (WebDriver): The webdriver to close
-
-    Returns:
-        None
-    """
-    global browser
-    if browser:
-        browser.quit()
-        browser = None
@@ -0,0 +1,157 @@
+"""Keyword extraction for the command translation agent"""
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from command_scripts.commandsgenerator import CommandsGenerator
+
+if TYPE_CHECKING:
+    from prompt_builder import PromptBuilder
+    from prompt_templates import PromptTemplates
+
+# Response length of the LLM keyword agent
+KEYWORD_AGENT_MAX_TOKENS = 2000
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "i", "in", "into", "is",
+    "it", "its", "of", "on", "or", "that", "the", "then", "this", "to", "will", "with", "my",
+    "about", "called", "named", "new", "all", "any", "some", "which", "what", "should",
+}
+# Words agents use for an action that do not appear in the command descriptions
+SYNONYMS = {
+    "search": ["google"], "internet": ["google"], "online": ["google"], "web": ["google"],
+    "look": ["google"], "find": ["google"], "query": ["google"],
+    "article": ["browse", "website"], "visit": ["browse", "website"], "open": ["browse"],
+    "page": ["website"], "webpage": ["website"], "site": ["website"], "url": ["website"],
+    "http": ["browse", "website"], "https": ["browse", "website"], "www": ["website"],
+    "save": ["write"], "create": ["write", "make"], "note": ["file"], "notes": ["file"],
+    "report": ["file"], "document": ["file"], "md": ["file"], "markdown": ["file"],
+    "add": ["append"], "update": ["append"], "remove": ["delete"], "erase": ["delete"],
+    "folder": ["directory"], "mkdir": ["make", "directory"], "rename": ["move"],
+    "files": ["list"], "contents": ["read"], "review": ["read"],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens without stopwords"""
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class KeywordExtractor:
+    """
+    Scores an action against the available commands with BM25 and returns
+    keywords for the command translation agent, without an LLM call.
+
+    Each command is a document made of its name, description and argument
+    names. Query words are expanded with SYNONYMS before scoring.
+    """
+
+    def __init__(self, commands: CommandsGenerator, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Counter] = {}
+        for description, name, arguments in commands.get_commands():
+            words = name.split("_") + tokenize(description)
+            for argument in arguments:
+                words += argument.split("_")
+            self.documents[name] = Counter(words)
+        self.average_length = (
+            sum(sum(document.values()) for document in self.documents.values())
+            / max(1, len(self.documents))
+        )
+        frequencies = Counter(word for document in self.documents.values() for word in document)
+        count = len(self.documents)
+        self.idf = {
+            word: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for word, frequency in frequencies.items()
+        }
+
+    def query_terms(self, text: str) -> List[str]:
+        """Tokenize an action and expand it with synonyms"""
+        terms = []
+        for token in tokenize(text):
+            terms.append(token)
+            terms.extend(SYNONYMS.get(token, []))
+        return terms
+
+    def score(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Rank the commands by their BM25 score for an action.
+
+        Args:
+            text (str): The action to score.
+
+        Returns:
+            List[Tuple[str, float]]: (command name, score) pairs, best first.
+        """
+        terms = Counter(self.query_terms(text))
+        scores = []
+        for name, document in self.documents.items():
+            length = sum(document.values())
+            score = 0.0
+            for term, query_count in terms.items():
+                frequency = document.get(term, 0)
+                if not frequency:
+                    continue
+                score += query_count * self.idf[term] * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * (1 - self.b + self.b * length / self.average_length)
+                )
+            scores.append((name, score))
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+    def extract(self, text: str, max_commands: int = 3, max_keywords: int = 8) -> List[str]:
+        """
+        Extract keywords for an action: the best matching command names
+        followed by the action's words that matched them.
+
+        Args:
+            text (str): The action to extract keywords from.
+            max_commands (int): The maximum number of command names to include.
+            max_keywords (int): The maximum number of keywords to return.
+
+        Returns:
+            List[str]: The keywords, most relevant first.
+        """
+        ranked = [(name, score) for name, score in self.score(text) if score > 0][:max_commands]
+        keywords = [name for name, _ in ranked]
+        terms = self.query_terms(text)
+        for name, _ in ranked:
+            for term in terms:
+                if term in self.documents[name] and term not in keywords:
+                    keywords.append(term)
+        return keywords[:max_keywords] or ["no_command"]
+
+    def keywords(self, text: str) -> str:
+        """Extract keywords formatted as an array, like the keyword agent's response"""
+        return json.dumps(self.extract(text))
+
+
+def build_keyword_prompt(templates: PromptTemplates, input_prompt: str) -> PromptBuilder:
+    """
+    Build the prompt for the LLM keyword agent.
+
+    Args:
+        templates (PromptTemplates): The compiled static prompt prefix.
+        input_prompt (str): The action to generate keywords for.
+
+    Returns:
+        PromptBuilder: The keyword agent prompt.
+    """
+    prompt = templates.builder(max_response_tokens=KEYWORD_AGENT_MAX_TOKENS)
+    prompt.add("instructions", """
+    You are an AI who generates relevant keywords based on an action being performed by an input prompt.
+    Understand the overall single task of the input prompt and generate keywords based on it. 
+    If there are multiple actions performed in the input, only focus on the first action and ignore the rest.
+    When generating your keywords, ensure they are related to the commands.
+    "Read article" refers to browsing the internet.
+    """)
+    prompt.add("input", f"Your prompt: {input_prompt}", priority=1)
+    prompt.add("response", """
+    Format your response as an array of individual keywords. Only include one word per array index.
+    Response:""")
+    return prompt
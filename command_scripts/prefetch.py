@@ -0,0 +1,250 @@
+"""Background prefetch of search result pages, so a following browse_website finds them ready"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from page_cache import get_page_cache, normalize_url
+
+
+def result_urls(results) -> List[str]:
+    """
+    Get the URLs of search results, in rank order.
+
+    Args:
+        results: The JSON string returned by the DuckDuckGo search, or the
+            list of links returned by the official Google search.
+
+    Returns:
+        List[str]: The result URLs, empty when the results are an error message.
+    """
+    if isinstance(results, str):
+        try:
+            results = json.loads(results)
+        except ValueError:
+            return []
+    if not isinstance(results, list):
+        return []
+    urls = []
+    for result in results:
+        url = (result.get("href") or result.get("link")) if isinstance(result, dict) else result
+        if isinstance(url, str) and url.startswith(("http://", "https://")):
+            urls.append(url)
+    return urls
+
+
+class Prefetcher:
+    """
+    Fetches and extracts pages on background threads before they are browsed.
+
+    submit() queues the top results of a search, the bounded queue drops
+    URLs when full and cancel() drops the URLs not yet started. Extracted
+    texts are held in memory up to max_bytes, least recently fetched texts
+    are evicted first. take() hands a text over once, waiting for the
+    fetch if it is still running. Texts evicted before they were taken
+    count as wasted fetches.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Optional[str]],
+        top_results: int = 3,
+        workers: int = 2,
+        queue_size: int = 16,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.fetch = fetch
+        self.top_results = top_results
+        self.workers = max(1, workers)
+        self.max_bytes = max_bytes
+        self.queue: queue.Queue[Optional[str]] = queue.Queue(queue_size)
+        # URLs queued or being fetched, set when their fetch ends
+        self.pending: Dict[str, threading.Event] = {}
+        self.texts: OrderedDict[str, str] = OrderedDict()
+        self.held_bytes = 0
+        self.lock = threading.Lock()
+        self.threads: List[threading.Thread] = []
+        self.submitted = 0
+        self.fetched = 0
+        self.failed = 0
+        self.hits = 0
+        self.wasted = 0
+        self.dropped = 0
+        self.cancelled = 0
+
+    def submit(self, urls: Iterable[str]) -> int:
+        """
+        Queue the top URLs of a search for prefetching.
+
+        URLs already prefetched, queued or fresh in the page cache are skipped.
+
+        Args:
+            urls (Iterable[str]): The result URLs in rank order.
+
+        Returns:
+            int: The number of URLs queued.
+        """
+        page_cache = get_page_cache()
+        queued = 0
+        for url in list(urls)[:self.top_results]:
+            key = normalize_url(url)
+            with self.lock:
+                if key in self.pending or key in self.texts:
+                    continue
+            if page_cache and page_cache.is_cached(url):
+                continue
+            with self.lock:
+                try:
+                    self.queue.put_nowait(url)
+                except queue.Full:
+                    self.dropped += 1
+                    continue
+                self.pending[key] = threading.Event()
+                self.submitted += 1
+                queued += 1
+                self._start_workers()
+        return queued
+
+    def _start_workers(self) -> None:
+        """Start the worker threads on first use"""
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"prefetch-{len(self.threads)}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _work(self) -> None:
+        """Fetch queued URLs until close() queues None"""
+        while (url := self.queue.get()) is not None:
+            key = normalize_url(url)
+            with self.lock:
+                if key not in self.pending:
+                    # Cancelled while queued
+                    continue
+            try:
+                text = self.fetch(url)
+            except Exception:  # pylint: disable=broad-except
+                text = None
+            with self.lock:
+                event = self.pending.pop(key, None)
+                if text:
+                    self.fetched += 1
+                    self._hold(key, text)
+                else:
+                    self.failed += 1
+            if event is not None:
+                event.set()
+
+    def _hold(self, key: str, text: str) -> None:
+        """Keep a text for take(), evicting the oldest texts above max_bytes. Called with the lock held"""
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            self.wasted += 1
+            return
+        self.texts[key] = text
+        self.held_bytes += size
+        while self.held_bytes > self.max_bytes:
+            _, evicted = self.texts.popitem(last=False)
+            self.held_bytes -= sys.getsizeof(evicted)
+            self.wasted += 1
+
+    def take(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Take the prefetched text of a page.
+
+        Args:
+            url (str): The URL to browse.
+            timeout (float, optional): The maximum number of seconds to wait for a running fetch.
+
+        Returns:
+            Optional[str]: The text of the page, None if it was not prefetched.
+        """
+        key = normalize_url(url)
+        with self.lock:
+            event = self.pending.get(key)
+        if event is not None:
+            event.wait(timeout)
+        with self.lock:
+            text = self.texts.pop(key, None)
+            if text is not None:
+                self.held_bytes -= sys.getsizeof(text)
+                self.hits += 1
+        return text
+
+    def cancel(self) -> int:
+        """
+        Drop the queued URLs that are not being fetched yet.
+
+        Returns:
+            int: The number of URLs dropped.
+        """
+        cancelled = 0
+        while True:
+            try:
+                url = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if url is None:
+                continue
+            with self.lock:
+                event = self.pending.pop(normalize_url(url), None)
+            if event is not None:
+                event.set()
+                cancelled += 1
+        with self.lock:
+            self.cancelled += cancelled
+        return cancelled
+
+    def close(self) -> None:
+        """Cancel the queued URLs and stop the workers after their running fetches"""
+        self.cancel()
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                break
+
+    def stats(self) -> str:
+        """Describe how many prefetches were used"""
+        with self.lock:
+            hit_rate = self.hits / self.fetched if self.fetched else 0.0
+            return (f"Prefetch: {self.hits}/{self.fetched} fetched pages browsed ({hit_rate:.0%}),"
+                    f" {self.wasted} wasted, {len(self.texts)} unused ({self.held_bytes / 1e6:.1f} MB),"
+                    f" {self.failed} failed, {self.dropped} dropped, {self.cancelled} cancelled")
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """
+    Get the prefetcher configured by PREFETCH, PREFETCH_RESULTS, PREFETCH_WORKERS,
+    PREFETCH_QUEUE_SIZE and PREFETCH_MAX_MB.
+
+    Returns:
+        Optional[Prefetcher]: The prefetcher, or None if PREFETCH is not True.
+    """
+    global _prefetcher
+    if os.getenv("PREFETCH", "False") != "True":
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            from command_scripts.internet import fetch_text_with_http
+
+            _prefetcher = Prefetcher(
+                fetch_text_with_http,
+                top_results=int(os.getenv("PREFETCH_RESULTS", "3")),
+                workers=int(os.getenv("PREFETCH_WORKERS", "2")),
+                queue_size=int(os.getenv("PREFETCH_QUEUE_SIZE", "16")),
+                max_bytes=int(float(os.getenv("PREFETCH_MAX_MB", "32")) * 1024 * 1024),
+            )
+            atexit.register(_prefetcher.close)
+        return _prefetcher
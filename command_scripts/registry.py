@@ -0,0 +1,146 @@
+"""Registry mapping command names to their handlers and argument schemas"""
+from __future__ import annotations
+
+import importlib
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class Command:
+    """
+    A command the AI can run.
+
+    Args:
+        name (str): The command name.
+        handler (Callable[..., str]): Called with the arguments as keyword arguments.
+        description (str): What the command does, shown in prompts.
+        arguments (Dict[str, str]): Required argument names and their prompt placeholders.
+        optional_arguments (Dict[str, str], optional): Optional argument names and placeholders.
+        types (Dict[str, Tuple[type, ...]], optional): Accepted value types per argument.
+            Arguments without an entry must be strings.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[..., str],
+        description: str,
+        arguments: Dict[str, str],
+        optional_arguments: Optional[Dict[str, str]] = None,
+        types: Optional[Dict[str, Tuple[type, ...]]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.arguments = arguments
+        self.optional_arguments = optional_arguments or {}
+        self.types = types or {}
+
+    def usage(self) -> str:
+        """Render the command in the command format"""
+        arguments = dict(self.arguments)
+        arguments.update({name: f"{placeholder} (optional)"
+                          for name, placeholder in self.optional_arguments.items()})
+        return json.dumps({self.name: arguments})
+
+    def validate(self, arguments: Any) -> Optional[str]:
+        """
+        Check arguments against the command's schema.
+
+        Args:
+            arguments (Any): The arguments to check.
+
+        Returns:
+            Optional[str]: An error message, or None if the arguments are valid.
+        """
+        if not isinstance(arguments, dict):
+            return (f"ERROR: INVALID ARGUMENTS: the arguments of {self.name} must be an object."
+                    f" Usage: {self.usage()}")
+        missing = [name for name in self.arguments if name not in arguments]
+        if missing:
+            return (f"ERROR: INVALID ARGUMENTS: {self.name} is missing required argument(s)"
+                    f" {', '.join(repr(name) for name in missing)}. Usage: {self.usage()}")
+        unexpected = [name for name in arguments
+                      if name not in self.arguments and name not in self.optional_arguments]
+        if unexpected:
+            return (f"ERROR: INVALID ARGUMENTS: {self.name} does not take argument(s)"
+                    f" {', '.join(repr(name) for name in unexpected)}. Usage: {self.usage()}")
+        for name, value in arguments.items():
+            types = self.types.get(name, (str,))
+            if not isinstance(value, types):
+                expected = " or ".join(accepted.__name__ for accepted in types)
+                return (f"ERROR: INVALID ARGUMENTS: argument '{name}' of {self.name} must be"
+                        f" {expected}, not {type(value).__name__}. Usage: {self.usage()}")
+        return None
+
+    def execute(self, arguments: Dict[str, Any]) -> str:
+        """Run the command with already validated arguments"""
+        return self.handler(**arguments)
+
+
+class CommandRegistry:
+    """
+    Maps command names to commands for constant time lookup.
+
+    Plugins are modules with a register(registry) function that adds
+    their commands, loaded with load_plugins.
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, Command] = {}
+
+    def register(
+        self,
+        name: str,
+        handler: Callable[..., str],
+        description: str,
+        arguments: Optional[Dict[str, str]] = None,
+        optional_arguments: Optional[Dict[str, str]] = None,
+        types: Optional[Dict[str, Tuple[type, ...]]] = None,
+    ) -> Command:
+        """
+        Register a command, replacing any command with the same name.
+
+        Returns:
+            Command: The registered command.
+        """
+        command = Command(name, handler, description, arguments or {}, optional_arguments, types)
+        self.commands[name] = command
+        return command
+
+    def command(self, name: str, description: str, arguments: Optional[Dict[str, str]] = None,
+                optional_arguments: Optional[Dict[str, str]] = None,
+                types: Optional[Dict[str, Tuple[type, ...]]] = None) -> Callable:
+        """Decorator form of register"""
+        def decorator(handler: Callable[..., str]) -> Callable[..., str]:
+            self.register(name, handler, description, arguments, optional_arguments, types)
+            return handler
+        return decorator
+
+    def get(self, name: str) -> Optional[Command]:
+        """Look up a command by name"""
+        return self.commands.get(name)
+
+    def names(self) -> List[str]:
+        """The registered command names, in registration order"""
+        return list(self.commands)
+
+    def __iter__(self):
+        return iter(self.commands.values())
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def load_plugins(self, modules: Iterable[str]) -> None:
+        """
+        Import plugin modules and let each register its commands.
+
+        Args:
+            modules (Iterable[str]): Importable module names.
+        """
+        for module_name in modules:
+            module_name = module_name.strip()
+            if not module_name:
+                continue
+            module = importlib.import_module(module_name)
+            module.register(self)
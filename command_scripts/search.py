@@ -0,0 +1,238 @@
+"""Web search backends with a shared result cache and concurrent batch search"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from page_cache import normalize_url
+
+
+class SearchError(Exception):
+    """Raised when a search backend cannot answer a query"""
+
+
+class SearchResult(NamedTuple):
+    """A search result"""
+    title: str
+    url: str
+    snippet: str
+    backend: str
+
+    def as_dict(self) -> Dict[str, str]:
+        """The result in the format of the DuckDuckGo search command output"""
+        return {"title": self.title, "href": self.url, "body": self.snippet}
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so that case and spacing variants share a cache entry"""
+    return " ".join(query.lower().split())
+
+
+class DuckDuckGoBackend:
+    """Searches DuckDuckGo, needs no API key"""
+    name = "duckduckgo"
+
+    def search(self, query: str, num_results: int) -> List[SearchResult]:
+        """Search for a query"""
+        from duckduckgo_search import ddg
+
+        results = ddg(query, max_results=num_results) or []
+        return [
+            SearchResult(result.get("title", ""), result["href"], result.get("body", ""), self.name)
+            for result in results if result.get("href")
+        ]
+
+
+class GoogleBackend:
+    """
+    Searches with the Google Custom Search API.
+
+    The API client is built once and reused, building it loads the API
+    discovery document.
+    """
+    name = "google"
+
+    def __init__(self, api_key: str, search_engine_id: str):
+        self.api_key = api_key
+        self.search_engine_id = search_engine_id
+        self.service = None
+        self.lock = threading.Lock()
+
+    def _get_service(self):
+        """Build the Custom Search client on first use"""
+        with self.lock:
+            if self.service is None:
+                from googleapiclient.discovery import build
+
+                self.service = build("customsearch", "v1", developerKey=self.api_key, cache_discovery=False)
+            return self.service
+
+    def search(self, query: str, num_results: int) -> List[SearchResult]:
+        """
+        Search for a query.
+
+        Raises:
+            SearchError: If the API rejects the request.
+        """
+        from googleapiclient.errors import HttpError
+
+        try:
+            result = (
+                self._get_service().cse()  # pylint: disable=maybe-no-member
+                .list(q=query, cx=self.search_engine_id, num=num_results)
+                .execute()
+            )
+        except HttpError as e:
+            error_details = json.loads(e.content.decode())
+            error = error_details.get("error", {})
+            # Check if the error is related to an invalid or missing API key
+            if error.get("code") == 403 and "invalid API key" in error.get("message", ""):
+                raise SearchError("The provided Google API key is invalid or missing.") from e
+            raise SearchError(str(e)) from e
+        return [
+            SearchResult(item.get("title", ""), item["link"], item.get("snippet", ""), self.name)
+            for item in result.get("items", []) if item.get("link")
+        ]
+
+
+class SearchClient:
+    """
+    Runs queries against one or more search backends.
+
+    Results are cached per backend and normalized query for ttl seconds,
+    the least recently used entries are evicted above max_entries. Batch
+    searches run every query on every backend concurrently and merge the
+    results by rank, dropping URLs that were already returned.
+    """
+
+    def __init__(self, backends: Sequence, ttl: float = 3600, max_entries: int = 512, workers: int = 8):
+        if not backends:
+            raise ValueError("A search client needs at least one backend")
+        self.backends = {backend.name: backend for backend in backends}
+        self.default_backend = backends[0].name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.workers = workers
+        # (backend, normalized query, number of results): (time, results)
+        self.cache: OrderedDict[Tuple[str, str, int], Tuple[float, List[SearchResult]]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, query: str, num_results: int = 8, backend: Optional[str] = None) -> List[SearchResult]:
+        """
+        Search for a query, answering from the cache when possible.
+
+        Args:
+            query (str): The search query.
+            num_results (int): The number of results to return.
+            backend (str, optional): The backend name, defaults to the first backend.
+
+        Returns:
+            List[SearchResult]: The results in rank order.
+
+        Raises:
+            SearchError: If the backend cannot answer the query, for any reason.
+        """
+        name = backend or self.default_backend
+        key = (name, normalize_query(query), num_results)
+        if not key[1]:
+            return []
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None and (not self.ttl or time.time() - cached[0] <= self.ttl):
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return list(cached[1])
+            self.misses += 1
+
+        try:
+            results = self.backends[name].search(query, num_results)
+        except SearchError:
+            raise
+        except Exception as e:  # pylint: disable=broad-except
+            # Network and parse errors of a backend, so that callers only handle SearchError
+            raise SearchError(f"{name} search failed: {e}") from e
+
+        with self.lock:
+            self.cache[key] = (time.time(), results)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return list(results)
+
+    def batch_search(
+        self, queries: Sequence[str], num_results: int = 8, backends: Optional[Sequence[str]] = None
+    ) -> List[SearchResult]:
+        """
+        Run several queries on several backends concurrently.
+
+        Args:
+            queries (Sequence[str]): The search queries.
+            num_results (int): The number of results per query and backend.
+            backends (Sequence[str], optional): The backend names, defaults to every backend.
+
+        Returns:
+            List[SearchResult]: The merged results, first the top result of every
+            query and backend, then the second ones and so on, each URL once.
+            Backends that fail are skipped.
+        """
+        names = list(backends or self.backends)
+        jobs = [(query, name) for query in dict.fromkeys(queries) for name in names]
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as executor:
+            futures = [executor.submit(self.search, query, num_results, name) for query, name in jobs]
+            result_lists = []
+            for future in futures:
+                try:
+                    result_lists.append(future.result())
+                except SearchError:
+                    continue
+
+        merged = []
+        seen = set()
+        for rank in range(max((len(results) for results in result_lists), default=0)):
+            for results in result_lists:
+                if rank < len(results) and (url := normalize_url(results[rank].url)) not in seen:
+                    seen.add(url)
+                    merged.append(results[rank])
+        return merged
+
+    def stats(self) -> str:
+        """Describe how many searches the cache answered"""
+        return f"Search cache: {self.hits} hits, {self.misses} misses, {len(self.cache)} entries"
+
+
+_client: Optional[SearchClient] = None
+_client_lock = threading.Lock()
+
+
+def get_search_client() -> SearchClient:
+    """
+    Get the search client configured by GOOGLE_API_KEY, CUSTOM_SEARCH_ENGINE_ID,
+    SEARCH_CACHE_TTL, SEARCH_CACHE_SIZE and SEARCH_WORKERS.
+
+    The official Google backend comes first when an API key is set, DuckDuckGo is always available.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            backends = []
+            if os.getenv("GOOGLE_API_KEY"):
+                backends.append(GoogleBackend(
+                    os.getenv("GOOGLE_API_KEY", ""), os.getenv("CUSTOM_SEARCH_ENGINE_ID", "")
+                ))
+            backends.append(DuckDuckGoBackend())
+            _client = SearchClient(
+                backends,
+                ttl=float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+                workers=int(os.getenv("SEARCH_WORKERS", "8")),
+            )
+        return _client
@@ -0,0 +1,220 @@
+"""Plain HTTP page fetching, used by browse_website before falling back to a browser"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from typing import NamedTuple, Optional
+
+# Pages with less text than this were most likely rendered by JavaScript
+MIN_TEXT_CHARS = 200
+# Empty single page app mount points, e.g. <div id="root"></div>
+EMPTY_APP_ROOT = re.compile(
+    r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt|svelte)[\"'][^>]*>\s*</div>", re.I
+)
+NOSCRIPT_WARNING = re.compile(
+    r"<noscript[^>]*>[^<]*(?:enable javascript|javascript is (?:required|disabled)"
+    r"|requires javascript|turn on javascript)", re.I
+)
+META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.I)
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"
+    " Chrome/112.0.5615.49 Safari/537.36"
+)
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched over plain HTTP"""
+
+
+class FetchedPage(NamedTuple):
+    """A page fetched over plain HTTP"""
+    url: str
+    status: int
+    content_type: str
+    html: str
+    truncated: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        """The server confirmed that the cached copy is still current"""
+        return self.status == 304
+
+
+class LatencyCounter:
+    """Counts calls and their latency"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of one call"""
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        """The mean latency in seconds"""
+        return self.total / self.count if self.count else 0.0
+
+    def stats(self) -> str:
+        """Describe the recorded latencies"""
+        return f"{self.count} calls, {self.mean:.2f}s mean, {self.max:.2f}s max"
+
+
+class HttpFetcher:
+    """
+    Fetches pages with a pooled requests session.
+
+    Connections are kept alive and reused across calls and threads, responses
+    are transparently decompressed (gzip/deflate), every request has a timeout
+    and bodies are read up to max_bytes.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        max_bytes: int = 5_000_000,
+        pool_size: int = 10,
+        user_agent: str = DEFAULT_USER_AGENT,
+    ):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.pool_size = pool_size
+        self.user_agent = user_agent
+        self.session = None
+        self.lock = threading.Lock()
+
+    def _get_session(self):
+        """Create the session on first use"""
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "User-Agent": self.user_agent,
+                    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.8",
+                    "Accept-Encoding": "gzip, deflate",
+                })
+                self.session = session
+            return self.session
+
+    def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> FetchedPage:
+        """
+        Fetch a page, conditionally when the validators of a cached copy are given.
+
+        Args:
+            url (str): The URL to fetch.
+            etag (str, optional): Sent as If-None-Match.
+            last_modified (str, optional): Sent as If-Modified-Since.
+
+        Returns:
+            FetchedPage: The decoded page, truncated to max_bytes, or an empty
+            page with status 304 when the cached copy is still current.
+
+        Raises:
+            FetchError: If the request fails or the response is not a text page.
+        """
+        import requests
+
+        session = self._get_session()
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            with session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if response.status_code == 304:
+                    return FetchedPage(response.url, 304, content_type, "", False, etag, last_modified)
+                if response.status_code >= 400:
+                    raise FetchError(f"HTTP {response.status_code}")
+                if content_type and content_type not in TEXT_CONTENT_TYPES:
+                    raise FetchError(f"unsupported content type {content_type}")
+                body = bytearray()
+                truncated = False
+                for chunk in response.iter_content(chunk_size=65536):
+                    body.extend(chunk)
+                    if len(body) >= self.max_bytes:
+                        del body[self.max_bytes:]
+                        truncated = True
+                        break
+                encoding = response.encoding if "charset" in response.headers.get("Content-Type", "") else None
+                return FetchedPage(
+                    url=response.url,
+                    status=response.status_code,
+                    content_type=content_type or "text/html",
+                    html=decode_body(bytes(body), encoding),
+                    truncated=truncated,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+        except requests.RequestException as exc:
+            raise FetchError(str(exc)) from exc
+
+
+def decode_body(body: bytes, encoding: Optional[str] = None) -> str:
+    """Decode a response body using the header charset, the <meta> charset or UTF-8"""
+    if not encoding:
+        match = META_CHARSET.search(body[:4096])
+        encoding = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def js_rendering_reason(html: str, text: str) -> Optional[str]:
+    """
+    Check whether a page needs a browser to show its content.
+
+    Args:
+        html (str): The page as served.
+        text (str): The text extracted from it.
+
+    Returns:
+        Optional[str]: Why the page looks rendered by JavaScript, None if the text can be used.
+    """
+    if len(text) < MIN_TEXT_CHARS:
+        return f"only {len(text)} characters of text"
+    if len(text) < 2000 and EMPTY_APP_ROOT.search(html):
+        return "empty application root element"
+    if len(text) < 2000 and NOSCRIPT_WARNING.search(html):
+        return "page asks to enable JavaScript"
+    return None
+
+
+# Shared by every browse_website call
+_fetcher: Optional[HttpFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_http_fetcher() -> HttpFetcher:
+    """
+    Get the HTTP fetcher configured by HTTP_FETCH_TIMEOUT, HTTP_FETCH_MAX_BYTES
+    and HTTP_POOL_SIZE.
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = HttpFetcher(
+                timeout=float(os.getenv("HTTP_FETCH_TIMEOUT", "15")),
+                max_bytes=int(os.getenv("HTTP_FETCH_MAX_BYTES", "5000000")),
+                pool_size=int(os.getenv("HTTP_POOL_SIZE", "10")),
+            )
+        return _fetcher
+
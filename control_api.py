@@ -0,0 +1,133 @@
+"""Local JSON API to submit and monitor the objectives hosted by an engine"""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Optional
+from urllib.parse import unquote
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """
+    Handles the control API requests:
+
+        GET    /agents                List the agents
+        POST   /agents                Start an agent, body: {"objective", "initial_task", "name", "resume"}
+        GET    /agents/<name>         An agent with its task list and completed tasks
+        POST   /agents/<name>/tasks   Add a task to a running agent, body: {"task_name"}
+        DELETE /agents/<name>         Stop an agent after its running tasks finish
+        GET    /stats                 Statistics of the shared caches
+    """
+    engine: Engine
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        """Keep request logs out of the agents' output"""
+
+    def send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def agent_name(self) -> Optional[str]:
+        """Get the agent name from a /agents/<name> path"""
+        prefix = "/agents/"
+        if self.path.startswith(prefix) and len(self.path) > len(prefix):
+            return unquote(self.path[len(prefix):])
+        return None
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        if self.path == "/agents":
+            self.send_json(200, [agent.info() for agent in list(self.engine.agents.values())])
+        elif self.path == "/stats":
+            self.send_json(200, self.engine.stats())
+        elif (name := self.agent_name()) is not None:
+            agent = self.engine.get(name)
+            if agent is None:
+                self.send_json(404, {"error": f"Agent '{name}' not found"})
+            else:
+                self.send_json(200, agent.info(details=True))
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def read_json(self) -> Any:
+        """Read the JSON request body, sending a 400 response and returning None when it is invalid"""
+        try:
+            return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except json.JSONDecodeError:
+            self.send_json(400, {"error": "The request body is not valid JSON"})
+            return None
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if self.path.startswith("/agents/") and self.path.endswith("/tasks"):
+            self.add_task(unquote(self.path[len("/agents/"):-len("/tasks")]))
+            return
+        if self.path != "/agents":
+            self.send_json(404, {"error": "Not found"})
+            return
+        body = self.read_json()
+        if body is None:
+            return
+        if not isinstance(body, dict) or not body.get("objective") or not body.get("initial_task"):
+            self.send_json(400, {"error": "objective and initial_task are required"})
+            return
+        try:
+            agent = self.engine.submit(
+                body["objective"], body["initial_task"],
+                name=body.get("name"), resume=bool(body.get("resume", False)), park=True,
+            )
+        except ValueError as exc:
+            self.send_json(409, {"error": str(exc)})
+            return
+        self.send_json(201, agent.info())
+
+    def add_task(self, name: str) -> None:
+        """Add a task to a running agent"""
+        agent = self.engine.get(name)
+        if agent is None or not agent.is_alive():
+            self.send_json(404, {"error": f"Agent '{name}' is not running"})
+            return
+        body = self.read_json()
+        if body is None:
+            return
+        if not isinstance(body, dict) or not body.get("task_name"):
+            self.send_json(400, {"error": "task_name is required"})
+            return
+        agent.add_task(str(body["task_name"]))
+        self.send_json(202, agent.info())
+
+    def do_DELETE(self) -> None:  # pylint: disable=invalid-name
+        name = self.agent_name()
+        if name is None or not self.engine.stop(name):
+            self.send_json(404, {"error": f"Agent '{name}' not found"})
+            return
+        self.send_json(202, self.engine.get(name).info())
+
+
+def serve(engine: Engine, host: str = "127.0.0.1", port: int = 8765,
+          background: bool = False) -> ThreadingHTTPServer:
+    """
+    Serve the control API for an engine.
+
+    Args:
+        engine (Engine): The engine whose agents are controlled.
+        host (str): The interface to listen on. Only local by default.
+        port (int): The port to listen on.
+        background (bool): Serve on a daemon thread and return instead of blocking.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    handler = type("EngineControlHandler", (ControlHandler,), {"engine": engine})
+    server = ThreadingHTTPServer((host, port), handler)
+    if background:
+        threading.Thread(target=server.serve_forever, name="control-api", daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
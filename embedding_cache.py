@@ -0,0 +1,190 @@
+"""Persistent, content-addressed cache for text embeddings"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different strings share a cache entry"""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    """Hash the model and normalized text into a cache key"""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    A disk-backed LRU cache of embeddings.
+
+    Vectors live in a fixed-size memory-mapped array file (float16 by
+    default) and a JSON index maps each key to its row, oldest first.
+    The cache holds at most max_entries vectors and reuses the row of
+    the least recently used entry once it is full. The key of every row
+    is stored next to the vectors and checked on lookup, so an index
+    written before a row was reused never serves another text's vector.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        dimension: int = 1536,
+        max_entries: int = 65536,
+        dtype: str = "float16",
+    ):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = self.directory / f"embeddings.{self.dtype.name}"
+        self.index_path = self.directory / "index.json"
+        self.keys_path = self.directory / "row_keys.bin"
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+            if (index.get("dimension") == dimension and index.get("max_entries") == max_entries
+                    and index.get("dtype") == self.dtype.name):
+                self.entries = OrderedDict(index["entries"])
+
+        mode = "r+" if self.entries and self.vectors_path.exists() and self.keys_path.exists() else "w+"
+        if mode == "w+":
+            self.entries.clear()
+        self.vectors = np.memmap(
+            self.vectors_path, dtype=self.dtype, mode=mode, shape=(max_entries, dimension)
+        )
+        # SHA-256 digest of the key stored in each row, all zeros while a row is being rewritten
+        self.row_keys = np.memmap(self.keys_path, dtype=np.uint8, mode=mode, shape=(max_entries, 32))
+        # Rows never used yet start at next_row, rows dropped from the index are reused first
+        self.next_row = max(self.entries.values(), default=-1) + 1
+        self.free_rows: List[int] = []
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Look up the embedding for a text.
+
+        Args:
+            model (str): The embedding model name.
+            text (str): The embedded text.
+
+        Returns:
+            Optional[List[float]]: The embedding, or None on a miss.
+        """
+        key = cache_key(model, text)
+        with self.lock:
+            row = self.entries.get(key)
+            if row is not None and self.row_keys[row].tobytes() != bytes.fromhex(key):
+                # The row was reused after the index on disk was written
+                del self.entries[key]
+                self.free_rows.append(row)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.dirty = True
+            return self.vectors[row].astype(np.float32).tolist()
+
+    def put(self, model: str, text: str, embedding: List[float]) -> None:
+        """
+        Store the embedding for a text, evicting the least recently used entry if full.
+
+        Args:
+            model (str): The embedding model name.
+            text (str): The embedded text.
+            embedding (List[float]): The embedding to store.
+        """
+        key = cache_key(model, text)
+        with self.lock:
+            row = self.entries.get(key)
+            if row is None:
+                if self.free_rows:
+                    row = self.free_rows.pop()
+                elif self.next_row < self.max_entries:
+                    row = self.next_row
+                    self.next_row += 1
+                else:
+                    _, row = self.entries.popitem(last=False)
+            self.entries[key] = row
+            self.entries.move_to_end(key)
+            # Clear the row's key before overwriting its vector, so a crash in between leaves no row
+            # whose stored key belongs to a different vector
+            self.row_keys[row] = 0
+            self.vectors[row] = np.asarray(embedding, dtype=self.dtype)
+            self.row_keys[row] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+            self.dirty = True
+
+    def flush(self) -> None:
+        """Write the vectors and the index to disk"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.vectors.flush()
+            self.row_keys.flush()
+            temp_path = self.index_path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump({
+                    "dimension": self.dimension,
+                    "max_entries": self.max_entries,
+                    "dtype": self.dtype.name,
+                    "entries": list(self.entries.items()),
+                }, file)
+            os.replace(temp_path, self.index_path)
+            self.dirty = False
+
+    def stats(self) -> str:
+        """Describe how many embedding API calls the cache has saved"""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return (f"Embedding cache: {self.hits} hits, {self.misses} misses"
+                f" ({hit_rate:.0%} of embedding API calls saved), {len(self.entries)} entries")
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(dimension: int = 1536) -> Optional[EmbeddingCache]:
+    """
+    Get the shared embedding cache configured by the environment.
+
+    Returns:
+        Optional[EmbeddingCache]: The cache, or None if EMBEDDING_CACHE is False.
+    """
+    global _cache
+    if os.getenv("EMBEDDING_CACHE", "True") != "True":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            dtype = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+            size_mb = float(os.getenv("EMBEDDING_CACHE_SIZE_MB", "256"))
+            max_entries = max(1, int(size_mb * 1024 * 1024) // (dimension * np.dtype(dtype).itemsize))
+            _cache = EmbeddingCache(
+                os.getenv("EMBEDDING_CACHE_DIRECTORY", "commodore_cache/embeddings"),
+                dimension=dimension,
+                max_entries=max_entries,
+                dtype=dtype,
+            )
+            atexit.register(_cache.flush)
+        return _cache
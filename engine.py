@@ -0,0 +1,728 @@
+"""Engine that hosts many independent Commodore agents in one process"""
+from __future__ import annotations
+
+import os
+import queue
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import openai
+from constraints_capabilities import capabilities_generator
+from command_scripts.commands import commands_generator, prepare_commands_list
+from command_scripts.execute_command import execute_command
+from command_scripts.fast_path import FastPathTranslator
+from command_scripts.internet import browse_stats
+from command_scripts.keywords import KEYWORD_AGENT_MAX_TOKENS, KeywordExtractor, build_keyword_prompt
+from command_scripts.prefetch import get_prefetcher
+from command_scripts.search import get_search_client
+from embedding_cache import get_embedding_cache
+from llm_client import get_llm_client
+from llm_utils import get_ada_embedding, get_ada_embeddings
+from memory.base import get_memory_backend
+from memory.writer import BufferedUpsertWriter
+from page_cache import get_page_cache
+from processing.text import split_text
+from prompt_templates import PromptTemplates
+from task_scheduler import TaskScheduler
+from task_storage import get_task_storage
+from workspace import WORKSPACE_PATH, use_workspace
+
+
+# Class for text colors
+class BColors:
+    """Terminal text stying"""
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+
+
+# Pinecone namespaces are only compatible with ascii characters (used in query and upsert)
+ASCII_ONLY = re.compile('[^\x00-\x7F]+')
+# Characters allowed in an agent's workspace directory name
+UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+# Response length of the task creation and prioritization agents
+TASK_AGENT_MAX_TOKENS = 100
+# Vector dimension and metric of the ada embeddings stored in memory
+DIMENSION = 1536
+METRIC = "cosine"
+
+
+class TooManyCommandErrors(RuntimeError):
+    """Raised when a task keeps producing commands that fail"""
+
+
+class Engine:
+    """
+    Hosts independent agents that share the expensive resources of the process:
+    the LLM client pool and response cache, the embedding cache, the browser
+    and the memory backend. Each agent keeps its own objective, task storage,
+    memory namespace and workspace directory, and runs on its own thread.
+    """
+
+    def __init__(self):
+        self.model = os.getenv("OPENAI_API_MODEL", "gpt-3.5-turbo")
+        self.temperature = float(os.getenv("OPENAI_TEMPERATURE", "0"))
+        # Choose keywords for command translation locally ("local") or with the keyword agent ("llm")
+        self.keyword_mode = os.getenv("KEYWORD_MODE", "local")
+        # Translate unambiguous actions into commands without the LLM translator
+        self.fast_path_enabled = os.getenv("FAST_PATH", "True") == "True"
+        # Run independent tasks on TASK_WORKERS workers, tasks that build on others wait for them
+        self.task_workers = int(os.getenv("TASK_WORKERS", "1"))
+        self.memory_chunk_length = int(os.getenv("MEMORY_CHUNK_LENGTH", "4000"))
+
+        # Prepare commands list
+        prepare_commands_list()
+        # Compile the static prompt prefix (commands, constraints and capabilities) once
+        self.prompt_templates = PromptTemplates(commands_generator, capabilities_generator, self.model)
+        self.keyword_extractor = KeywordExtractor(commands_generator)
+        self.fast_path = FastPathTranslator(
+            commands_generator.registry.names(),
+            min_confidence=float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9")),
+        )
+
+        # Configure OpenAI
+        openai.api_key = os.getenv("OPENAI_API_KEY", "")
+        self.llm_client = get_llm_client()
+        # Connect to the memory backend (local by default, Pinecone with MEMORY_BACKEND=pinecone)
+        self.memory = get_memory_backend(dimension=DIMENSION, metric=METRIC)
+
+        self.agents: Dict[str, Agent] = {}
+        self.lock = threading.Lock()
+
+    def submit(
+        self,
+        objective: str,
+        initial_task: str,
+        name: Optional[str] = None,
+        resume: bool = False,
+        workspace: Optional[str | Path] = None,
+        park: bool = False,
+    ) -> Agent:
+        """
+        Start an agent working on an objective.
+
+        Args:
+            objective (str): The objective of the agent.
+            initial_task (str): The first task to perform.
+            name (str, optional): A unique name for the agent. Defaults to the objective.
+            resume (bool): Continue where the last run of the objective stopped.
+            workspace (str | Path, optional): The agent's workspace. Defaults to a
+                subdirectory of the workspace named after the agent.
+            park (bool): Wait for new tasks when the task list is drained instead of exiting.
+
+        Returns:
+            Agent: The started agent.
+
+        Raises:
+            ValueError: If an agent with the same name is still running.
+        """
+        name = name or objective
+        with self.lock:
+            if name in self.agents and self.agents[name].is_alive():
+                raise ValueError(f"Agent '{name}' is already running")
+            if workspace is None:
+                workspace = WORKSPACE_PATH / (UNSAFE_NAME.sub("_", name).strip("_")[:64] or "agent")
+            agent = Agent(self, name, objective, initial_task, workspace, resume=resume, park=park)
+            self.agents[name] = agent
+        agent.start()
+        return agent
+
+    def get(self, name: str) -> Optional[Agent]:
+        """Get an agent by name"""
+        return self.agents.get(name)
+
+    def stop(self, name: str) -> bool:
+        """Ask an agent to stop after its running tasks finish"""
+        agent = self.agents.get(name)
+        if agent is None:
+            return False
+        agent.stop()
+        return True
+
+    def stats(self) -> Dict[str, str]:
+        """Get the statistics of the shared caches"""
+        stats = {}
+        embedding_cache = get_embedding_cache()
+        if embedding_cache:
+            stats["embedding_cache"] = embedding_cache.stats()
+        if self.llm_client.cache_policy:
+            stats["llm_cache"] = self.llm_client.cache_policy.cache.stats()
+        if self.fast_path_enabled:
+            stats["fast_path"] = self.fast_path.stats()
+        stats["browse"] = browse_stats()
+        page_cache = get_page_cache()
+        if page_cache:
+            stats["page_cache"] = page_cache.stats()
+        prefetcher = get_prefetcher()
+        if prefetcher:
+            stats["prefetch"] = prefetcher.stats()
+        stats["search"] = get_search_client().stats()
+        return stats
+
+    def print_stats(self) -> None:
+        """Flush the embedding cache and print the statistics of the shared caches"""
+        embedding_cache = get_embedding_cache()
+        if embedding_cache:
+            embedding_cache.flush()
+        for stats in self.stats().values():
+            print(f"{BColors.OKBLUE}{stats}{BColors.ENDC}")
+
+    def openai_call(
+        self,
+        prompt: str,
+        model: str = None,
+        temperature: float = None,
+        max_tokens: int = 100,
+        system: str = None,
+    ):
+        """Interface with the OpenAI API, sending the optional system message before the prompt"""
+        model = model or self.model
+        temperature = self.temperature if temperature is None else temperature
+        llm_client = self.llm_client
+        while True:
+            try:
+                if not model.startswith("gpt-"):
+                    # Use completion API
+                    response = llm_client.run(llm_client.completion(
+                        prompt=f"{system}\n{prompt}" if system else prompt,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    ))
+                    return response.strip()
+                # Use chat completion API
+                if system:
+                    messages = [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+                else:
+                    messages = [{"role": "system", "content": prompt}]
+                response = llm_client.run(llm_client.chat_completion(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                ))
+                return response.strip()
+            except openai.error.RateLimitError:
+                print(
+                    "   *** The OpenAI API rate limit has been exceeded. Waiting 10 seconds and trying again. ***"
+                )
+                time.sleep(10)  # Wait 10 seconds and try again
+            except openai.error.Timeout:
+                print(
+                    "   *** OpenAI API timeout occured. Waiting 10 seconds and trying again. ***"
+                )
+                time.sleep(10)  # Wait 10 seconds and try again
+            except openai.error.APIError:
+                print(
+                    "   *** OpenAI API error occured. Waiting 10 seconds and trying again. ***"
+                )
+                time.sleep(10)  # Wait 10 seconds and try again
+            except openai.error.APIConnectionError:
+                print(
+                    "   *** OpenAI API connection error occured. Check your network settings, proxy configuration, SSL certificates, or firewall rules. Waiting 10 seconds and trying again. ***"
+                )
+                time.sleep(10)  # Wait 10 seconds and try again
+            # except openai.error.InvalidRequestError:
+            #     print(
+            #         "   *** OpenAI API invalid request. Check the documentation for the specific API method you are calling and make sure you are sending valid and complete parameters. Waiting 10 seconds and trying again. ***"
+            #     )
+            #     time.sleep(10)  # Wait 10 seconds and try again
+            except openai.error.ServiceUnavailableError:
+                print(
+                    "   *** OpenAI API service unavailable. Waiting 10 seconds and trying again. ***"
+                )
+                time.sleep(10)  # Wait 10 seconds and try again
+            else:
+                break
+
+
+class Agent:
+    """
+    A single objective worked on by the engine: its task storage, memory
+    namespace, workspace directory and the loop that runs its tasks.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        name: str,
+        objective: str,
+        initial_task: str,
+        workspace: str | Path,
+        resume: bool = False,
+        park: bool = False,
+    ):
+        self.engine = engine
+        self.name = name
+        self.objective = objective
+        self.initial_task = initial_task
+        self.workspace = Path(workspace)
+        self.resume = resume
+        self.park = park
+        self.namespace = re.sub(ASCII_ONLY, '', name)
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.stop_event = threading.Event()
+        # Tasks added while the agent runs, moved to the task storage by the agent's loop
+        self.inbox: queue.SimpleQueue = queue.SimpleQueue()
+        # Time the loop spent blocked with free workers but no task that could start
+        self.iterations = 0
+        self.idle_seconds = 0.0
+        self.last_idle_seconds = 0.0
+        self.thread = threading.Thread(target=self.run, name=f"agent-{self.namespace}", daemon=True)
+
+        # Clear previous memories, unless the last run is being resumed
+        if not resume:
+            engine.memory.delete(delete_all=True, namespace=self.namespace)
+        # Batch memory writes into as few embedding and upsert requests as possible
+        self.memory_writer = BufferedUpsertWriter(
+            engine.memory, self.namespace, get_ada_embeddings,
+            max_items=int(os.getenv("MEMORY_BUFFER_SIZE", "32")),
+            max_delay=float(os.getenv("MEMORY_BUFFER_DELAY", "5")),
+        )
+        # Initialize tasks storage (saved to TASK_STORAGE_PATH so a run can be resumed)
+        self.tasks_storage = get_task_storage(name, resume=resume)
+        if resume and self.tasks_storage.has_state():
+            print(f"{BColors.OKCYAN}Resuming after {len(self.tasks_storage.completed)} completed tasks{BColors.ENDC}")
+        else:
+            # Add the initial task
+            self.tasks_storage.append({
+                "task_id": self.tasks_storage.next_task_id(),
+                "task_name": initial_task
+            })
+        self.command_result = self.tasks_storage.last_command_result
+        self.scheduler = TaskScheduler(self.tasks_storage, self.run_task, max_workers=engine.task_workers)
+
+    def start(self) -> None:
+        """Run the agent on its own thread"""
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop starting new tasks, the agent exits after its running tasks finish"""
+        self.stop_event.set()
+        self.scheduler.notify()
+
+    def add_task(self, task_name: str) -> None:
+        """Queue a new task, waking the agent if it is parked"""
+        self.inbox.put(task_name)
+        self.scheduler.notify()
+
+    def _drain_inbox(self) -> bool:
+        """Move added tasks into the task storage, returns whether there were any"""
+        added = False
+        while True:
+            try:
+                task_name = self.inbox.get_nowait()
+            except queue.Empty:
+                return added
+            self.tasks_storage.append({"task_id": self.tasks_storage.next_task_id(), "task_name": task_name})
+            added = True
+
+    def is_alive(self) -> bool:
+        """Check whether the agent is still running"""
+        return self.thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the agent to exit"""
+        self.thread.join(timeout)
+
+    def info(self, details: bool = False) -> Dict:
+        """
+        Describe the agent for the control API.
+
+        Args:
+            details (bool): Include the task list and the completed tasks.
+
+        Returns:
+            Dict: The agent's name, objective, status and progress.
+        """
+        info = {
+            "name": self.name,
+            "objective": self.objective,
+            "status": self.status,
+            "error": self.error,
+            "workspace": str(self.workspace),
+            "queued": len(self.tasks_storage.tasks),
+            "running": [task["task_name"] for task in self.scheduler.running.values()],
+            "completed": len(self.tasks_storage.completed),
+            "iterations": self.iterations,
+            "idle_seconds": round(self.idle_seconds, 6),
+            "last_idle_seconds": round(self.last_idle_seconds, 6),
+        }
+        if details:
+            info["tasks"] = self.tasks_storage.get_task_names()
+            info["completed_tasks"] = list(self.tasks_storage.completed)
+            info["last_command_result"] = str(self.command_result)
+        return info
+
+    def run(self) -> None:
+        """
+        Main loop: start ready tasks and merge their results as they finish.
+
+        The loop blocks until a task finishes, a task is added or the agent is
+        stopped, it never sleeps. Once the task list is drained the agent exits,
+        or parks until a task is added when it was started with park=True.
+        """
+        self.status = "running"
+        try:
+            with use_workspace(self.workspace):
+                show_tasks = True
+                while not self.stop_event.is_set():
+                    show_tasks = self._drain_inbox() or show_tasks
+                    # As long as there are tasks in the storage...
+                    if show_tasks and not self.tasks_storage.is_empty():
+                        # Print the task list
+                        print("\033[95m\033[1m" + f"\n*****TASK LIST ({self.name})*****\n" + "\033[0m\033[0m")
+                        for t in self.tasks_storage.get_task_names():
+                            print(" • "+t)
+                    show_tasks = False
+
+                    # Step 1: Start every incomplete task that does not depend on unfinished work
+                    self.scheduler.start_ready_tasks()
+
+                    if self.scheduler.is_idle():
+                        if not self.park:
+                            print(f"{BColors.OKGREEN}All tasks complete.{BColors.ENDC}")
+                            break
+                        # Parked: wait for add_task() or stop(), this is not counted as idle time
+                        self.status = "parked"
+                        self.scheduler.wait_for_completed()
+                        self.status = "running"
+                        continue
+
+                    # Merge results into memory and the task list as each task finishes. Waiting with a
+                    # free worker means no queued task can run yet, which is counted as idle time
+                    stalled = len(self.scheduler.running) < self.scheduler.max_workers
+                    wait_start = time.perf_counter()
+                    finished = self.scheduler.wait_for_completed()
+                    self.last_idle_seconds = time.perf_counter() - wait_start if stalled else 0.0
+                    self.idle_seconds += self.last_idle_seconds
+                    for finished_task, future in finished:
+                        self.complete_task(finished_task, future.result())
+                        show_tasks = True
+                    self.iterations += 1
+                # Let the running tasks finish so their results are kept
+                while self.scheduler.running:
+                    for finished_task, future in self.scheduler.wait_for_completed():
+                        self.complete_task(finished_task, future.result())
+            self.status = "stopped" if self.stop_event.is_set() else "done"
+        except TooManyCommandErrors as exc:
+            self.status = "failed"
+            self.error = str(exc)
+        except Exception as exc:
+            self.status = "failed"
+            self.error = repr(exc)
+            raise
+        finally:
+            self.memory_writer.flush()
+            self.scheduler.shutdown()
+
+    # Define the execution agent
+    def execution_agent(
+            self,
+            objective: str,
+            input_task: str,
+            context: List[str],
+            failed_result: str = None,
+            last_error: str = None
+            ) -> str:
+        """
+        Executes a task based on the given objective and previous context.
+
+        Args:
+            objective (str): The objective or goal for the AI to perform the task.
+            task (str): The task to be executed by the AI.
+
+        Returns:
+            str: The response generated by the AI for the given task.
+        """
+        prompt = self.engine.prompt_templates.builder(max_response_tokens=2000)
+        prompt.add("instructions", f"""
+        You are an AI that is part of an overall AI system who is given a task based on the following objective: {objective}.
+        Using the task, generate an output action that obeys the given constraints, capabilities, commands, and previous tasks.
+        If the task contains a website URL or article, your action should involve browsing the internet.
+        Always include the full URL to any website you mention.
+        Only use valid URLs which were given by a previous Google search.
+        """)
+        prompt.add_items("context", "Take into account these previously completed tasks and context: ",
+                         context, suffix=".\n", priority=1)
+        prompt.add("task", f"""
+        Use the commands available to the system to guide your response.
+        Task to translate: {input_task}.
+        Your response must be within the constraints and capabilities.
+        Only one action should be performed. Do not use the word "and" in your response.
+        Your response should be heavily based off of the given task.
+        """)
+        if failed_result and last_error:
+            prompt.add("last_error", "The last time you generated a response, it was used to create"
+                       f" a command which returned an error: {last_error}.\n", priority=2)
+            prompt.add("failed_result", f"Your last generated response was: {failed_result}.\n", priority=3)
+            prompt.add("retry", "Modifiy your response so that it does not generate a command which results in an error.\n")
+        prompt.add("response", "Response:")
+        return self.engine.openai_call(prompt.build().replace("\n", " "), max_tokens=2000, system=prompt.system)
+
+    # Get the top n completed tasks for the objective
+    def context_agent(self, query: str, top_results_num: int):
+        """
+        Retrieves context for a given query from an index of tasks.
+
+        Args:
+            query (str): The query or objective for retrieving context.
+            top_results_num (int): The number of top results to retrieve.
+
+        Returns:
+            list: A list of tasks as context for the given query, sorted by relevance.
+
+        """
+        # Make sure results still sitting in the write buffer can be found
+        self.memory_writer.flush()
+        query_embedding = get_ada_embedding(query)
+        results = self.engine.memory.query(query_embedding, top_k=top_results_num, include_metadata=True,
+                                           namespace=self.namespace)
+        sorted_results = sorted(results.matches, key=lambda x: x.score, reverse=True)
+        return [(str(item.metadata).replace("\n", " ")) for item in sorted_results]
+
+    def keyword_agent(self, input_prompt: str):
+        """
+        Generates relevant keywords based on an input string.
+        """
+        prompt = build_keyword_prompt(self.engine.prompt_templates, input_prompt)
+        return self.engine.openai_call(prompt.build().replace("\n", " "), max_tokens=KEYWORD_AGENT_MAX_TOKENS,
+                                       system=prompt.system)
+
+    def command_translation_agent(self, command_prompt: str, keywords_list: str, previous_command_result: str) -> str:
+        prompt = self.engine.prompt_templates.builder(max_response_tokens=2000)
+        prompt.add("instructions", f"""You are an AI responsible for translating a task into a single command of a specified output format.
+Your output format, which you must exactly adhere to at all times, is the command format.
+Do not omit any piece of this response format or add any text other than the response format. Fill in the placeholder values with the actual command you want to use.
+The response should be all on one line.
+Your response must adhere exactly to the constraints and capabilities.
+You MUST use a command exclusively from the commands.
+If the task does not seem to use a command available to you, use the command no_command.
+Argument keys must be listed exactly as specified.
+"Search the internet" refers to the "google" command.
+If the task to translate includes a website URL, use the "browse_website" command. "Read article" refers to an google search or webpage browse while "Read file" refers to a filesystem command.
+Always use the full url, including any subpages.
+If the task contains multiple steps, only translate the first step of the task.
+The task to translate into the response format is: {command_prompt}.
+Use these keywords to help you choose a command: {keywords_list}.
+""")
+        prompt.add("previous_result", f"The result of the previous command is: {previous_command_result}.\n",
+                   priority=1)
+        prompt.add("response", """ONLY GENERATE ONE COMMAND.
+Response:""")
+        return self.engine.openai_call(prompt.build().replace("\n", " "), max_tokens=2000, system=prompt.system)
+
+    def task_creation_agent(
+        self, objective: str, last_result: Dict, task_description: str, task_list: List[str], context: List[str]
+    ):
+        prompt = self.engine.prompt_templates.builder(max_response_tokens=TASK_AGENT_MAX_TOKENS)
+        prompt.add("instructions", f"""
+        You are a task creation AI for an overall AI system that uses the result of an execution agent to create new tasks, each performing a single action, with the following objective: {objective},
+        """)
+        prompt.add_items("context", "Take into account these previously completed tasks and context: ",
+                         context, suffix=".\n", priority=1)
+        prompt.add("last_result", f"The last completed task had the result: {last_result}.\n", priority=2)
+        prompt.add("task_description", f"This result was based on this task description: {task_description}. ")
+        prompt.add_items("task_list", "These are incomplete tasks: ", task_list, suffix=".\n", priority=3)
+        prompt.add("rules", """
+        Consider the commands available to the system.
+        Your response must adhere exactly to the constraints and capabilities.
+        Based on the result, create new tasks to be completed by the AI system that do not overlap with incomplete or completed tasks.
+        Include specifics and full URLs in your response if applicable. Be detailed.
+        If you reference a website, you MUST include the entire URL in your response.
+        Return the tasks as an array. 
+        Do not perform a task that has already been performed.
+        Do not return a command, only a task description. Only perform one unique task per array index.""")
+        response = self.engine.openai_call(prompt.build(), max_tokens=TASK_AGENT_MAX_TOKENS, system=prompt.system)
+        updated_tasks = response.split("\n") if "\n" in response else [response]
+        return [{"task_name": task_name} for task_name in updated_tasks]
+
+    def prioritization_agent(self, previous_command_result: str, context: List[str]):
+        task_names = self.tasks_storage.get_task_names()
+        next_task_id = self.tasks_storage.next_task_id()
+        prompt = self.engine.prompt_templates.builder(max_response_tokens=TASK_AGENT_MAX_TOKENS)
+        prompt.add("instructions", f"""
+        You are a task formatting AI for an overall AI system tasked with cleaning the formatting of and reprioritizing the following tasks: {task_names}.
+        Consider the ultimate objective of your team:{self.objective}.
+        """)
+        prompt.add("previous_result", f"Also consider the result of the last completed command: {previous_command_result}.",
+                   priority=2)
+        prompt.add("rules", f"""
+        Retain all task specifics and details.
+        Do not create new tasks.
+        Split tasks with multiple steps into individual tasks with one step per task, unless the tasks are to create and write a file. Those two actions are one step.
+        Delete redundant tasks.
+        Return the result as a numbered list, like:
+        #. First task
+        #. Second task
+        Always start the task list with number {next_task_id}.
+        """)
+        prompt.add_items("context", "Do not repeat these previously completed tasks: ", context,
+                         suffix=".\n", priority=1)
+        prompt.add("response", "Response:")
+        response = self.engine.openai_call(prompt.build(), max_tokens=TASK_AGENT_MAX_TOKENS, system=prompt.system)
+        updated_tasks = response.split("\n") if "\n" in response else [response]
+        updated_tasks_list = []
+        for task_string in updated_tasks:
+            task_parts = task_string.strip().split(".", 1)
+            if len(task_parts) == 2:
+                task_id = task_parts[0].strip()
+                task_name = task_parts[1].strip()
+                updated_tasks_list.append({"task_id": task_id, "task_name": task_name})
+        self.tasks_storage.replace(updated_tasks_list)
+
+    def run_task(self, task: Dict) -> Dict:
+        """
+        Run the command loop for a task: generate an action, translate it into a
+        command and execute it, retrying on command errors.
+
+        Args:
+            task (Dict): The task to run.
+
+        Returns:
+            Dict: The final command, its result and the last failed action.
+
+        Raises:
+            TooManyCommandErrors: If the command loop restarted too many times.
+        """
+        engine = self.engine
+        print("\033[92m\033[1m" + "\n*****NEXT TASK*****\n" + "\033[0m\033[0m")
+        print(task['task_name'])
+
+        command_loop_count = 0
+        command_error = None
+        previous_result = None
+        # Command Loop
+        while True:
+            if command_loop_count >= 5:
+                print(f"{BColors.FAIL}*****TOO MANY COMMAND ERRORS*****{BColors.ENDC}")
+                raise TooManyCommandErrors(f"Too many command errors in task: {task['task_name']}")
+            # Send to execution function to complete the task based on the context
+            execution_context = self.context_agent(task["task_name"], top_results_num=5)
+            result = self.execution_agent(
+                self.objective, task["task_name"],
+                execution_context, previous_result,
+                command_error
+                )
+            print("\033[93m\033[1m" + "\n*****ACTION*****\n" + "\033[0m\033[0m")
+            print(result)
+
+            # Generate keywords
+            command = engine.fast_path.translate(result) if engine.fast_path_enabled else None
+            if command is not None:
+                # Unambiguous action, translated without the LLM
+                keywords = engine.keyword_extractor.keywords(result)
+                print("\033[93m\033[1m" + "\n*****COMMAND (FAST PATH)*****\n" + "\033[0m\033[0m")
+                print(command)
+            else:
+                if engine.keyword_mode == "llm":
+                    keywords = self.keyword_agent(result)
+                else:
+                    keywords = engine.keyword_extractor.keywords(result)
+                print("\033[93m\033[1m" + "\n*****KEYWORDS*****\n" + "\033[0m\033[0m")
+                print(keywords)
+
+                # Step 2: Send natural language result to command translator with keywords
+                command = self.command_translation_agent(result, keywords, self.command_result)
+                print("\033[93m\033[1m" + "\n*****COMMAND*****\n" + "\033[0m\033[0m")
+                print(command)
+
+            # Step 3: Execute command
+            loop_count = 0
+            command_return = execute_command(command)
+            while (str(command_return).startswith("COMMAND_ERROR:") | str(command_return).startswith("ERROR:")) and loop_count < 3:
+                print("Command error, trying to fix...")
+                new_command = self.command_translation_agent(f"""
+                The last command you entered, {command},
+                which was generated based on the following request: {result},
+                did not execute correctly and returned this error: {command_return}
+                Ensure you are using the proper command name and arguments.
+                Please regenerate the command with the required modifications based on the commands list to fix the error. Do not change the command used, only modify the arguments.
+                """, keywords, self.command_result)
+                command_return = execute_command(new_command)
+                command = new_command
+                loop_count += 1
+            if loop_count >= 2:
+                # At this point it can be assumed something was wrong with the command translation input
+                # Best solution is to restart the command loop...
+                print(f"{BColors.WARNING}Something went wrong... restarting command loop{BColors.ENDC}")
+                command_error = f"Command {new_command} returned: {command_return}"
+                print(command_error)
+                previous_result = result
+                command_loop_count += 1
+                continue
+            return {"command": command, "command_result": command_return, "previous_result": previous_result}
+
+    def complete_task(self, task: Dict, outcome: Dict) -> None:
+        """
+        Store a finished task's result in memory, create new tasks based on it
+        and save the task as completed, then reprioritize the task list.
+
+        Args:
+            task (Dict): The finished task.
+            outcome (Dict): The result returned by run_task.
+        """
+        command = outcome["command"]
+        self.command_result = command_result = outcome["command_result"]
+        previous_result = outcome["previous_result"]
+        print(f"{BColors.OKGREEN}{BColors.BOLD}\n*****COMMAND RESULT*****\n{BColors.ENDC}")
+        print(command_result)
+
+        # Step 3: Enrich result and command and store in Pinecone
+        ### NOT FINISHED ###
+        # Don't store the entire google result in memory, which should hopefully cut context length
+        if command == "google":
+            enriched_result = {"data": command}
+        else:
+            enriched_result = {
+                "data": str(command_result)
+            }  # This is where you should enrich the result if needed
+        result_id = f"result_{task['task_id']}"
+        result_chunks = [
+            chunk for chunk in split_text(str(command_result), self.engine.memory_chunk_length) if chunk
+        ]
+        if len(result_chunks) <= 1:
+            # Embed the actual result extracted from the dictionary
+            self.memory_writer.add(
+                result_id, enriched_result["data"],
+                {"task": task["task_name"], "result": str(command_result)}
+            )
+        else:
+            # Store long page and file results chunk by chunk, embedded in one batch
+            for chunk_number, chunk in enumerate(result_chunks):
+                self.memory_writer.add(
+                    f"{result_id}_{chunk_number}", chunk,
+                    {"task": task["task_name"], "result": chunk}
+                )
+        self.engine.print_stats()
+        print(f"{BColors.OKBLUE}Main loop: {self.iterations} iterations, {self.idle_seconds:.3f}s idle"
+              f" ({self.last_idle_seconds * 1000:.1f} ms last iteration){BColors.ENDC}")
+
+        # Step 3: Create new tasks and reprioritize task list
+        task_creation_context = self.context_agent(query=task["task_name"], top_results_num=5)
+        new_tasks = self.task_creation_agent(
+            self.objective,
+            enriched_result,
+            task["task_name"],
+            self.tasks_storage.get_task_names(),
+            task_creation_context
+        )
+        for new_task in new_tasks:
+            new_task.update({"task_id": self.tasks_storage.next_task_id()})
+        # Only mark the task done once its memories and follow-up tasks are saved, so that a
+        # resumed run repeats the task instead of losing them
+        self.memory_writer.flush()
+        self.tasks_storage.complete(task, command, command_result, new_tasks)
+        prioritization_context = self.context_agent(query=str(previous_result), top_results_num=5)
+        self.prioritization_agent(enriched_result, prioritization_context)
@@ -0,0 +1,206 @@
+"""Paged reads of files through mmap, so reading a large file returns one page instead of all of it"""
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+Buffer = Union[bytes, mmap.mmap]
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".mdown", ".mkd")
+
+# ATX headings, and code fence lines so that "#" lines inside code blocks are skipped
+HEADING = re.compile(
+    rb"^(?:(?P<fence>```|~~~)|(?P<hashes>#{1,6})[ \t]+(?P<title>[^\n]*?)[ \t#]*\r?$)",
+    re.MULTILINE,
+)
+
+
+class FilePage(NamedTuple):
+    """
+    A page of a file.
+
+    start and end are byte offsets (end exclusive) for byte pages and
+    line numbers (1-based, end inclusive) for line pages, total is the
+    size in bytes or the number of lines. A line page holding only the
+    start of a line longer than the page sets next_offset to the byte
+    offset where the line continues.
+    """
+    text: str
+    start: int
+    end: int
+    total: int
+    next_offset: Optional[int] = None
+
+    @property
+    def more(self) -> bool:
+        """Whether the file continues after the page"""
+        return self.end < self.total or self.next_offset is not None
+
+
+@contextmanager
+def open_mapped(path: str) -> Iterator[Tuple[Buffer, Tuple[str, int, int]]]:
+    """
+    Map a file into memory for reading.
+
+    Yields:
+        The mapped file, empty bytes for an empty file, and a key that
+        changes when the file changes.
+    """
+    with open(path, "rb") as file:
+        status = os.fstat(file.fileno())
+        key = (os.path.realpath(path), status.st_size, status.st_mtime_ns)
+        if status.st_size == 0:
+            yield b"", key
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data, key
+
+
+def _is_continuation(data: Buffer, position: int) -> bool:
+    """Whether the byte at a position continues a UTF-8 character"""
+    return position < len(data) and data[position] & 0xC0 == 0x80
+
+
+def _page_end(data: Buffer, start: int, limit: int) -> int:
+    """Where a page of at most limit bytes from start ends, preferring a line end and never inside a character"""
+    end = min(len(data), start + limit)
+    if end < len(data):
+        newline = data.rfind(b"\n", start, end)
+        if newline >= start + limit // 2:
+            end = newline + 1
+        while end > start + 1 and _is_continuation(data, end):
+            end -= 1
+    return end
+
+
+def _decode(data: Buffer, start: int, end: int) -> str:
+    """Decode a byte range as UTF-8, replacing invalid bytes"""
+    return data[start:end].decode("utf-8", errors="replace")
+
+
+def read_bytes(data: Buffer, offset: int, limit: int) -> FilePage:
+    """
+    Read the page of at most limit bytes starting at a byte offset.
+
+    The page starts at the next character when the offset falls inside one
+    and ends after the last whole line that fits when there is one in the
+    second half of the page.
+
+    Raises:
+        ValueError: If the offset is past the end of the file.
+    """
+    if offset < 0 or offset >= len(data):
+        raise ValueError(f"offset {offset} is outside the file, which has {len(data)} bytes")
+    while _is_continuation(data, offset):
+        offset += 1
+    end = _page_end(data, offset, max(1, limit))
+    return FilePage(_decode(data, offset, end), offset, end, len(data))
+
+
+_line_starts: OrderedDict[Tuple[str, int, int], array] = OrderedDict()
+_line_starts_lock = threading.Lock()
+_LINE_INDEX_ENTRIES = 8
+
+
+def line_starts(data: Buffer, key: Optional[Tuple[str, int, int]] = None) -> array:
+    """
+    Get the byte offset of every line of a file.
+
+    Args:
+        data (Buffer): The file contents.
+        key (tuple, optional): The key from open_mapped, the offsets of the
+            last few files read are kept until the file changes.
+
+    Returns:
+        array: The offsets, one per line.
+    """
+    if key is not None:
+        with _line_starts_lock:
+            if (starts := _line_starts.get(key)) is not None:
+                _line_starts.move_to_end(key)
+                return starts
+
+    starts = array("q", [0])
+    position = data.find(b"\n")
+    while position != -1 and position + 1 < len(data):
+        starts.append(position + 1)
+        position = data.find(b"\n", position + 1)
+    if not data:
+        starts = array("q")
+
+    if key is not None:
+        with _line_starts_lock:
+            _line_starts[key] = starts
+            while len(_line_starts) > _LINE_INDEX_ENTRIES:
+                _line_starts.popitem(last=False)
+    return starts
+
+
+def read_lines(
+    data: Buffer, first: int, last: Optional[int], limit: int, key: Optional[Tuple[str, int, int]] = None
+) -> FilePage:
+    """
+    Read a range of lines, ending early at the last whole line within limit bytes.
+
+    A first line longer than limit is cut at limit bytes, the page then
+    gives the byte offset where the line continues.
+
+    Args:
+        data (Buffer): The file contents.
+        first (int): The first line, starting at 1.
+        last (int, optional): The last line, defaults to the end of the file.
+        limit (int): The maximum number of bytes to return.
+        key (tuple, optional): The key from open_mapped.
+
+    Raises:
+        ValueError: If the first line is past the end of the file.
+    """
+    starts = line_starts(data, key)
+    total = len(starts)
+    if first < 1 or first > total:
+        raise ValueError(f"line {first} is outside the file, which has {total} lines")
+    last = total if last is None else max(first, min(last, total))
+
+    start = starts[first - 1]
+    # The last line that ends within the page, line n ends where line n + 1 starts
+    fitting = bisect_right(starts, start + limit) - 1
+    if fitting == total - 1 and len(data) <= start + limit:
+        fitting = total
+    end_line = min(last, max(first, fitting))
+    end = starts[end_line] if end_line < total else len(data)
+    if end - start > limit:
+        end = _page_end(data, start, limit)
+        return FilePage(_decode(data, start, end), first, first, total, next_offset=end)
+    return FilePage(_decode(data, start, end), first, end_line, total)
+
+
+def markdown_outline(data: Buffer, key: Optional[Tuple[str, int, int]] = None) -> List[Tuple[int, int, str]]:
+    """
+    List the ATX headings ("# Title") of a Markdown file, skipping fenced code blocks.
+
+    Returns:
+        List[Tuple[int, int, str]]: The line number, level and title of every heading.
+    """
+    starts = line_starts(data, key)
+    headings = []
+    in_fence = False
+    for match in HEADING.finditer(data):
+        if match.group("fence"):
+            in_fence = not in_fence
+        elif not in_fence and match.group("title"):
+            line = bisect_right(starts, match.start())
+            title = match.group("title").decode("utf-8", errors="replace")
+            headings.append((line, len(match.group("hashes")), title))
+    return headings
+
+
+def is_markdown(path: Union[str, os.PathLike]) -> bool:
+    """Whether a file name has a Markdown extension"""
+    return os.fspath(path).lower().endswith(MARKDOWN_EXTENSIONS)
@@ -0,0 +1,166 @@
+"""SQLite cache of LLM responses for deterministic reruns and offline replay"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a request has no cached response"""
+
+
+class LLMResponseCache:
+    """
+    Stores LLM responses in a local SQLite file.
+
+    Entries expire after ttl seconds (0 keeps them forever) and the least
+    recently used entries are evicted once the cached responses exceed
+    max_bytes.
+    """
+
+    def __init__(self, path: str | Path, ttl: float = 0, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+            )
+        # Running size of the cached responses, kept in step with every insert and delete
+        self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def key(model: str, temperature: float, max_tokens: Optional[int], messages: Any) -> str:
+        """
+        Hash a request into a cache key.
+
+        Args:
+            model (str): The model name.
+            temperature (float): The sampling temperature.
+            max_tokens (int, optional): The maximum number of tokens to generate.
+            messages (Any): The chat messages, or the prompt for text completions.
+
+        Returns:
+            str: The cache key.
+        """
+        payload = json.dumps(
+            [model, float(temperature), max_tokens, messages], sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if it is missing or expired"""
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT response, created, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl and now - row[1] > self.ttl:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= row[2]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.connection.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response and evict the least recently used entries above the size cap"""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self.lock:
+            total = self.total_bytes
+            with self.connection:
+                old = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)", (key, response, size, now, now)
+                )
+                total += size - (old[0] if old else 0)
+                while total > self.max_bytes:
+                    # Only select eviction candidates once the cap is exceeded
+                    victims = self.connection.execute(
+                        "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+                    ).fetchall()
+                    if not victims:
+                        break
+                    for old_key, old_size in victims:
+                        if total <= self.max_bytes:
+                            break
+                        self.connection.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                        total -= old_size
+            self.total_bytes = total
+
+    def stats(self) -> str:
+        """Describe how many requests the cache has answered"""
+        return f"LLM cache: {self.hits} hits, {self.misses} misses"
+
+
+class CachePolicy:
+    """
+    Decides how the LLM client uses the response cache.
+
+    Modes:
+        off: never read or write the cache.
+        on: record every response, serve cached responses for temperature 0 requests.
+        replay: serve every request from the cache and raise CacheMissError on a miss.
+    """
+
+    def __init__(self, cache: LLMResponseCache, mode: str = "on"):
+        if mode not in ("on", "replay"):
+            raise ValueError(f"Unknown LLM cache mode '{mode}'. Use 'off', 'on' or 'replay'.")
+        self.cache = cache
+        self.mode = mode
+
+    def lookup(self, key: str, temperature: float) -> Optional[str]:
+        """Return a cached response to use instead of calling the API, if any"""
+        if self.mode == "on" and temperature != 0:
+            return None
+        response = self.cache.get(key)
+        if response is None and self.mode == "replay":
+            raise CacheMissError(f"No cached response for request {key} in replay mode")
+        return response
+
+    def record(self, key: str, response: str) -> None:
+        """Store a fresh API response"""
+        self.cache.put(key, response)
+
+
+def get_cache_policy() -> Optional[CachePolicy]:
+    """
+    Create the cache policy configured by the environment.
+
+    Returns:
+        Optional[CachePolicy]: The cache policy, or None if LLM_CACHE is off.
+    """
+    mode = os.getenv("LLM_CACHE", "on").lower()
+    if mode == "off":
+        return None
+    cache = LLMResponseCache(
+        os.getenv("LLM_CACHE_PATH", "commodore_cache/llm_responses.sqlite3"),
+        ttl=float(os.getenv("LLM_CACHE_TTL", "0")),
+        max_bytes=int(float(os.getenv("LLM_CACHE_SIZE_MB", "256")) * 1024 * 1024),
+    )
+    return CachePolicy(cache, mode)
@@ -0,0 +1,213 @@
+"""Asynchronous OpenAI client with a shared connection pool and bounded concurrency"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import os
+import threading
+from typing import Any, Coroutine, List, Optional, TypeVar
+
+import aiohttp
+import openai
+from llm_cache import CachePolicy, LLMResponseCache, get_cache_policy
+
+T = TypeVar("T")
+
+
+class AsyncLLMClient:
+    """
+    Runs OpenAI requests on a background event loop.
+
+    All requests share one aiohttp connection pool, at most max_concurrency
+    requests are in flight at once and each request has a timeout. Async
+    code can await the request methods directly from the client's loop,
+    synchronous code uses run() or submit().
+
+    Completions are looked up in and recorded to the response cache
+    when a cache policy is given.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        pool_size: int = 16,
+        request_timeout: float = 120.0,
+        cache_policy: Optional[CachePolicy] = None,
+    ):
+        self.cache_policy = cache_policy
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.request_timeout = request_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client", daemon=True)
+        self.thread.start()
+
+    async def _acquire(self) -> aiohttp.ClientSession:
+        """Create the session and semaphore on the client's loop and route openai through the session"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        openai.aiosession.set(self.session)
+        return self.session
+
+    def _cache_key(self, model: str, temperature: float, max_tokens: Optional[int], messages: Any) -> Optional[str]:
+        """Get the response cache key for a request, or None when caching is disabled"""
+        if self.cache_policy is None:
+            return None
+        return LLMResponseCache.key(model, temperature, max_tokens, messages)
+
+    async def _lookup(self, key: str, temperature: float) -> Optional[str]:
+        """Look a request up in the response cache on the default executor, off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.cache_policy.lookup, key, temperature
+        )
+
+    async def _record(self, key: str, response: str) -> None:
+        """Store a response in the response cache on the default executor, off the event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.cache_policy.record, key, response)
+
+    async def chat_completion(
+        self,
+        messages: List[dict],
+        model: str,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Create a chat completion.
+
+        Args:
+            messages (List[dict]): The messages to send.
+            model (str): The model to use.
+            temperature (float): The sampling temperature.
+            max_tokens (int, optional): The maximum number of tokens to generate.
+            timeout (float, optional): The request timeout. Defaults to the client's timeout.
+
+        Returns:
+            str: The content of the first choice.
+        """
+        key = self._cache_key(model, temperature, max_tokens, messages)
+        cached = await self._lookup(key, temperature) if key else None
+        if cached is not None:
+            return cached
+
+        await self._acquire()
+        async with self.semaphore:
+            response = await openai.ChatCompletion.acreate(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                n=1,
+                request_timeout=timeout or self.request_timeout,
+            )
+        content = response.choices[0].message["content"]
+        if key:
+            await self._record(key, content)
+        return content
+
+    async def completion(
+        self,
+        prompt: str,
+        model: str,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Create a text completion.
+
+        Args:
+            prompt (str): The prompt to complete.
+            model (str): The model to use.
+            temperature (float): The sampling temperature.
+            max_tokens (int, optional): The maximum number of tokens to generate.
+            timeout (float, optional): The request timeout. Defaults to the client's timeout.
+
+        Returns:
+            str: The text of the first choice.
+        """
+        key = self._cache_key(model, temperature, max_tokens, prompt)
+        cached = await self._lookup(key, temperature) if key else None
+        if cached is not None:
+            return cached
+
+        await self._acquire()
+        async with self.semaphore:
+            response = await openai.Completion.acreate(
+                engine=model,
+                prompt=prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=1,
+                frequency_penalty=0,
+                presence_penalty=0,
+                request_timeout=timeout or self.request_timeout,
+            )
+        text = response.choices[0].text
+        if key:
+            await self._record(key, text)
+        return text
+
+    async def embeddings(self, texts: List[str], model: str, timeout: Optional[float] = None) -> List[dict]:
+        """
+        Create embeddings for a batch of texts.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            model (str): The embedding model to use.
+            timeout (float, optional): The request timeout. Defaults to the client's timeout.
+
+        Returns:
+            List[dict]: The response data items, each with an index and an embedding.
+        """
+        await self._acquire()
+        async with self.semaphore:
+            response = await openai.Embedding.acreate(
+                input=texts, model=model, request_timeout=timeout or self.request_timeout
+            )
+        return response["data"]
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the client's loop and return a future for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the client's loop and block until it finishes"""
+        return self.submit(coroutine).result()
+
+    def close(self) -> None:
+        """Close the connection pool and stop the loop"""
+        if self.loop.is_closed():
+            return
+        if self.session is not None:
+            self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+_client: Optional[AsyncLLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> AsyncLLMClient:
+    """Get the shared LLM client configured by the environment"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncLLMClient(
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                pool_size=int(os.getenv("LLM_POOL_SIZE", "16")),
+                request_timeout=float(os.getenv("LLM_REQUEST_TIMEOUT", "120")),
+                cache_policy=get_cache_policy(),
+            )
+            atexit.register(_client.close)
+        return _client
@@ -3,10 +3,14 @@ from __future__ import annotations
 from ast import List
 import time
 
-import openai
-from openai.error import APIError, RateLimitError
-from colorama import Fore
 import os
+from functools import lru_cache
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# The embedding model accepts at most 8191 tokens per input
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "2048"))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "250000"))
 
 def create_chat_completion(
     messages: list,  # type: ignore
@@ -25,17 +29,21 @@ def create_chat_completion(
     Returns:
         str: The response from the chat completion
     """
+    from openai.error import APIError
+    from llm_client import get_llm_client
+
     response = None
     num_retries = 10
     for attempt in range(num_retries):
         backoff = 2 ** (attempt + 2)
         try:
-            response = openai.ChatCompletion.create(
+            client = get_llm_client()
+            response = client.run(client.chat_completion(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-            )
+            ))
             break
         except APIError as e:
             if e.http_status == 502:
@@ -48,4 +56,118 @@ def create_chat_completion(
     if response is None:
         raise RuntimeError(f"Failed to get response after {num_retries} retries")
 
-    return response.choices[0].message["content"]
\ No newline at end of file
+    return response
+
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """Get the tiktoken encoding for a model, loading tiktoken on first use"""
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = EMBEDDING_MODEL) -> int:
+    """Count the tokens in a text
+
+    Args:
+        text (str): The text to count
+        model (str, optional): The model whose tokenizer to use
+
+    Returns:
+        int: The number of tokens
+    """
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = EMBEDDING_MODEL) -> str:
+    """Truncate a text to at most max_tokens tokens
+
+    Args:
+        text (str): The text to truncate
+        max_tokens (int): The maximum number of tokens to keep
+        model (str, optional): The model whose tokenizer to use
+
+    Returns:
+        str: The truncated text
+    """
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def get_ada_embeddings(texts: list[str]) -> list[list[float]]:
+    """Get the embeddings for many texts with as few API requests as possible
+
+    Cached texts are served from the embedding cache, the rest are
+    deduplicated and packed into requests limited by EMBEDDING_BATCH_SIZE
+    inputs and EMBEDDING_BATCH_TOKENS tokens.
+
+    Args:
+        texts (list[str]): The texts to embed
+
+    Returns:
+        list[list[float]]: The embeddings, in the same order as the texts
+    """
+    from embedding_cache import get_embedding_cache
+    from llm_client import get_llm_client
+
+    texts = [text.replace("\n", " ") for text in texts]
+    cache = get_embedding_cache()
+    embeddings: dict[str, list[float]] = {}
+    missing: dict[str, None] = {}
+    for text in texts:
+        if text in embeddings or text in missing:
+            continue
+        embedding = cache.get(EMBEDDING_MODEL, text) if cache else None
+        if embedding is None:
+            missing[text] = None
+        else:
+            embeddings[text] = embedding
+
+    batches: list[list[str]] = []
+    batch_tokens = 0
+    for text in missing:
+        tokens = min(count_tokens(text), EMBEDDING_MAX_INPUT_TOKENS)
+        if (not batches or len(batches[-1]) >= EMBEDDING_BATCH_SIZE
+                or batch_tokens + tokens > EMBEDDING_BATCH_TOKENS):
+            batches.append([])
+            batch_tokens = 0
+        batches[-1].append(text)
+        batch_tokens += tokens
+
+    # Send every batch at once so their network waits overlap
+    client = get_llm_client()
+    futures = [
+        client.submit(client.embeddings(
+            [truncate_tokens(text, EMBEDDING_MAX_INPUT_TOKENS) for text in batch],
+            model=EMBEDDING_MODEL,
+        ))
+        for batch in batches
+    ]
+    for batch, future in zip(batches, futures):
+        for item in future.result():
+            text = batch[item["index"]]
+            embeddings[text] = item["embedding"]
+            if cache:
+                cache.put(EMBEDDING_MODEL, text, item["embedding"])
+
+    return [embeddings[text] for text in texts]
+
+
+def get_ada_embedding(text: str) -> list[float]:
+    """Get the embedding for a text, using the embedding cache when enabled
+
+    Args:
+        text (str): The text to embed
+
+    Returns:
+        list[float]: The embedding of the text
+    """
+    return get_ada_embeddings([text])[0]
@@ -0,0 +1,101 @@
+"""Memory backend interface shared by the local and Pinecone engines"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Match(NamedTuple):
+    """A single query result"""
+    id: str
+    score: float
+    metadata: Dict[str, Any]
+
+
+class QueryResult(NamedTuple):
+    """The result of a query, shaped like a Pinecone query response"""
+    matches: List[Match]
+
+
+# (id, vector, metadata)
+Vector = Tuple[str, Sequence[float], Dict[str, Any]]
+
+
+class MemoryBackend:
+    """
+    Base class for vector memory backends.
+
+    A backend stores vectors with metadata under a namespace and answers
+    top-k similarity queries against a namespace.
+    """
+
+    def upsert(self, vectors: List[Vector], namespace: str = "") -> None:
+        """
+        Insert or update vectors by ID.
+
+        Args:
+            vectors (List[Vector]): (id, vector, metadata) tuples to store.
+            namespace (str): The namespace to store the vectors in.
+        """
+        raise NotImplementedError
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        namespace: str = "",
+    ) -> QueryResult:
+        """
+        Find the vectors most similar to the given vector.
+
+        Args:
+            vector (Sequence[float]): The query vector.
+            top_k (int): The number of results to return.
+            include_metadata (bool): Whether to return metadata with each match.
+            namespace (str): The namespace to query.
+
+        Returns:
+            QueryResult: The matches, sorted by descending score.
+        """
+        raise NotImplementedError
+
+    def delete(self, delete_all: bool = False, namespace: str = "") -> None:
+        """
+        Delete the vectors in a namespace.
+
+        Args:
+            delete_all (bool): Must be True, only whole-namespace deletes are supported.
+            namespace (str): The namespace to clear.
+        """
+        raise NotImplementedError
+
+
+def get_memory_backend(
+    backend: Optional[str] = None,
+    dimension: int = 1536,
+    metric: str = "cosine",
+) -> MemoryBackend:
+    """
+    Create the memory backend selected by the MEMORY_BACKEND environment variable.
+
+    Args:
+        backend (str, optional): "local" or "pinecone". Defaults to MEMORY_BACKEND or "local".
+        dimension (int): The dimension of the stored vectors.
+        metric (str): The similarity metric.
+
+    Returns:
+        MemoryBackend: The configured memory backend.
+    """
+    backend = (backend or os.getenv("MEMORY_BACKEND", "local")).lower()
+    if backend == "pinecone":
+        from memory.pinecone_memory import PineconeMemory
+        return PineconeMemory(dimension=dimension, metric=metric)
+    if backend == "local":
+        from memory.local import LocalMemory
+        return LocalMemory(
+            os.getenv("MEMORY_DIRECTORY", "commodore_memory"),
+            dimension=dimension,
+            hnsw_threshold=int(os.getenv("MEMORY_HNSW_THRESHOLD", "0")),
+        )
+    raise ValueError(f"Unknown memory backend '{backend}'. Use 'local' or 'pinecone'.")
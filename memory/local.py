@@ -0,0 +1,317 @@
+"""Local memory backend using memory-mapped NumPy arrays"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from memory.base import Match, MemoryBackend, QueryResult, Vector
+
+
+class HNSWIndex:
+    """
+    A small Hierarchical Navigable Small World graph for approximate
+    nearest neighbour search over unit vectors (cosine similarity).
+
+    Nodes are row numbers in the vector array returned by get_vectors.
+    Overwriting a row keeps its existing links, which is fine for the
+    occasional upsert of an existing ID.
+    """
+
+    def __init__(
+        self,
+        get_vectors: Callable[[], np.ndarray],
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        seed: int = 0,
+    ):
+        self.get_vectors = get_vectors
+        self.m = m
+        self.max_links_base = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_multiplier = 1 / math.log(m)
+        self.layers: List[Dict[int, List[int]]] = []
+        self.entry_point: Optional[int] = None
+        self.max_level = -1
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.layers[0]) if self.layers else 0
+
+    def _search_layer(
+        self, query: np.ndarray, entry_points: List[int], ef: int, level: int
+    ) -> List[Tuple[float, int]]:
+        """Best-first search of a single layer, returning (similarity, node) pairs"""
+        vectors = self.get_vectors()
+        layer = self.layers[level]
+        visited = set(entry_points)
+        similarities = (vectors[entry_points] @ query).tolist()
+        candidates = [(-sim, node) for sim, node in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        results = [(sim, node) for sim, node in zip(similarities, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative_sim, node = heapq.heappop(candidates)
+            if -negative_sim < results[0][0] and len(results) >= ef:
+                break
+            neighbours = [n for n in layer.get(node, ()) if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+            for sim, neighbour in zip((vectors[neighbours] @ query).tolist(), neighbours):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbour))
+                    heapq.heappush(results, (sim, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def add(self, node: int) -> None:
+        """Insert the vector stored at the given row"""
+        vectors = self.get_vectors()
+        query = vectors[node]
+        level = int(-math.log(1.0 - self._random.random()) * self.level_multiplier)
+        while len(self.layers) <= level:
+            self.layers.append({})
+        for layer_number in range(level + 1):
+            self.layers[layer_number][node] = []
+
+        if self.entry_point is None:
+            self.entry_point = node
+            self.max_level = level
+            return
+
+        entry_points = [self.entry_point]
+        for layer_number in range(self.max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer_number)[0][1]]
+
+        for layer_number in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, layer_number)
+            layer = self.layers[layer_number]
+            max_links = self.max_links_base if layer_number == 0 else self.m
+            neighbours = [n for _, n in found if n != node][:self.m]
+            layer[node] = neighbours
+            for neighbour in neighbours:
+                links = layer[neighbour]
+                links.append(node)
+                if len(links) > max_links:
+                    similarities = vectors[links] @ vectors[neighbour]
+                    keep = np.argsort(-similarities)[:max_links]
+                    layer[neighbour] = [links[i] for i in keep]
+            entry_points = [n for _, n in found]
+
+        if level > self.max_level:
+            self.max_level = level
+            self.entry_point = node
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Tuple[float, int]]:
+        """Return up to top_k (similarity, node) pairs, best first"""
+        if self.entry_point is None:
+            return []
+        entry_points = [self.entry_point]
+        for layer_number in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer_number)[0][1]]
+        return self._search_layer(query, entry_points, max(self.ef_search, top_k), 0)[:top_k]
+
+
+class NamespaceStore:
+    """
+    Vectors and metadata for a single namespace.
+
+    Vectors are normalized on write and kept in a float32 memory-mapped
+    file, so cosine similarity is a single matrix-vector product and
+    a namespace reopens without reading the whole file into memory.
+    """
+
+    def __init__(self, directory: Path, namespace: str, dimension: int, hnsw_threshold: int = 0):
+        self.directory = directory
+        self.namespace = namespace
+        self.dimension = dimension
+        self.hnsw_threshold = hnsw_threshold
+        self.vectors_path = directory / "vectors.f32"
+        self.meta_path = directory / "meta.json"
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        self.capacity = 0
+        self.vectors: Optional[np.memmap] = None
+        self.hnsw: Optional[HNSWIndex] = None
+
+        if self.meta_path.exists():
+            with open(self.meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            self.ids = meta["ids"]
+            self.metadata = meta["metadata"]
+            self.capacity = meta["capacity"]
+            self.rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+            self.vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r+",
+                shape=(self.capacity, self.dimension)
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _grow(self, needed: int) -> None:
+        """Grow the memory-mapped file to hold at least the needed number of rows"""
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2, 64)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        with open(self.vectors_path, "ab") as file:
+            file.truncate(capacity * self.dimension * 4)
+        self.capacity = capacity
+        self.vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+
+    def _save_meta(self) -> None:
+        """Atomically write the ID and metadata index"""
+        temp_path = self.meta_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "namespace": self.namespace,
+                "dimension": self.dimension,
+                "capacity": self.capacity,
+                "ids": self.ids,
+                "metadata": self.metadata,
+            }, file)
+        os.replace(temp_path, self.meta_path)
+
+    def _active_vectors(self) -> np.ndarray:
+        return self.vectors[:len(self.ids)]
+
+    def upsert(self, vectors: List[Vector]) -> None:
+        """Insert or overwrite vectors by ID"""
+        new_rows = []
+        self._grow(len(self.ids) + len(vectors))
+        for vector_id, values, metadata in vectors:
+            values = np.asarray(values, dtype=np.float32)
+            if values.shape != (self.dimension,):
+                raise ValueError(
+                    f"Vector '{vector_id}' has shape {values.shape}, expected ({self.dimension},)"
+                )
+            norm = np.linalg.norm(values)
+            if norm > 0:
+                values = values / norm
+            row = self.rows.get(vector_id)
+            if row is None:
+                row = len(self.ids)
+                self.ids.append(vector_id)
+                self.metadata.append(metadata or {})
+                self.rows[vector_id] = row
+                new_rows.append(row)
+            else:
+                self.metadata[row] = metadata or {}
+            self.vectors[row] = values
+        self.vectors.flush()
+        self._save_meta()
+
+        if self.hnsw is not None:
+            for row in new_rows:
+                self.hnsw.add(row)
+
+    def _ensure_hnsw(self) -> Optional[HNSWIndex]:
+        """Build the approximate index once the namespace is large enough"""
+        if not self.hnsw_threshold or len(self.ids) < self.hnsw_threshold:
+            return None
+        if self.hnsw is None:
+            self.hnsw = HNSWIndex(self._active_vectors)
+            for row in range(len(self.ids)):
+                self.hnsw.add(row)
+        return self.hnsw
+
+    def query(self, vector: Sequence[float], top_k: int, exact: bool = False) -> List[Tuple[float, int]]:
+        """Return the top_k (score, row) pairs, best first"""
+        if not self.ids or top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        hnsw = None if exact else self._ensure_hnsw()
+        if hnsw is not None:
+            return hnsw.search(query, top_k)
+
+        scores = self._active_vectors() @ query
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[row]), int(row)) for row in top]
+
+
+class LocalMemory(MemoryBackend):
+    """
+    Memory backend that keeps every namespace on local disk.
+
+    Queries are an exact flat cosine scan, switching to an HNSW graph
+    for namespaces with at least hnsw_threshold vectors (0 disables it).
+    """
+
+    def __init__(self, directory: str | Path, dimension: int = 1536, hnsw_threshold: int = 0):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.hnsw_threshold = hnsw_threshold
+        self.namespaces: Dict[str, NamespaceStore] = {}
+        self.lock = threading.Lock()
+
+    def _namespace_directory(self, namespace: str) -> Path:
+        digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16]
+        return self.directory / digest
+
+    def _store(self, namespace: str) -> NamespaceStore:
+        store = self.namespaces.get(namespace)
+        if store is None:
+            store = NamespaceStore(
+                self._namespace_directory(namespace), namespace,
+                self.dimension, self.hnsw_threshold
+            )
+            self.namespaces[namespace] = store
+        return store
+
+    def upsert(self, vectors: List[Vector], namespace: str = "") -> None:
+        if not vectors:
+            return
+        with self.lock:
+            self._store(namespace).upsert(vectors)
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        namespace: str = "",
+        exact: bool = False,
+    ) -> QueryResult:
+        with self.lock:
+            store = self._store(namespace)
+            matches = [
+                Match(store.ids[row], score, dict(store.metadata[row]) if include_metadata else {})
+                for score, row in store.query(vector, top_k, exact=exact)
+            ]
+        return QueryResult(matches)
+
+    def delete(self, delete_all: bool = False, namespace: str = "") -> None:
+        if not delete_all:
+            raise ValueError("LocalMemory only supports deleting a whole namespace")
+        with self.lock:
+            self.namespaces.pop(namespace, None)
+            shutil.rmtree(self._namespace_directory(namespace), ignore_errors=True)
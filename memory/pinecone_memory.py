@@ -0,0 +1,45 @@
+"""Pinecone memory backend"""
+from __future__ import annotations
+
+import os
+from typing import List, Sequence
+
+import pinecone
+from memory.base import MemoryBackend, QueryResult, Vector
+
+TABLE_NAME = "commodore-ai"
+POD_TYPE = "p1"
+
+
+class PineconeMemory(MemoryBackend):
+    """Memory backend storing vectors in a hosted Pinecone index"""
+
+    def __init__(self, dimension: int = 1536, metric: str = "cosine"):
+        api_key = os.getenv("PINECONE_API_KEY", "")
+        assert api_key, "PINECONE_API_KEY environment variable is missing from .env"
+        environment = os.getenv("PINECONE_ENVIRONMENT", "")
+        assert environment, "PINECONE_ENVIRONMENT environment variable is missing from .env"
+
+        pinecone.init(api_key=api_key, environment=environment)
+        if TABLE_NAME not in pinecone.list_indexes():
+            pinecone.create_index(
+                TABLE_NAME, dimension=dimension, metric=metric, pod_type=POD_TYPE
+            )
+        self.index = pinecone.Index(TABLE_NAME)
+
+    def upsert(self, vectors: List[Vector], namespace: str = "") -> None:
+        self.index.upsert(vectors, namespace=namespace)
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        namespace: str = "",
+    ) -> QueryResult:
+        return self.index.query(
+            vector, top_k=top_k, include_metadata=include_metadata, namespace=namespace
+        )
+
+    def delete(self, delete_all: bool = False, namespace: str = "") -> None:
+        self.index.delete(delete_all=delete_all, namespace=namespace)
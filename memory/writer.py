@@ -0,0 +1,77 @@
+"""Buffered writer that batches embeddings and upserts into a memory backend"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from memory.base import MemoryBackend
+
+
+class BufferedUpsertWriter:
+    """
+    Collects (id, text, metadata) records and writes them to a memory backend
+    with one batched embedding request and one upsert per flush.
+
+    The buffer is flushed once it holds max_items records or its oldest
+    record is max_delay seconds old. Call flush() before querying the
+    namespace to read your own writes.
+    """
+
+    def __init__(
+        self,
+        backend: MemoryBackend,
+        namespace: str,
+        embed: Callable[[List[str]], List[List[float]]],
+        max_items: int = 32,
+        max_delay: float = 5.0,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.embed = embed
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.pending: List[tuple[str, str, Dict[str, Any]]] = []
+        self.lock = threading.RLock()
+        self.timer: Optional[threading.Timer] = None
+
+    def add(self, vector_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        """
+        Queue a record for embedding and upsert.
+
+        Args:
+            vector_id (str): The ID to upsert the vector under.
+            text (str): The text to embed.
+            metadata (Dict[str, Any]): The metadata to store with the vector.
+        """
+        with self.lock:
+            self.pending.append((vector_id, text, metadata))
+            if len(self.pending) >= self.max_items:
+                self.flush()
+            elif self.timer is None and self.max_delay > 0:
+                self.timer = threading.Timer(self.max_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self) -> None:
+        """Embed and upsert every pending record"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            start = time.perf_counter()
+            try:
+                embeddings = self.embed([text for _, text, _ in pending])
+                self.backend.upsert(
+                    [(vector_id, embedding, metadata)
+                     for (vector_id, _, metadata), embedding in zip(pending, embeddings)],
+                    namespace=self.namespace,
+                )
+            except Exception:
+                # Keep the records so the next flush retries them
+                self.pending = pending + self.pending
+                raise
+            print(f"Stored {len(pending)} memories in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,180 @@
+"""SQLite cache of the text of browsed pages, revalidated with conditional requests"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMETERS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that addresses of the same page share a cache entry.
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters, sorts the query and gives empty paths a "/".
+
+    Args:
+        url (str): The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMETERS)
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class CachedPage(NamedTuple):
+    """A cached page text with the validators needed to revalidate it"""
+    url: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        """Check whether the page can be used without revalidation"""
+        return not ttl or time.time() - self.fetched <= ttl
+
+    def can_revalidate(self) -> bool:
+        """Check whether a conditional request can confirm the page is unchanged"""
+        return bool(self.etag or self.last_modified)
+
+
+class PageCache:
+    """
+    Stores the extracted text of pages in a local SQLite file, zlib compressed.
+
+    Pages younger than ttl seconds are served directly (0 never expires),
+    older pages are revalidated with If-None-Match / If-Modified-Since when
+    the server sent an ETag or Last-Modified. The least recently used pages
+    are evicted once the compressed texts exceed max_bytes.
+    """
+
+    def __init__(self, path: str | Path, ttl: float = 86400, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, text BLOB NOT NULL, size INTEGER NOT NULL, etag TEXT,"
+                " last_modified TEXT, fetched REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        # Running size of the compressed texts, kept in step with every insert and delete
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the cached page for a URL, fresh or not, or None. Fresh pages count as hits."""
+        key = normalize_url(url)
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT text, etag, last_modified, fetched FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), key))
+        text, etag, last_modified, fetched = row
+        page = CachedPage(key, zlib.decompress(text).decode("utf-8"), etag, last_modified, fetched)
+        if page.is_fresh(self.ttl):
+            self.hits += 1
+        return page
+
+    def is_cached(self, url: str) -> bool:
+        """Check whether a fresh copy of a page is cached, without counting a hit"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fetched FROM pages WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+        return row is not None and (not self.ttl or time.time() - row[0] <= self.ttl)
+
+    def put(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Store the text of a freshly fetched page and evict the least recently used pages above the size cap"""
+        key = normalize_url(url)
+        now = time.time()
+        compressed = zlib.compress(text.encode("utf-8"), 6)
+        with self.lock:
+            self.misses += 1
+            total = self.total_bytes
+            with self.connection:
+                old = self.connection.execute("SELECT size FROM pages WHERE url = ?", (key,)).fetchone()
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pages (url, text, size, etag, last_modified, fetched, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", (key, compressed, len(compressed), etag, last_modified, now, now)
+                )
+                total += len(compressed) - (old[0] if old else 0)
+                while total > self.max_bytes:
+                    # Only select eviction candidates once the cap is exceeded
+                    victims = self.connection.execute(
+                        "SELECT url, size FROM pages ORDER BY last_access LIMIT 64"
+                    ).fetchall()
+                    if not victims:
+                        break
+                    for old_url, old_size in victims:
+                        if total <= self.max_bytes:
+                            break
+                        self.connection.execute("DELETE FROM pages WHERE url = ?", (old_url,))
+                        total -= old_size
+            self.total_bytes = total
+
+    def touch(self, url: str) -> None:
+        """Mark a cached page as fresh after the server confirmed it is unchanged"""
+        now = time.time()
+        with self.lock, self.connection:
+            self.revalidated += 1
+            self.connection.execute(
+                "UPDATE pages SET fetched = ?, last_access = ? WHERE url = ?", (now, now, normalize_url(url))
+            )
+
+    def stats(self) -> str:
+        """Describe how many page loads the cache has saved"""
+        return (f"Page cache: {self.hits} hits, {self.revalidated} revalidated (304),"
+                f" {self.misses} misses")
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Get the page cache configured by PAGE_CACHE, PAGE_CACHE_PATH, PAGE_CACHE_TTL
+    and PAGE_CACHE_SIZE_MB.
+
+    Returns:
+        Optional[PageCache]: The page cache, or None if PAGE_CACHE is not True.
+    """
+    global _cache
+    if os.getenv("PAGE_CACHE", "True") != "True":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache(
+                os.getenv("PAGE_CACHE_PATH", "commodore_cache/pages.sqlite3"),
+                ttl=float(os.getenv("PAGE_CACHE_TTL", "86400")),
+                max_bytes=int(float(os.getenv("PAGE_CACHE_SIZE_MB", "256")) * 1024 * 1024),
+            )
+        return _cache
@@ -0,0 +1,264 @@
+"""Single pass extraction of the readable text of HTML pages"""
+from __future__ import annotations
+
+import os
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+# Elements whose content is never readable text
+SKIP_TAGS = frozenset((
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "footer", "aside", "form", "button", "select", "textarea", "dialog",
+))
+# Elements that start a new paragraph
+BLOCK_TAGS = frozenset((
+    "address", "article", "blockquote", "body", "caption", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr",
+    "main", "ol", "p", "pre", "section", "summary", "table", "ul",
+))
+# Elements that start a new line of the current paragraph
+LINE_TAGS = frozenset(("br", "li", "tr"))
+# Table cells, joined with " | " within their row
+CELL_TAGS = frozenset(("td", "th"))
+# Containers checked for boilerplate class, id and role values. Elements
+# whose end tag may be omitted (p, li, ...) are not, html.parser would
+# not see them end before their enclosing element closes.
+CONTAINER_TAGS = frozenset(("div", "section", "header", "ul", "ol", "table", "span"))
+# Elements without an end tag
+VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+    "source", "track", "wbr",
+))
+# Class and id tokens of boilerplate containers: the whole token or its prefix before a "-" or "_",
+# after an optional two letter namespace ("mw-navigation"). "sidebar" and "nav-main" match while
+# layout wrappers such as "has-sidebar" do not
+BOILERPLATE = re.compile(
+    r"^(?:[a-z]{2}[-_])?(?:nav|navbar|navigation|menu|breadcrumbs?|sidebar|footer|cookies?|consent|banner|"
+    r"advert|ads?|promo|share|social|related|newsletter|subscribe|popup|modal|skip-link)(?:[-_].*)?$",
+    re.I,
+)
+BOILERPLATE_ROLES = frozenset(("navigation", "banner", "contentinfo", "complementary", "search", "dialog"))
+# Elements holding the main content, which a boilerplate container never hides
+CONTENT_TAGS = frozenset(("main", "article"))
+
+
+class TextCollector:
+    """
+    Parser target that turns start/end/data events into paragraphs.
+
+    Works with lxml's parser target interface and with the html.parser
+    fallback below. Open elements are kept on a stack: a closing tag also
+    closes the unclosed elements inside it, and a skipped element ends
+    when it or an enclosing element closes, so an unclosed <form> cannot
+    hide the rest of the page. Whitespace is collapsed once per output line.
+    """
+
+    def __init__(self):
+        self.paragraphs: List[str] = []
+        # Lines of the current paragraph, split by <br>, list items and table rows
+        self.lines: List[str] = []
+        self.buffer: List[str] = []
+        self.row_has_cell = False
+        # Open elements, and the stack position of the skipped element whose content is dropped
+        self.open_tags: List[str] = []
+        self.skip_at: Optional[int] = None
+        # Whether the skipped element is a boilerplate container, which main content inside ends
+        self.skip_container = False
+        self.pre_depth = 0
+        self.title: Optional[str] = None
+        self.in_title = False
+
+    def start(self, tag: str, attrib: Dict[str, Optional[str]]) -> None:
+        """Handle an opening tag"""
+        tag = tag.lower()
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+        if self.skip_at is not None:
+            if not (self.skip_container and (tag in CONTENT_TAGS or attrib.get("role") == "main")):
+                return
+            # A wrapper that looked like boilerplate holds the main content after all
+            self.skip_at = None
+        if tag == "title":
+            self.in_title = True
+            return
+        if tag in SKIP_TAGS or (tag in CONTAINER_TAGS and is_boilerplate(attrib)):
+            if tag not in VOID_TAGS:
+                self.skip_at = len(self.open_tags) - 1
+                self.skip_container = tag not in SKIP_TAGS
+            return
+        if tag in LINE_TAGS:
+            self.break_line()
+            if tag == "li":
+                self.buffer.append("- ")
+            elif tag == "tr":
+                self.row_has_cell = False
+        elif tag in CELL_TAGS:
+            if self.row_has_cell:
+                self.buffer.append(" | ")
+            self.row_has_cell = True
+        elif tag in BLOCK_TAGS:
+            self.flush()
+            if tag == "pre":
+                self.pre_depth += 1
+
+    def end(self, tag: str) -> None:
+        """Handle a closing tag, closing any unclosed elements inside it"""
+        tag = tag.lower()
+        if tag in VOID_TAGS or tag not in self.open_tags:
+            # Stray closing tags close nothing
+            if self.skip_at is None:
+                self.close_element(tag)
+            return
+        position = len(self.open_tags) - 1 - self.open_tags[::-1].index(tag)
+        while len(self.open_tags) > position:
+            closed = self.open_tags.pop()
+            if self.skip_at is not None and self.skip_at >= len(self.open_tags):
+                self.skip_at = None
+            elif self.skip_at is None:
+                self.close_element(closed)
+
+    def close_element(self, tag: str) -> None:
+        """End the paragraph, line or title an element started"""
+        if tag == "title":
+            self.in_title = False
+        elif tag in LINE_TAGS:
+            self.break_line()
+        elif tag in BLOCK_TAGS:
+            self.flush()
+            if tag == "pre" and self.pre_depth:
+                self.pre_depth -= 1
+
+    def data(self, data: str) -> None:
+        """Handle text"""
+        if self.in_title:
+            self.title = (self.title or "") + data
+        elif self.skip_at is None:
+            self.buffer.append(data)
+
+    def comment(self, text: str) -> None:
+        """Comments are never text"""
+
+    def break_line(self) -> None:
+        """End the current line of the paragraph"""
+        if self.pre_depth:
+            self.buffer.append("\n")
+            return
+        line = " ".join("".join(self.buffer).split())
+        self.buffer = []
+        if line and line != "-":
+            self.lines.append(line)
+
+    def flush(self) -> None:
+        """Close the current paragraph"""
+        if self.pre_depth:
+            paragraph = "".join(self.buffer).strip("\n")
+            self.buffer = []
+        else:
+            self.break_line()
+            paragraph = "\n".join(self.lines)
+        self.lines = []
+        if paragraph:
+            self.paragraphs.append(paragraph)
+
+    def close(self) -> str:
+        """Finish the document and return its text"""
+        self.flush()
+        paragraphs = self.paragraphs
+        title = " ".join(self.title.split()) if self.title else ""
+        if title and not (paragraphs and paragraphs[0] == title):
+            paragraphs = [title] + paragraphs
+        return "\n\n".join(paragraphs)
+
+
+def is_boilerplate(attrib: Dict[str, Optional[str]]) -> bool:
+    """Check whether an element is a navigation, advert or similar container"""
+    if attrib.get("role") in BOILERPLATE_ROLES or attrib.get("aria-hidden") == "true":
+        return True
+    names = f"{attrib.get('class') or ''} {attrib.get('id') or ''}".split()
+    return any(BOILERPLATE.match(name) for name in names)
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds html.parser events to a TextCollector"""
+
+    def __init__(self, target: TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def extract_with_lxml(html: str) -> str:
+    """Extract text with lxml's C parser, streaming events into a TextCollector"""
+    from lxml import etree
+
+    parser = etree.HTMLParser(target=TextCollector(), remove_comments=True, remove_pis=True)
+    parser.feed(html)
+    return parser.close()
+
+
+def extract_with_stdlib(html: str) -> str:
+    """Extract text with the pure Python html.parser"""
+    target = TextCollector()
+    parser = _StdlibParser(target)
+    parser.feed(html)
+    parser.close()
+    return target.close()
+
+
+@lru_cache(maxsize=None)
+def available_backends() -> tuple[str, ...]:
+    """List the installed parser backends, fastest first"""
+    backends = []
+    try:
+        import lxml.etree  # noqa: F401  pylint: disable=unused-import,import-outside-toplevel
+        backends.append("lxml")
+    except ImportError:
+        pass
+    backends.append("html.parser")
+    return tuple(backends)
+
+
+def extract_text(html: str, backend: Optional[str] = None) -> str:
+    """
+    Extract the readable text of an HTML page in a single pass.
+
+    Scripts, styles, navigation, footers, forms and containers marked as
+    navigation, adverts or similar boilerplate are dropped. The text is
+    returned as paragraphs separated by blank lines. List items ("- ")
+    and table rows (cells joined by " | ") get a line each, preformatted
+    text is kept as is.
+
+    Args:
+        html (str): The HTML to extract the text from.
+        backend (str, optional): "lxml" or "html.parser", defaults to HTML_PARSER
+            or the fastest installed backend.
+
+    Returns:
+        str: The text of the page.
+    """
+    if not html or not html.strip():
+        return ""
+    backend = backend or os.getenv("HTML_PARSER") or available_backends()[0]
+    if backend == "lxml":
+        try:
+            return extract_with_lxml(html)
+        except Exception:  # pylint: disable=broad-except
+            # lxml is missing, or rejected a document html.parser still reads,
+            # e.g. a str with an XML encoding declaration
+            pass
+    return extract_with_stdlib(html)
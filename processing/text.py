@@ -1,8 +1,22 @@
 """Text processing functions"""
-from typing import Generator, Optional, Dict
-from selenium.webdriver.remote.webdriver import WebDriver
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Generator, Optional, Dict, List
 import os
-from llm_utils import create_chat_completion
+from llm_utils import count_tokens, create_chat_completion, truncate_tokens
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+# Number of chunk summaries requested at the same time
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+# Maximum length of every summary, including the final one
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "500"))
+# Maximum combined length of the summaries merged by one reduce call
+SUMMARY_REDUCE_TOKENS = max(
+    int(os.getenv("SUMMARY_REDUCE_TOKENS", "2500")), 2 * SUMMARY_MAX_TOKENS
+)
 
 
 def split_text(text: str, max_length: int = 8192) -> Generator[str, None, None]:
@@ -36,15 +50,23 @@ def split_text(text: str, max_length: int = 8192) -> Generator[str, None, None]:
 
 
 def summarize_text(
-    url: str, text: str, question: str, driver: Optional[WebDriver] = None
+    url: str,
+    text: str,
+    question: str,
+    driver: Optional[WebDriver] = None,
+    concurrency: int = SUMMARY_CONCURRENCY,
 ) -> str:
     """Summarize text using the OpenAI API
 
+    Chunks are summarized concurrently, then the summaries are merged in
+    token-bounded groups, level by level, until a single summary remains.
+
     Args:
         url (str): The url of the text
         text (str): The text to summarize
         question (str): The question to ask the model
         driver (WebDriver): The webdriver to use to scroll the page
+        concurrency (int): The number of summaries to request at the same time
 
     Returns:
         str: The summary of the text
@@ -55,32 +77,85 @@ def summarize_text(
     text_length = len(text)
     print(f"Text length: {text_length} characters")
 
-    summaries = []
+    model = os.getenv("OPENAI_API_MODEL", "gpt-3.5-turbo")
     chunks = list(split_text(text, 4000))
-    scroll_ratio = 1 / len(chunks)
+    print(f"Summarizing {len(chunks)} chunks, {concurrency} at a time")
+    summaries = summarize_chunks(chunks, question, model, concurrency, driver)
+    print(f"Summarized {len(chunks)} chunks.")
 
-    for i, chunk in enumerate(chunks):
-        if driver:
-            scroll_to_percentage(driver, scroll_ratio * i)
+    while len(summaries) > 1:
+        groups = group_by_tokens(summaries, SUMMARY_REDUCE_TOKENS, model)
+        print(f"Merging {len(summaries)} summaries in {len(groups)} groups")
+        summaries = summarize_chunks(
+            ["\n".join(group) for group in groups], question, model, concurrency
+        )
 
-        print(f"Summarizing chunk {i + 1} / {len(chunks)}")
-        messages = [create_message(chunk, question)]
+    return summaries[0]
 
-        summary = create_chat_completion(
-            model = os.getenv("OPENAI_API_MODEL", "gpt-3.5-turbo"),
-            messages=messages,
-        )
-        summaries.append(summary)
 
-    print(f"Summarized {len(chunks)} chunks.")
+def summarize_chunks(
+    chunks: List[str],
+    question: str,
+    model: str,
+    concurrency: int,
+    driver: Optional[WebDriver] = None,
+) -> List[str]:
+    """Summarize chunks concurrently
 
-    combined_summary = "\n".join(summaries)
-    messages = [create_message(combined_summary, question)]
+    Args:
+        chunks (List[str]): The chunks to summarize
+        question (str): The question to ask the model
+        model (str): The model to use
+        concurrency (int): The number of summaries to request at the same time
+        driver (WebDriver, optional): The webdriver to scroll as chunks finish
+
+    Returns:
+        List[str]: The summaries, in the same order as the chunks
+    """
+    summaries = [""] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(
+                create_chat_completion,
+                model=model,
+                messages=[create_message(chunk, question)],
+                max_tokens=SUMMARY_MAX_TOKENS,
+            ): i
+            for i, chunk in enumerate(chunks)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            summaries[futures[future]] = future.result()
+            if driver:
+                # The webdriver is not thread safe, so only scroll from this thread
+                scroll_to_percentage(driver, done / len(chunks))
+    return summaries
+
+
+def group_by_tokens(texts: List[str], max_tokens: int, model: str) -> List[List[str]]:
+    """Group consecutive texts so each group has at most max_tokens tokens
+
+    Texts longer than half of max_tokens are truncated so that every
+    group holds at least two texts and each reduce level shrinks the list.
 
-    return create_chat_completion(
-        model = os.getenv("OPENAI_API_MODEL", "gpt-3.5-turbo"),
-        messages=messages,
-    )
+    Args:
+        texts (List[str]): The texts to group
+        max_tokens (int): The maximum number of tokens per group
+        model (str): The model whose tokenizer to use
+
+    Returns:
+        List[List[str]]: The groups of texts
+    """
+    groups: List[List[str]] = []
+    group_tokens = 0
+    for text in texts:
+        text = truncate_tokens(text, max_tokens // 2, model)
+        tokens = count_tokens(text, model)
+        if not groups or group_tokens + tokens > max_tokens:
+            groups.append([])
+            group_tokens = 0
+        groups[-1].append(text)
+        group_tokens += tokens
+    return groups
 
 
 def scroll_to_percentage(driver: WebDriver, ratio: float) -> None:
@@ -0,0 +1,179 @@
+"""Token-budgeted prompt assembly"""
+from __future__ import annotations
+
+import os
+from typing import List, Optional
+
+from llm_utils import count_tokens, truncate_tokens
+
+# Context window sizes, matched by model name prefix (longest prefix first)
+MODEL_CONTEXT_LENGTHS = {
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 4096,
+    "text-davinci-003": 4097,
+    "text-davinci-002": 4097,
+}
+DEFAULT_CONTEXT_LENGTH = 4096
+# Tokens the chat format adds around each message, plus a little slack for tokenizer boundaries
+MESSAGE_OVERHEAD_TOKENS = 16
+
+
+class PromptTooLongError(ValueError):
+    """Raised when the untrimmable sections of a prompt exceed the token budget"""
+
+
+def get_context_length(model: str) -> int:
+    """Get the context window size of a model"""
+    for prefix in sorted(MODEL_CONTEXT_LENGTHS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_CONTEXT_LENGTHS[prefix]
+    return DEFAULT_CONTEXT_LENGTH
+
+
+class PromptSection:
+    """
+    A piece of a prompt.
+
+    A section is either plain text or a prefix followed by a list of items.
+    Sections with a priority can be trimmed, lowest priority first: item
+    sections drop their last (least relevant) items, text sections are
+    truncated. Sections without a priority are always sent in full.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        text: str = "",
+        items: Optional[List[str]] = None,
+        suffix: str = "",
+        priority: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        self.name = name
+        self.text = text
+        self.items = list(items) if items is not None else None
+        self.suffix = suffix
+        self.priority = priority
+        self.max_tokens = max_tokens
+
+    def render(self) -> str:
+        """Render the section as prompt text"""
+        if self.items is None:
+            return self.text + self.suffix
+        return f"{self.text}{self.items}{self.suffix}"
+
+    def trim(self, excess: int, model: str) -> None:
+        """Remove at least excess tokens from the section, if possible"""
+        if self.items is not None:
+            target = count_tokens(self.render(), model) - excess
+            while self.items and count_tokens(self.render(), model) > target:
+                self.items.pop()
+        else:
+            tokens = count_tokens(self.text, model)
+            self.text = truncate_tokens(self.text, max(0, tokens - excess), model)
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt that fits the model's context window on the first request.
+
+    Tokens are counted locally before sending. Each section is first cut to
+    its own max_tokens budget, then trimmable sections are trimmed, lowest
+    priority first, until the whole prompt fits next to the response tokens.
+
+    An optional system message is sent before the prompt and is never trimmed.
+    """
+
+    def __init__(self, model: str, max_response_tokens: int, system: str = ""):
+        self.model = model
+        self.max_response_tokens = max_response_tokens
+        self.system = system
+        self.system_tokens = count_tokens(system, model) + MESSAGE_OVERHEAD_TOKENS if system else 0
+        self.sections: List[PromptSection] = []
+
+    def add(self, name: str, text: str, priority: Optional[int] = None,
+            max_tokens: Optional[int] = None) -> PromptBuilder:
+        """
+        Add a text section.
+
+        Args:
+            name (str): The name of the section.
+            text (str): The text of the section.
+            priority (int, optional): The trim priority, lower is trimmed first. None is never trimmed.
+            max_tokens (int, optional): The maximum number of tokens for the section.
+
+        Returns:
+            PromptBuilder: The builder, for chaining.
+        """
+        self.sections.append(PromptSection(name, text, priority=priority, max_tokens=max_tokens))
+        return self
+
+    def add_items(self, name: str, prefix: str, items: List[str], suffix: str = "",
+                  priority: Optional[int] = None, max_tokens: Optional[int] = None) -> PromptBuilder:
+        """
+        Add a list section, whose items are dropped from the end when trimmed.
+
+        Args:
+            name (str): The name of the section.
+            prefix (str): The text before the items.
+            items (List[str]): The items, most important first.
+            suffix (str): The text after the items.
+            priority (int, optional): The trim priority, lower is trimmed first. None is never trimmed.
+            max_tokens (int, optional): The maximum number of tokens for the section.
+
+        Returns:
+            PromptBuilder: The builder, for chaining.
+        """
+        self.sections.append(
+            PromptSection(name, prefix, items=items, suffix=suffix, priority=priority, max_tokens=max_tokens)
+        )
+        return self
+
+    @property
+    def budget(self) -> int:
+        """The number of tokens available to the prompt"""
+        return (get_context_length(self.model) - self.max_response_tokens
+                - self.system_tokens - MESSAGE_OVERHEAD_TOKENS)
+
+    def section_tokens(self) -> dict[str, int]:
+        """Count the tokens of each section as currently rendered"""
+        return {section.name: count_tokens(section.render(), self.model) for section in self.sections}
+
+    def build(self) -> str:
+        """
+        Render the prompt, trimming sections to fit the token budget.
+
+        Returns:
+            str: The prompt.
+
+        Raises:
+            PromptTooLongError: If the prompt cannot be trimmed to fit.
+        """
+        for section in self.sections:
+            if section.max_tokens is not None:
+                tokens = count_tokens(section.render(), self.model)
+                if tokens > section.max_tokens:
+                    section.trim(tokens - section.max_tokens, self.model)
+
+        trimmable = sorted(
+            (section for section in self.sections if section.priority is not None),
+            key=lambda section: section.priority,
+        )
+        prompt = "".join(section.render() for section in self.sections)
+        total = count_tokens(prompt, self.model)
+        for section in trimmable:
+            if total <= self.budget:
+                break
+            section.trim(total - self.budget, self.model)
+            prompt = "".join(section.render() for section in self.sections)
+            total = count_tokens(prompt, self.model)
+
+        if total > self.budget:
+            raise PromptTooLongError(
+                f"Prompt needs {total} tokens but only {self.budget} are available: {self.section_tokens()}"
+            )
+        if os.getenv("PROMPT_TOKEN_REPORT", "False") == "True":
+            sections = ", ".join(f"{name} {tokens}" for name, tokens in self.section_tokens().items())
+            print(f"Prompt tokens: system {self.system_tokens}, {sections}")
+        return prompt
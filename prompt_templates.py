@@ -0,0 +1,64 @@
+"""Prompt templates whose static sections are compiled once per run"""
+from __future__ import annotations
+
+import json
+from typing import Dict, List
+
+from capabilitiesgenerator import CapabilitiesGenerator
+from command_scripts.commandsgenerator import CommandsGenerator
+from llm_utils import count_tokens
+from prompt_builder import PromptBuilder
+
+
+def compile_commands(commands: List[list]) -> str:
+    """
+    Render the commands list as a minimal JSON schema.
+
+    Args:
+        commands (List[list]): [description, name, arguments] entries.
+
+    Returns:
+        str: Compact JSON mapping each command name to its description and arguments.
+    """
+    schema = {name: {"desc": description, "args": arguments} for description, name, arguments in commands}
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+
+
+class PromptTemplates:
+    """
+    The static part of every agent prompt.
+
+    The commands, command format, constraints and capabilities are compiled
+    once into canonical text and always sent first as the same system
+    message, so every request shares a byte-identical prefix that the
+    provider can cache. Agent-specific instructions and dynamic content go
+    in the user message after it.
+    """
+
+    def __init__(self, commands: CommandsGenerator, capabilities: CapabilitiesGenerator, model: str):
+        self.model = model
+        self.sections: Dict[str, str] = {
+            "role": "You are part of an AI system that completes tasks toward an objective"
+                    " by running one command at a time.",
+            "commands": "COMMANDS (name: description and arguments): "
+                        + compile_commands(commands.get_commands()),
+            "command_format": f"COMMAND FORMAT: {commands.command_format}",
+            "constraints": "CONSTRAINTS: " + "; ".join(capabilities.get_constraints()),
+            "capabilities": "CAPABILITIES: " + "; ".join(capabilities.get_capabilities()),
+        }
+        self.system_message = "\n".join(self.sections.values())
+
+    def section_tokens(self) -> Dict[str, int]:
+        """Count the tokens of each static section"""
+        return {name: count_tokens(text, self.model) for name, text in self.sections.items()}
+
+    def report(self) -> str:
+        """Describe the token cost of the static prompt prefix"""
+        tokens = self.section_tokens()
+        sections = ", ".join(f"{name} {count}" for name, count in tokens.items())
+        return (f"Static prompt prefix: {count_tokens(self.system_message, self.model)} tokens"
+                f" ({sections})")
+
+    def builder(self, max_response_tokens: int) -> PromptBuilder:
+        """Create a prompt builder whose prompts follow the static system message"""
+        return PromptBuilder(self.model, max_response_tokens, system=self.system_message)
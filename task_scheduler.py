@@ -0,0 +1,131 @@
+"""Dependency-aware scheduler that runs independent tasks in parallel"""
+from __future__ import annotations
+
+import contextvars
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Tasks that write up the results of earlier tasks: writing, appending or creating a report,
+# summary or notes, writing to a file, or compiling the findings. Research tasks that merely
+# mention a report or a summary ("find a summary of ...", "read the DOE report") do not match
+OUTPUT = r"(?:report|summary|summaries|notes|article|essay|paper|document|conclusions?|answer|overview|write-?up)"
+WRITE_VERB = r"(?:write|append|add|save|store|record|create|draft|compose|produce|prepare|finali[sz]e)"
+SYNTHESIS_TASK = re.compile(
+    r"\b" + WRITE_VERB + r"\b(?:\s+[\w'-]+){0,4}?\s+" + OUTPUT + r"\b"
+    r"|\b" + WRITE_VERB + r"\b.*\b(?:to|into|in)\s+[\"'`]?[\w./-]+\.[A-Za-z0-9]{1,5}\b"
+    r"|\b(?:compile|combine|consolidate|summari[sz]e|synthesi[sz]e)\s+(?:all\s+)?(?:of\s+)?(?:the|my|our)?\s*"
+    r"(?:previous\s+|earlier\s+|collected\s+|gathered\s+)?(?:findings|results|notes|research)\b"
+    r"|\bbased on (?:all\s+)?(?:the\s+)?(?:previous|earlier|prior|completed)\s+(?:tasks|results|findings)\b",
+    re.I,
+)
+# Explicit references to other tasks, such as "after task 3" or "using #3"
+TASK_REFERENCE = re.compile(r"(?:\btask\s*#?|#)(\d+)\b", re.I)
+
+
+def task_dependencies(task: Dict) -> List[str]:
+    """Get the IDs of the tasks a task explicitly depends on"""
+    if "depends_on" in task:
+        return [str(task_id) for task_id in task["depends_on"]]
+    return TASK_REFERENCE.findall(task["task_name"])
+
+
+def is_synthesis_task(task: Dict) -> bool:
+    """Check whether a task needs the results of every task before it, by its "synthesis" flag or its name"""
+    if "synthesis" in task:
+        return bool(task["synthesis"])
+    return bool(SYNTHESIS_TASK.search(task["task_name"]))
+
+
+class TaskScheduler:
+    """
+    Runs tasks from a task storage on a bounded worker pool.
+
+    A task is ready when every task it references (by "depends_on" or
+    "task N" in its name) is no longer queued or running. Synthesis tasks,
+    such as writing the final report, also wait for every task ahead of them in the
+    queue and every running task. Ready tasks are started in queue order,
+    so a single worker runs tasks strictly one after another. Tasks run in
+    a copy of the caller's context, so they see the agent's workspace.
+
+    wait_for_completed() blocks until a task finishes or notify() is called,
+    so the caller's loop wakes as soon as there is something to do.
+    """
+
+    def __init__(self, storage, run_task: Callable[[Dict], Any], max_workers: int = 1):
+        self.storage = storage
+        self.run_task = run_task
+        self.max_workers = max(1, max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task")
+        self.running: Dict[Future, Dict] = {}
+        self.wakeup = threading.Event()
+
+    def _is_ready(self, task: Dict, ahead: List[Dict]) -> bool:
+        """Check whether a queued task can start"""
+        running = list(self.running.values())
+        if is_synthesis_task(task) and (ahead or running):
+            return False
+        unfinished = {str(other["task_id"]) for other in running + list(self.storage.tasks)}
+        unfinished.discard(str(task["task_id"]))
+        return not any(task_id in unfinished for task_id in task_dependencies(task))
+
+    def _submit(self, task: Dict) -> Future:
+        future = self.executor.submit(contextvars.copy_context().run, self.run_task, task)
+        future.add_done_callback(lambda _: self.wakeup.set())
+        return future
+
+    def notify(self) -> None:
+        """Wake wait_for_completed(), e.g. after a task was queued or the run was stopped"""
+        self.wakeup.set()
+
+    def start_ready_tasks(self) -> List[Dict]:
+        """
+        Start queued tasks that are ready, up to the number of free workers.
+
+        Returns:
+            List[Dict]: The tasks that were started.
+        """
+        started = []
+        ahead: List[Dict] = []
+        for task in list(self.storage.tasks):
+            if len(self.running) >= self.max_workers:
+                break
+            if self._is_ready(task, ahead):
+                self.storage.remove(task)
+                self.running[self._submit(task)] = task
+                started.append(task)
+            else:
+                ahead.append(task)
+        if not started and not self.running and ahead:
+            # Dependencies that can never be met (e.g. a cycle) must not stall the run
+            task = ahead[0]
+            self.storage.remove(task)
+            self.running[self._submit(task)] = task
+            started.append(task)
+        return started
+
+    def wait_for_completed(self, timeout: Optional[float] = None) -> List[Tuple[Dict, Future]]:
+        """
+        Wait until a running task finishes or notify() is called.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            List[Tuple[Dict, Future]]: The finished tasks with their futures,
+            empty when woken by notify() or the timeout.
+        """
+        self.wakeup.wait(timeout)
+        # Clear before collecting, a task finishing in between sets the event again
+        self.wakeup.clear()
+        done = [future for future in self.running if future.done()]
+        return [(self.running.pop(future), future) for future in done]
+
+    def is_idle(self) -> bool:
+        """Check whether no task is queued or running"""
+        return not self.running and self.storage.is_empty()
+
+    def shutdown(self) -> None:
+        """Stop the worker pool after the running tasks finish"""
+        self.executor.shutdown(wait=True)
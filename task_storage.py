@@ -0,0 +1,226 @@
+"""Task storage for the task queue and run state"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+class SingleTaskListStorage:
+    """Task storage supporting only a single instance of Commodore"""
+    def __init__(self):
+        self.tasks = deque([])
+        self.running: Dict[str, Dict] = {}
+        self.task_id_counter = 0
+        self.last_command_result = ""
+        self.completed: List[Dict] = []
+
+    def append(self, task_to_append: Dict):
+        """Append a task to the task storage"""
+        self.tasks.append(task_to_append)
+
+    def replace(self, tasks: List[Dict]):
+        """Replace tasks with a new list of tasks"""
+        self.tasks = deque(tasks)
+
+    def popleft(self):
+        """Remove the latest task from the task list"""
+        return self.tasks.popleft()
+
+    def remove(self, task: Dict):
+        """Remove a task that has been started from the task list"""
+        self.tasks.remove(task)
+        self.running[str(task["task_id"])] = task
+
+    def complete(self, task: Dict, command, command_result: str, new_tasks: Iterable[Dict] = ()):
+        """Record the result of a finished task and append the tasks created from it"""
+        self.tasks.extend(new_tasks)
+        self.running.pop(str(task["task_id"]), None)
+        self.last_command_result = command_result
+        self.completed.append({
+            "task_id": str(task["task_id"]), "task_name": task["task_name"],
+            "command": str(command), "result": str(command_result),
+        })
+
+    def read_current(self):
+        """Read the latest task"""
+        return self.tasks[0]
+
+    def is_empty(self):
+        """Check if the task list is empty"""
+        return False if self.tasks else True
+
+    def next_task_id(self):
+        """Get the next task ID"""
+        self.task_id_counter += 1
+        return self.task_id_counter
+
+    def get_task_names(self):
+        """Get the names of the tasks in the task list"""
+        return [t["task_name"] for t in self.tasks]
+
+    def has_state(self) -> bool:
+        """Check if there is a run to resume"""
+        return bool(self.tasks or self.running or self.completed)
+
+
+class SQLiteTaskStorage(SingleTaskListStorage):
+    """
+    Task storage that persists the run state of an objective to a SQLite file.
+
+    The task queue, tasks that were running, the task ID counter, completed
+    task results and the last command result are written on every change,
+    so a run stopped at any point can be resumed. Tasks that were running
+    when the run stopped are put back at the front of the queue on resume.
+    """
+
+    def __init__(self, path: str | Path, objective: str, resume: bool = False):
+        super().__init__()
+        self.objective = objective
+        self.lock = threading.RLock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS runs (objective TEXT PRIMARY KEY,"
+                " task_id_counter INTEGER NOT NULL, last_command_result TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS tasks (objective TEXT NOT NULL, position INTEGER NOT NULL,"
+                " status TEXT NOT NULL, task TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS completed (objective TEXT NOT NULL, task_id TEXT NOT NULL,"
+                " task_name TEXT NOT NULL, command TEXT NOT NULL, result TEXT NOT NULL, completed REAL NOT NULL)"
+            )
+        if resume:
+            self._load()
+        else:
+            self.clear()
+
+    def _load(self) -> None:
+        """Load the saved state of the objective"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT task_id_counter, last_command_result FROM runs WHERE objective = ?",
+                (self.objective,)
+            ).fetchone()
+            if row:
+                self.task_id_counter, self.last_command_result = row
+            rows = self.connection.execute(
+                "SELECT status, task FROM tasks WHERE objective = ? ORDER BY position", (self.objective,)
+            ).fetchall()
+            interrupted = [json.loads(task) for status, task in rows if status == "running"]
+            queued = [json.loads(task) for status, task in rows if status == "queued"]
+            self.tasks = deque(interrupted + queued)
+            self.completed = [
+                {"task_id": task_id, "task_name": task_name, "command": command, "result": result}
+                for task_id, task_name, command, result in self.connection.execute(
+                    "SELECT task_id, task_name, command, result FROM completed"
+                    " WHERE objective = ? ORDER BY completed", (self.objective,)
+                )
+            ]
+            self._save_tasks()
+
+    def _save_run(self) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs (objective, task_id_counter, last_command_result, updated)"
+            " VALUES (?, ?, ?, ?)",
+            (self.objective, self.task_id_counter, str(self.last_command_result), time.time())
+        )
+
+    def _save_tasks(self) -> None:
+        """Write the queue and the running tasks in one transaction"""
+        with self.lock, self.connection:
+            self._write_tasks()
+
+    def _write_tasks(self) -> None:
+        """Write the queue, the running tasks and the run state. Called inside a transaction"""
+        self.connection.execute("DELETE FROM tasks WHERE objective = ?", (self.objective,))
+        rows = [("running", task) for task in self.running.values()]
+        rows += [("queued", task) for task in self.tasks]
+        self.connection.executemany(
+            "INSERT INTO tasks (objective, position, status, task) VALUES (?, ?, ?, ?)",
+            [(self.objective, position, status, json.dumps(task))
+             for position, (status, task) in enumerate(rows)]
+        )
+        self._save_run()
+
+    def clear(self) -> None:
+        """Forget the saved state of the objective"""
+        with self.lock, self.connection:
+            for table in ("runs", "tasks", "completed"):
+                self.connection.execute(f"DELETE FROM {table} WHERE objective = ?", (self.objective,))
+            self.tasks = deque([])
+            self.running = {}
+            self.task_id_counter = 0
+            self.last_command_result = ""
+            self.completed = []
+
+    def append(self, task_to_append: Dict):
+        with self.lock:
+            super().append(task_to_append)
+            self._save_tasks()
+
+    def replace(self, tasks: List[Dict]):
+        with self.lock:
+            super().replace(tasks)
+            self._save_tasks()
+
+    def popleft(self):
+        with self.lock:
+            task = super().popleft()
+            self._save_tasks()
+            return task
+
+    def remove(self, task: Dict):
+        with self.lock:
+            super().remove(task)
+            self._save_tasks()
+
+    def complete(self, task: Dict, command, command_result: str, new_tasks: Iterable[Dict] = ()):
+        """Save the result, the new tasks and the queue in one transaction"""
+        with self.lock, self.connection:
+            super().complete(task, command, command_result, new_tasks)
+            self.connection.execute(
+                "INSERT INTO completed (objective, task_id, task_name, command, result, completed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.objective, str(task["task_id"]), task["task_name"], str(command),
+                 str(command_result), time.time())
+            )
+            self._write_tasks()
+
+    def next_task_id(self):
+        with self.lock:
+            task_id = super().next_task_id()
+            with self.connection:
+                self._save_run()
+            return task_id
+
+
+def get_task_storage(objective: str, resume: bool = False,
+                     backend: Optional[str] = None) -> SingleTaskListStorage:
+    """
+    Create the task storage selected by the TASK_STORAGE environment variable.
+
+    Args:
+        objective (str): The objective whose run state is stored.
+        resume (bool): Load the saved state instead of starting over.
+        backend (str, optional): "sqlite" or "memory". Defaults to TASK_STORAGE or "sqlite".
+
+    Returns:
+        SingleTaskListStorage: The task storage.
+    """
+    backend = (backend or os.getenv("TASK_STORAGE", "sqlite")).lower()
+    if backend == "memory":
+        return SingleTaskListStorage()
+    if backend == "sqlite":
+        return SQLiteTaskStorage(
+            os.getenv("TASK_STORAGE_PATH", "commodore_state/tasks.sqlite3"), objective, resume=resume
+        )
+    raise ValueError(f"Unknown task storage '{backend}'. Use 'sqlite' or 'memory'.")
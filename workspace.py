@@ -1,14 +1,44 @@
 from __future__ import annotations
 
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Iterator
 
-# Set a dedicated folder for file I/O
+# Set a dedicated folder for file I/O, created on first use
 WORKSPACE_PATH = Path(os.getcwd()) / "commodore_workspace"
 
-# Create the directory if it doesn't exist
-if not os.path.exists(WORKSPACE_PATH):
-    os.makedirs(WORKSPACE_PATH)
+# The workspace of the agent running in the current thread or task
+current_workspace: ContextVar[Path] = ContextVar("current_workspace", default=WORKSPACE_PATH)
+
+
+def get_workspace() -> Path:
+    """Get the workspace of the current agent, WORKSPACE_PATH outside of an agent"""
+    workspace = current_workspace.get()
+    # Agent workspaces are created by use_workspace, the default one when it is first needed
+    if workspace is WORKSPACE_PATH and not WORKSPACE_PATH.exists():
+        WORKSPACE_PATH.mkdir(parents=True, exist_ok=True)
+    return workspace
+
+
+@contextmanager
+def use_workspace(path: str | Path) -> Iterator[Path]:
+    """Use a directory as the workspace of the current context, creating it if needed
+
+    Parameters:
+        path (str | Path): The workspace directory
+
+    Yields:
+        Path: The absolute workspace path
+    """
+    workspace = Path(path).resolve()
+    workspace.mkdir(parents=True, exist_ok=True)
+    token = current_workspace.set(workspace)
+    try:
+        yield workspace
+    finally:
+        current_workspace.reset(token)
 
 
 def path_in_workspace(relative_path: str | Path) -> Path:
@@ -20,7 +50,7 @@ def path_in_workspace(relative_path: str | Path) -> Path:
     Returns:
         Path: Absolute path for the given path in the workspace
     """
-    return safe_path_join(WORKSPACE_PATH, relative_path)
+    return safe_path_join(get_workspace(), relative_path)
 
 
 def safe_path_join(base: Path, *paths: str | Path) -> Path:
@@ -0,0 +1,530 @@
+"""In-process index of the workspace files, kept up to date by the filesystem commands"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from workspace import get_workspace
+
+# inotify event masks, see inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileInfo(NamedTuple):
+    """The size and modification time of an indexed file"""
+    size: int
+    mtime: float
+
+
+class WorkspaceChanges(NamedTuple):
+    """Files and directories changed since the last listing"""
+    added: List[str]
+    modified: List[str]
+    removed: List[str]
+    # New directory: number of files in it, they are not listed in added
+    added_dirs: Dict[str, int]
+    removed_dirs: List[str]
+
+    def describe(self) -> str:
+        """Describe the changes in one line, e.g. 'added notes/a.md; removed b.md'"""
+        def names(paths) -> str:
+            return ", ".join(path.replace(" ", "_") for path in paths)
+
+        new_dirs = ", ".join(
+            f"{names([path])} ({count} file{'s' if count > 1 else ''})" if count else names([path])
+            for path, count in self.added_dirs.items()
+        )
+        parts = [f"{label} {listed}" for label, listed in (
+            ("added", names(self.added)),
+            ("modified", names(self.modified)),
+            ("removed", names(self.removed)),
+            ("new directories", new_dirs),
+            ("removed directories", names(self.removed_dirs)),
+        ) if listed]
+        return "; ".join(parts) if parts else "no changes"
+
+
+def truncate_listing(text: str, max_tokens: int, total_files: int) -> str:
+    """Cut a listing to at most max_tokens tokens, noting how many files the workspace has"""
+    if not max_tokens:
+        return text
+    from llm_utils import count_tokens, truncate_tokens
+
+    if count_tokens(text) <= max_tokens:
+        return text
+    return f"{truncate_tokens(text, max_tokens)} ... (cut at {max_tokens} tokens, {total_files} files in total)"
+
+
+class WorkspaceIndex:
+    """
+    Index of the files and directories below a workspace directory.
+
+    The tree is scanned once, on first use. After that refresh() rescans
+    only the path that changed: a file is stat'ed again, a directory
+    subtree is rescanned and a path that no longer exists is dropped.
+    Lookups by file name are a dictionary access and listings are rendered
+    from memory. Paths are relative to the workspace, "" is the workspace
+    itself. version is incremented on every change.
+
+    After mark_listed() the index records the state of every path it
+    changes, so take_changes() reports what changed since the last listing
+    without comparing the whole tree.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.files: Dict[str, FileInfo] = {}
+        # Directory: names of its files and subdirectories
+        self.dirs: Dict[str, Set[str]] = {}
+        # File name: paths of the files with that name
+        self.names: Dict[str, Set[str]] = {}
+        self.version = 0
+        self.built = False
+        self.lock = threading.RLock()
+        self.watcher: Optional[InotifyWatcher] = None
+        # Whether a listing was taken since the last full scan
+        self.listed = False
+        # Changed paths: their file info, and whether each directory existed, at the last listing
+        self.changed_files: Dict[str, Optional[FileInfo]] = {}
+        self.changed_dirs: Dict[str, bool] = {}
+        # (version, max_depth, max_tokens, listing) of the last summary()
+        self.summary_cache: Optional[Tuple[int, Optional[int], int, str]] = None
+
+    def relative(self, path: str | Path) -> Optional[str]:
+        """Get the index key of a path, None for paths outside the workspace"""
+        path = Path(path)
+        if not path.is_absolute():
+            path = self.root / path
+        relative = os.path.relpath(path, self.root)
+        if relative == os.curdir:
+            return ""
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+        return relative
+
+    def rebuild(self) -> None:
+        """Scan the whole workspace"""
+        with self.lock:
+            self.files.clear()
+            self.dirs.clear()
+            self.names.clear()
+            self.listed = False
+            self.changed_files.clear()
+            self.changed_dirs.clear()
+            if self.root.is_dir():
+                self._scan("")
+            else:
+                self.dirs[""] = set()
+            self.built = True
+            self.version += 1
+
+    def _ensure_built(self) -> None:
+        """Scan the workspace on first use"""
+        if not self.built:
+            self.rebuild()
+
+    def _scan(self, relative: str) -> None:
+        """Index an existing directory and everything below it"""
+        if self.listed:
+            self.changed_dirs.setdefault(relative, False)
+        self.dirs[relative] = children = set()
+        with os.scandir(self.root / relative) as entries:
+            for entry in entries:
+                child = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    children.add(entry.name)
+                    self._scan(child)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    self._add_file(child, FileInfo(stat.st_size, stat.st_mtime))
+
+    def _add_file(self, relative: str, info: FileInfo) -> None:
+        """Index a file whose directory is indexed"""
+        parent, name = os.path.split(relative)
+        if self.listed:
+            self.changed_files.setdefault(relative, None)
+        self.files[relative] = info
+        self.names.setdefault(name, set()).add(relative)
+        self.dirs[parent].add(name)
+
+    def _ensure_directory(self, relative: str) -> None:
+        """Index a directory and its parents, without their other contents"""
+        if relative in self.dirs:
+            return
+        parent, name = os.path.split(relative)
+        self._ensure_directory(parent)
+        if self.listed:
+            self.changed_dirs.setdefault(relative, False)
+        self.dirs[relative] = set()
+        self.dirs[parent].add(name)
+
+    def _forget(self, relative: str) -> None:
+        """Drop a file or a directory subtree from the index"""
+        if relative in self.files:
+            if self.listed:
+                self.changed_files.setdefault(relative, self.files[relative])
+            del self.files[relative]
+            name = os.path.basename(relative)
+            paths = self.names.get(name)
+            if paths is not None:
+                paths.discard(relative)
+                if not paths:
+                    del self.names[name]
+        elif relative in self.dirs:
+            for child in list(self.dirs[relative]):
+                self._forget(os.path.join(relative, child))
+            if self.listed:
+                self.changed_dirs.setdefault(relative, True)
+            del self.dirs[relative]
+        else:
+            return
+        parent, name = os.path.split(relative)
+        if parent in self.dirs:
+            self.dirs[parent].discard(name)
+
+    def refresh(self, path: str | Path) -> None:
+        """
+        Update the index after a path was created, written, moved away or deleted.
+
+        Args:
+            path (str | Path): The changed path, absolute or relative to the workspace.
+        """
+        with self.lock:
+            relative = self.relative(path)
+            if relative is None:
+                return
+            if not self.built or relative == "":
+                self.rebuild()
+                return
+            self._forget(relative)
+            full_path = self.root / relative
+            if full_path.is_dir() and not full_path.is_symlink():
+                self._ensure_directory(os.path.dirname(relative))
+                self.dirs[os.path.dirname(relative)].add(os.path.basename(relative))
+                self._scan(relative)
+            elif full_path.is_file():
+                stat = full_path.stat()
+                self._ensure_directory(os.path.dirname(relative))
+                self._add_file(relative, FileInfo(stat.st_size, stat.st_mtime))
+            self.version += 1
+
+    def find(self, name: str) -> List[str]:
+        """
+        Find the files with a name.
+
+        Args:
+            name (str): The file name, without directories.
+
+        Returns:
+            List[str]: The paths of the files, shallowest first.
+        """
+        with self.lock:
+            self._ensure_built()
+            return sorted(self.names.get(name, ()), key=lambda path: (path.count(os.sep), path))
+
+    def match(self, pattern: str) -> List[str]:
+        """
+        Find the files matching a shell pattern.
+
+        Args:
+            pattern (str): Matched against file names, or against the paths
+                relative to the workspace when it contains a directory separator.
+
+        Returns:
+            List[str]: The paths of the matching files, sorted.
+        """
+        with self.lock:
+            self._ensure_built()
+            if os.sep in pattern or "/" in pattern:
+                pattern = os.path.normpath(pattern)
+                return sorted(path for path in self.files if fnmatch.fnmatch(path, pattern))
+            if not any(char in pattern for char in "*?["):
+                return sorted(self.names.get(pattern, ()))
+            return sorted(
+                path for name, paths in self.names.items() if fnmatch.fnmatch(name, pattern) for path in paths
+            )
+
+    def exists(self, path: str | Path) -> bool:
+        """Check whether a file or directory is indexed"""
+        relative = self.relative(path)
+        with self.lock:
+            self._ensure_built()
+            return relative is not None and (relative in self.files or relative in self.dirs)
+
+    def info(self, path: str | Path) -> Optional[FileInfo]:
+        """Get the size and modification time of a file"""
+        relative = self.relative(path)
+        with self.lock:
+            self._ensure_built()
+            return self.files.get(relative) if relative is not None else None
+
+    def render(self, path: str | Path = "", max_depth: Optional[int] = None) -> Optional[str]:
+        """
+        Render a directory in the list_files format, e.g.
+        "file: a.md, dir: notes {file: b.md}".
+
+        Args:
+            path (str | Path): The directory, absolute or relative to the workspace.
+            max_depth (int, optional): Directories nested deeper are shown as
+                "dir: name {12 files}" without their contents.
+
+        Returns:
+            Optional[str]: The rendering, None if the directory is not indexed.
+        """
+        relative = self.relative(path)
+        with self.lock:
+            self._ensure_built()
+            if relative not in self.dirs:
+                return None
+            return self._render(relative, 0, max_depth)
+
+    def _render(self, relative: str, depth: int, max_depth: Optional[int]) -> str:
+        """Render an indexed directory"""
+        parts = []
+        for name in sorted(self.dirs[relative]):
+            child = os.path.join(relative, name)
+            if child in self.files:
+                parts.append(f"file: {name.replace(' ', '_')}")
+            elif max_depth is not None and depth >= max_depth:
+                parts.append(f"dir: {name.replace(' ', '_')} {{{self._count_files(child)} files}}")
+            else:
+                parts.append(f"dir: {name.replace(' ', '_')} {{{self._render(child, depth + 1, max_depth)}}}")
+        return ", ".join(parts)
+
+    def _count_files(self, relative: str) -> int:
+        """Count the files below an indexed directory"""
+        count = 0
+        for name in self.dirs[relative]:
+            child = os.path.join(relative, name)
+            count += 1 if child in self.files else self._count_files(child)
+        return count
+
+    def summary(self, max_depth: Optional[int] = None, max_tokens: int = 0) -> str:
+        """
+        Render the workspace for a prompt, depth limited and cut at max_tokens
+        tokens (0 for no limit). The rendering is cached until the tree changes.
+        """
+        with self.lock:
+            self._ensure_built()
+            cached = self.summary_cache
+            if cached is not None and cached[:3] == (self.version, max_depth, max_tokens):
+                return cached[3]
+            listing = truncate_listing(self._render("", 0, max_depth), max_tokens, len(self.files))
+            self.summary_cache = (self.version, max_depth, max_tokens, listing)
+            return listing
+
+    def mark_listed(self) -> None:
+        """Start recording changes for take_changes()"""
+        with self.lock:
+            self._ensure_built()
+            self.listed = True
+            self.changed_files.clear()
+            self.changed_dirs.clear()
+
+    def take_changes(self) -> Optional[WorkspaceChanges]:
+        """
+        Get the changes since the last listing and start a new delta.
+
+        Files below a new or removed directory are not listed separately,
+        new directories are reported with their number of files.
+
+        Returns:
+            Optional[WorkspaceChanges]: The changes, None if the workspace was
+            not listed since it was last scanned in full.
+        """
+        with self.lock:
+            if not self.built or not self.listed:
+                return None
+            added_dirs = sorted(path for path, existed in self.changed_dirs.items()
+                                if not existed and path in self.dirs)
+            removed_dirs = sorted(path for path, existed in self.changed_dirs.items()
+                                  if existed and path not in self.dirs)
+            added, modified, removed = [], [], []
+            for path, before in sorted(self.changed_files.items()):
+                if before is None and path in self.files:
+                    if not _below(path, added_dirs):
+                        added.append(path)
+                elif before is not None and path not in self.files:
+                    if not _below(path, removed_dirs):
+                        removed.append(path)
+                elif before is not None and self.files[path] != before:
+                    modified.append(path)
+            self.changed_files.clear()
+            self.changed_dirs.clear()
+            return WorkspaceChanges(
+                added, modified, removed,
+                {path: self._count_files(path) for path in added_dirs if not _below(path, added_dirs)},
+                [path for path in removed_dirs if not _below(path, removed_dirs)],
+            )
+
+    def watch(self) -> bool:
+        """
+        Keep the index in sync with changes made outside of the filesystem commands.
+
+        Returns:
+            bool: Whether inotify is available and the workspace is watched.
+        """
+        with self.lock:
+            if self.watcher is None:
+                try:
+                    self.watcher = InotifyWatcher(self)
+                except OSError as exc:
+                    print(f"Workspace changes are not watched ({exc}), the index follows the filesystem commands")
+                    return False
+            return True
+
+    def close(self) -> None:
+        """Stop watching the workspace"""
+        with self.lock:
+            watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.close()
+
+
+def _below(path: str, directories: List[str]) -> bool:
+    """Check whether a path is inside one of the directories"""
+    parent = os.path.dirname(path)
+    while parent:
+        if parent in directories:
+            return True
+        parent = os.path.dirname(parent)
+    return False
+
+
+class InotifyWatcher:
+    """
+    Refreshes a WorkspaceIndex from Linux inotify events on a background thread.
+
+    Every indexed directory is watched, new directories are watched as
+    they appear. A queue overflow rebuilds the whole index.
+    """
+
+    def __init__(self, index: WorkspaceIndex):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.index = index
+        # Watch descriptor: watched directory, relative to the workspace
+        self.watches: Dict[int, str] = {}
+        self.stopped = threading.Event()
+        with index.lock:
+            index._ensure_built()  # pylint: disable=protected-access
+        self._watch_indexed("")
+        self.thread = threading.Thread(target=self._run, name="workspace-inotify", daemon=True)
+        self.thread.start()
+
+    def _add_watch(self, relative: str) -> None:
+        """
+        Watch a directory.
+
+        inotify returns the existing descriptor for a directory that is
+        already watched, so this also remaps the descriptor of a renamed
+        directory to its new path.
+        """
+        path = str(self.index.root / relative).encode()
+        descriptor = self.libc.inotify_add_watch(self.fd, path, WATCH_MASK)
+        if descriptor >= 0:
+            self.watches[descriptor] = relative
+
+    def _watch_indexed(self, relative: str) -> None:
+        """Watch an indexed directory and every indexed directory below it, "" for the whole workspace"""
+        with self.index.lock:
+            directories = [path for path in self.index.dirs
+                           if not relative or path == relative or path.startswith(relative + os.sep)]
+        for directory in directories:
+            self._add_watch(directory)
+
+    def _forget_watches(self, relative: str) -> None:
+        """Unmap the descriptors of a directory that was moved away or deleted, and of the directories below it"""
+        for descriptor, directory in list(self.watches.items()):
+            if directory == relative or directory.startswith(relative + os.sep):
+                del self.watches[descriptor]
+
+    def _run(self) -> None:
+        """Read events until close()"""
+        while not self.stopped.is_set():
+            readable, _, _ = select.select([self.fd], [], [], 0.5)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.fd, 65536)
+            except (BlockingIOError, OSError):
+                continue
+            self._handle(data)
+
+    def _handle(self, data: bytes) -> None:
+        """Refresh the index for a buffer of events"""
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            descriptor, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, directories created since may not be watched yet
+                self.index.rebuild()
+                self._watch_indexed("")
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(descriptor, None)
+                continue
+            directory = self.watches.get(descriptor)
+            if directory is None or not name:
+                continue
+            relative = os.path.join(directory, os.fsdecode(name))
+            self.index.refresh(relative)
+            if mask & IN_ISDIR and mask & (IN_MOVED_FROM | IN_DELETE):
+                self._forget_watches(relative)
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # A renamed directory keeps its descriptors, they are mapped to the new paths here
+                self._watch_indexed(relative)
+
+    def close(self) -> None:
+        """Stop the watcher thread and release the inotify descriptor"""
+        self.stopped.set()
+        self.thread.join(timeout=2)
+        os.close(self.fd)
+
+
+_indexes: Dict[Path, WorkspaceIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_workspace_index(root: Optional[str | Path] = None) -> WorkspaceIndex:
+    """
+    Get the index of a workspace, watched with inotify when WORKSPACE_INOTIFY is True.
+
+    Args:
+        root (str | Path, optional): The workspace directory, defaults to the current workspace.
+
+    Returns:
+        WorkspaceIndex: The index shared by every command working in that workspace.
+    """
+    root = Path(root) if root is not None else get_workspace()
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = WorkspaceIndex(root)
+            if os.getenv("WORKSPACE_INOTIFY", "False") == "True":
+                index.watch()
+        return index